@@ -5,7 +5,8 @@ from rest_framework.views import APIView
 from rest_framework.parsers import JSONParser
 from django.contrib.auth import logout
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.filters import OrderingFilter
+from apps.search.filters import IndexedSearchFilter
 from openpyxl import Workbook
 from io import BytesIO
 from django.http import HttpResponse
@@ -22,6 +23,7 @@ from .serializers import (
     VerifySMSSerializer,
 )
 from .permissions import IsAdminOrReadOnly, IsAdmin
+from apps.core.views import PurgeDestroyMixin
 from .sms_service import sms_service
 from django.conf import settings
 import logging
@@ -105,12 +107,14 @@ class MeView(APIView):
         return Response(serializer.data)
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(PurgeDestroyMixin, viewsets.ModelViewSet):
     """User management ViewSet"""
     queryset = User.objects.all()
+    purge_target = 'user'
     serializer_class = UserSerializer
     permission_classes = [IsAdmin]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, IndexedSearchFilter, OrderingFilter]
+    search_entity = 'users'
     filterset_fields = ['role', 'verified', 'is_active']
     search_fields = ['phone', 'email', 'full_name', 'iin']
     ordering_fields = ['created_at', 'full_name']
@@ -3,6 +3,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
+from apps.search.filters import IndexedSearchFilter
 from django.http import HttpResponse
 from django.db.models import Q, OuterRef, Exists
 from django.utils import timezone
@@ -36,7 +37,8 @@ class CertificateViewSet(viewsets.ModelViewSet):
     queryset = Certificate.objects.select_related('student', 'course', 'protocol', 'template', 'uploaded_by').all()
     serializer_class = CertificateSerializer
     permission_classes = [IsAdminOrReadOnly]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, IndexedSearchFilter, OrderingFilter]
+    search_entity = 'certificates'
     filterset_fields = ['student', 'course']
     search_fields = ['number', 'student__full_name', 'student__phone', 'course__title']
     ordering_fields = ['issued_at', 'uploaded_at']
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import ContentPage
+from .models import ContentPage, BackgroundJob
 
 
 @admin.register(ContentPage)
@@ -18,3 +18,10 @@ class ContentPageAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+
+
+@admin.register(BackgroundJob)
+class BackgroundJobAdmin(admin.ModelAdmin):
+    list_display = ['kind', 'status', 'processed', 'total', 'created_by', 'created_at', 'finished_at']
+    list_filter = ['kind', 'status']
+    readonly_fields = ['created_at', 'started_at', 'finished_at']
@@ -0,0 +1,30 @@
+"""
+Versioned cache keys
+
+Cached fragments are stored under a key that includes the current version
+token of their source data; changing the token makes every old fragment
+unreachable at once, without deleting keys one by one.
+"""
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+def get_version(key):
+    """
+    Текущая версия кэшированных данных.
+
+    Версия - случайный токен, а не счетчик: если ключ версии будет вытеснен
+    из кэша, новая версия не совпадет ни с одним из ранее сохраненных фрагментов.
+    """
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex[:12], None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version_on_commit(key):
+    """Сменить версию после коммита транзакции"""
+    transaction.on_commit(lambda: cache.set(key, uuid.uuid4().hex[:12], None))
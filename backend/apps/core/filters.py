@@ -0,0 +1,62 @@
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce, NullIf
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+
+from .utils import get_request_language
+
+
+def localized_expression(field_name, lang):
+    """Value of a multilingual field in `lang` with fallback to the Russian column (in SQL)"""
+    if lang == 'ru':
+        return F(field_name)
+    return Coalesce(NullIf(F(f'{field_name}_{lang}'), Value('')), F(field_name))
+
+
+def _annotate_localized(queryset, field_name, lang):
+    alias = f'{field_name}_localized'
+    if alias not in queryset.query.annotations:
+        queryset = queryset.annotate(**{alias: localized_expression(field_name, lang)})
+    return queryset, alias
+
+
+class LocalizedOrderingFilter(OrderingFilter):
+    """
+    OrderingFilter that sorts multilingual fields by their localized value
+    
+    Fields listed in view.localized_filter_fields (e.g. ['title']) are ordered by
+    Coalesce(title_<lang>, title) for the request language.
+    """
+    
+    def filter_queryset(self, request, queryset, view):
+        ordering = self.get_ordering(request, queryset, view)
+        localized_fields = getattr(view, 'localized_filter_fields', ())
+        if not ordering:
+            return queryset
+        
+        lang = get_request_language(request)
+        resolved = []
+        for term in ordering:
+            name = term.lstrip('-')
+            if name in localized_fields and lang != 'ru':
+                queryset, alias = _annotate_localized(queryset, name, lang)
+                term = term.replace(name, alias)
+            resolved.append(term)
+        return queryset.order_by(*resolved)
+
+
+class LocalizedFieldFilter(BaseFilterBackend):
+    """
+    Filter by localized value of multilingual fields: ?title=<substring>
+    
+    Matching is done in the database on Coalesce(title_<lang>, title).
+    """
+    
+    def filter_queryset(self, request, queryset, view):
+        lang = get_request_language(request)
+        for name in getattr(view, 'localized_filter_fields', ()):
+            value = request.query_params.get(name, '').strip()
+            if not value:
+                continue
+            queryset, alias = _annotate_localized(queryset, name, lang)
+            queryset = queryset.filter(**{f'{alias}__icontains': value})
+        return queryset
@@ -0,0 +1,59 @@
+"""
+Helpers for running long operations as Celery background jobs
+"""
+import logging
+
+from django.db import transaction
+
+from .models import BackgroundJob
+
+logger = logging.getLogger(__name__)
+
+
+def start_job(kind, task, params=None, user=None, total=0):
+    """
+    Создать BackgroundJob и поставить задачу Celery в очередь.
+    
+    Задача получает только id задания; входные параметры хранятся в job.params.
+    Постановка в очередь выполняется после коммита транзакции, чтобы воркер
+    гарантированно увидел созданную запись.
+    
+    Args:
+        kind: Тип задания (например, 'bulk_enroll')
+        task: Celery-задача, принимающая job_id
+        params: JSON-параметры задания
+        user: Пользователь, запустивший задание
+        total: Ожидаемое количество элементов
+        
+    Returns:
+        BackgroundJob
+    """
+    if user is not None and not getattr(user, 'is_authenticated', False):
+        user = None
+    job = BackgroundJob.objects.create(kind=kind, params=params or {}, created_by=user, total=total)
+    transaction.on_commit(lambda: task.delay(job.pk))
+    return job
+
+
+def run_job(job_id, handler):
+    """
+    Выполнить обработчик задания с отметками статуса.
+    
+    handler(job) возвращает словарь-результат; прогресс обработчик
+    обновляет сам через job.set_progress().
+    """
+    try:
+        job = BackgroundJob.objects.get(pk=job_id)
+    except BackgroundJob.DoesNotExist:
+        logger.warning(f"Background job {job_id} not found")
+        return None
+    
+    job.mark_running()
+    try:
+        result = handler(job)
+    except Exception as e:
+        logger.error(f"Background job {job.kind} #{job.pk} failed: {e}", exc_info=True)
+        job.mark_failed(e)
+        return None
+    job.mark_completed(result)
+    return result
@@ -1,4 +1,5 @@
 from django.db import models
+from django.conf import settings
 from django.utils import timezone
 
 
@@ -36,3 +37,71 @@ class ContentPage(models.Model):
         elif lang == 'en':
             return self.content_en or self.content_ru
         return self.content_ru
+
+
+class BackgroundJob(models.Model):
+    """Long-running background job (bulk enrollment, purge, rebuild) with progress tracking"""
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    
+    kind = models.CharField(max_length=50, db_index=True, help_text='Job type, e.g. bulk_enroll')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    total = models.IntegerField(default=0, help_text='Total number of items to process')
+    processed = models.IntegerField(default=0, help_text='Number of processed items')
+    params = models.JSONField(default=dict, blank=True, help_text='Job input parameters')
+    result = models.JSONField(default=dict, blank=True, help_text='Job result summary')
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='background_jobs', on_delete=models.SET_NULL, null=True, blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'background_jobs'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.get_status_display()})"
+    
+    @property
+    def percent(self):
+        if not self.total:
+            return 100 if self.status == 'completed' else 0
+        return min(int(self.processed * 100 / self.total), 100)
+    
+    def mark_running(self, total=None):
+        """Mark job as started"""
+        self.status = 'running'
+        self.started_at = timezone.now()
+        fields = ['status', 'started_at']
+        if total is not None:
+            self.total = total
+            fields.append('total')
+        self.save(update_fields=fields)
+    
+    def set_progress(self, processed):
+        """Store number of processed items"""
+        self.processed = processed
+        self.save(update_fields=['processed'])
+    
+    def mark_completed(self, result=None):
+        """Mark job as successfully finished"""
+        self.status = 'completed'
+        self.finished_at = timezone.now()
+        self.result = result or {}
+        if self.total and self.processed < self.total:
+            self.processed = self.total
+        self.save(update_fields=['status', 'finished_at', 'result', 'processed'])
+    
+    def mark_failed(self, error):
+        """Mark job as failed"""
+        self.status = 'failed'
+        self.finished_at = timezone.now()
+        self.error = str(error)
+        self.save(update_fields=['status', 'finished_at', 'error'])
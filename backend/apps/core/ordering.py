@@ -0,0 +1,69 @@
+"""
+Gap-based ordering of child rows (modules, lessons, questions)
+
+Orders are spaced by ORDER_GAP, so appending a row takes the last order
+plus the gap (one indexed lookup instead of an aggregate over all
+children), and a row can be placed between two neighbours without
+renumbering the others. A full reorder rewrites all orders of the parent
+with one bulk_update.
+"""
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework import serializers
+
+ORDER_GAP = 1024
+
+
+def next_order(queryset):
+    """Порядок для новой записи в конце списка (queryset - дочерние записи родителя)"""
+    last = queryset.order_by('-order').values_list('order', flat=True).first()
+    return (last or 0) + ORDER_GAP
+
+
+def apply_order(queryset, ids):
+    """
+    Переупорядочить все дочерние записи родителя по списку id.
+
+    Порядки переписываются с шагом ORDER_GAP: сначала значения уводятся в
+    отрицательные (unique_together родитель + order), затем записываются
+    одним bulk_update.
+
+    Args:
+        queryset: Дочерние записи одного родителя (например, test.questions.all())
+        ids: Id всех записей в новом порядке
+
+    Raises:
+        serializers.ValidationError: Список не совпадает с набором записей родителя
+
+    Returns:
+        dict: {id: order}
+    """
+    ids = [int(pk) for pk in ids]
+    if len(set(ids)) != len(ids):
+        raise serializers.ValidationError({'ids': 'Duplicate ids'})
+
+    with transaction.atomic():
+        rows = {row.pk: row for row in queryset.select_for_update().only('id', 'order')}
+        if set(ids) != set(rows):
+            raise serializers.ValidationError({
+                'ids': 'List must contain every item exactly once',
+                'missing': sorted(set(rows) - set(ids)),
+                'unknown': sorted(set(ids) - set(rows)),
+            })
+
+        now = timezone.now()
+        changed = []
+        for index, pk in enumerate(ids, start=1):
+            row = rows[pk]
+            if row.order != index * ORDER_GAP:
+                row.order = index * ORDER_GAP
+                row.updated_at = now
+                changed.append(row)
+
+        if changed:
+            model = queryset.model
+            model.objects.filter(pk__in=[row.pk for row in changed]).update(order=-F('order') - 1)
+            model.objects.bulk_update(changed, ['order', 'updated_at'])
+
+    return {pk: rows[pk].order for pk in ids}
@@ -0,0 +1,188 @@
+"""
+Chunked cascade purge for large object graphs (enrollments, users, courses, tests)
+
+Django's delete() collects the whole cascade graph in memory before deleting
+anything. The purge service instead walks CASCADE relations up front, builds
+a list of querysets ordered from leaves to roots and deletes each of them in
+chunks of PURGE_CHUNK_SIZE rows, every chunk in its own short transaction.
+Files stored in FileField/ImageField columns are removed from storage after
+the chunk is committed.
+"""
+import logging
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.db import models, transaction
+
+logger = logging.getLogger(__name__)
+
+
+def build_purge_plan(querysets):
+    """
+    Построить упорядоченный список querysets для удаления.
+
+    Для каждого корня рекурсивно добавляются зависимые по CASCADE модели,
+    дочерние шаги идут раньше родительских. Связи SET_NULL/PROTECT обрабатывает
+    обычный delete() на уровне отдельной порции.
+
+    Args:
+        querysets: Корневые querysets (что нужно удалить)
+
+    Returns:
+        list: querysets в порядке удаления
+    """
+    plan = []
+    for queryset in querysets:
+        _collect_steps(queryset, plan, path=())
+    return plan
+
+
+def _collect_steps(queryset, plan, path):
+    model = queryset.model
+    for rel in model._meta.related_objects:
+        if getattr(rel, 'on_delete', None) is not models.CASCADE:
+            continue
+        if rel.related_model in path or rel.related_model is model:
+            # Циклические связи оставляем сборщику Django
+            continue
+        child = rel.related_model._base_manager.filter(**{f'{rel.field.name}__in': queryset})
+        _collect_steps(child, plan, path + (model,))
+    plan.append(queryset)
+
+
+def count_purge_plan(plan):
+    """Количество строк, которые будут удалены (оценка для прогресса)"""
+    return sum(queryset.count() for queryset in plan)
+
+
+def execute_purge_plan(plan, chunk_size=None, progress_callback=None):
+    """
+    Удалить строки плана порциями.
+
+    Args:
+        plan: Результат build_purge_plan
+        chunk_size: Размер порции (по умолчанию settings.PURGE_CHUNK_SIZE)
+        progress_callback: Вызывается с общим числом удаленных строк после каждой порции
+
+    Returns:
+        dict: {'deleted': {model_label: count}, 'files_deleted': int}
+    """
+    chunk_size = chunk_size or settings.PURGE_CHUNK_SIZE
+    deleted = {}
+    files_deleted = 0
+    processed = 0
+
+    for queryset in plan:
+        model = queryset.model
+        file_fields = [f for f in model._meta.concrete_fields if isinstance(f, models.FileField)]
+
+        while True:
+            pks = list(queryset.order_by('pk').values_list('pk', flat=True)[:chunk_size])
+            if not pks:
+                break
+
+            files = []
+            if file_fields:
+                names = model._base_manager.filter(pk__in=pks).values_list(*[f.attname for f in file_fields])
+                for row in names:
+                    files.extend((field, name) for field, name in zip(file_fields, row) if name)
+
+            with transaction.atomic():
+                _, per_model = model._base_manager.filter(pk__in=pks).delete()
+
+            for label, count in per_model.items():
+                deleted[label] = deleted.get(label, 0) + count
+            files_deleted += _delete_files(files)
+            processed += len(pks)
+            if progress_callback:
+                progress_callback(processed)
+
+    return {'deleted': deleted, 'files_deleted': files_deleted}
+
+
+def _delete_files(files):
+    """Удалить файлы из хранилища, ошибки только логируются"""
+    count = 0
+    for field, name in files:
+        try:
+            field.storage.delete(name)
+            count += 1
+        except Exception as e:
+            logger.warning(f"Could not delete file {name}: {e}")
+    return count
+
+
+def get_purge_roots(target, obj_id):
+    """
+    Корневые querysets для цели очистки.
+
+    Args:
+        target: 'enrollment', 'user', 'course' или 'test'
+        obj_id: id объекта
+    """
+    from apps.accounts.models import User
+    from apps.courses.models import Course, CourseEnrollment
+    from apps.tests.models import Test
+
+    if target == 'enrollment':
+        from apps.certificates.models import Certificate
+        from apps.exams.models import TestAttempt, ExtraAttemptRequest, AttemptQuota
+        from apps.courses.utils import get_course_test_ids
+
+        enrollment = CourseEnrollment.objects.select_related('course').get(pk=obj_id)
+        test_ids = get_course_test_ids(enrollment.course)
+        return [
+            TestAttempt.objects.filter(user_id=enrollment.user_id, test_id__in=test_ids),
+            ExtraAttemptRequest.objects.filter(user_id=enrollment.user_id, test_id__in=test_ids),
+            AttemptQuota.objects.filter(user_id=enrollment.user_id, test_id__in=test_ids),
+            Certificate.objects.filter(student_id=enrollment.user_id, course_id=enrollment.course_id),
+            CourseEnrollment.objects.filter(pk=obj_id),
+        ]
+    if target == 'user':
+        return [User.objects.filter(pk=obj_id)]
+    if target == 'course':
+        return [Course.objects.filter(pk=obj_id)]
+    if target == 'test':
+        return [Test.objects.filter(pk=obj_id)]
+    raise ValueError(f'Unknown purge target: {target}')
+
+
+def _purge_context(target, obj_id):
+    """Курс удаляется пакетно: сигналы уроков не пересчитывают счетчики построчно"""
+    if target == 'course':
+        from apps.courses.utils import course_tree_batch
+        return course_tree_batch(obj_id)
+    return nullcontext()
+
+
+def purge(target, obj_id, progress_callback=None):
+    """Удалить объект и все зависимые данные порциями"""
+    plan = build_purge_plan(get_purge_roots(target, obj_id))
+    with _purge_context(target, obj_id):
+        return execute_purge_plan(plan, progress_callback=progress_callback)
+
+
+def start_purge(target, obj_id, user=None):
+    """
+    Запустить очистку: небольшие графы удаляются сразу, крупные - фоновой задачей.
+
+    Returns:
+        tuple: (job, None) если запущено задание, (None, result) если удалено сразу
+    """
+    from .jobs import start_job
+    from .tasks import purge_task
+
+    plan = build_purge_plan(get_purge_roots(target, obj_id))
+    total = count_purge_plan(plan)
+    if total > settings.PURGE_SYNC_LIMIT:
+        job = start_job(
+            f'purge_{target}',
+            purge_task,
+            params={'target': target, 'id': obj_id},
+            user=user,
+            total=total,
+        )
+        return job, None
+
+    with _purge_context(target, obj_id):
+        return None, execute_purge_plan(plan)
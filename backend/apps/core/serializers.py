@@ -1,5 +1,51 @@
 from rest_framework import serializers
-from .models import ContentPage
+from .models import ContentPage, BackgroundJob
+from .utils import LANGUAGES, get_resolved_language, resolve_localized_fields
+
+
+class LocalizedFieldsMixin:
+    """
+    Compact language-resolved output for multilingual serializers.
+    
+    `localized_fields` lists base field names. With an explicit `?lang=ru|kz|en`
+    (or context['lang']) every such field is returned once, localized with
+    Russian fallback, and the `_kz`/`_en` columns are dropped. Without `?lang=`
+    the full multilingual payload is returned as before.
+    """
+    localized_fields = ()
+    
+    def get_resolved_language(self):
+        lang = self.context.get('lang')
+        if lang is None:
+            lang = get_resolved_language(self.context.get('request'))
+        return lang if lang in LANGUAGES else None
+    
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        lang = self.get_resolved_language()
+        if lang:
+            resolve_localized_fields(data, self.localized_fields, lang)
+        return data
+
+
+class CloneSerializer(serializers.Serializer):
+    """Parameters of a course/test copy (new language edition)"""
+    language = serializers.ChoiceField(choices=LANGUAGES, required=False)
+    translate = serializers.BooleanField(
+        default=False,
+        help_text='Copy _kz/_en fields of the target language into the base fields'
+    )
+    title = serializers.CharField(max_length=255, required=False, allow_blank=True)
+    
+    def validate(self, attrs):
+        if attrs.get('translate') and not attrs.get('language'):
+            raise serializers.ValidationError({'language': 'Language is required to translate the copy'})
+        return attrs
+
+
+class ReorderSerializer(serializers.Serializer):
+    """Ordered list of child ids (modules of a course, lessons of a module, questions of a test)"""
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=2000)
 
 
 class ContentPageSerializer(serializers.ModelSerializer):
@@ -17,3 +63,16 @@ class ContentPageUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = ContentPage
         fields = ['content_ru', 'content_kz', 'content_en']
+
+
+class BackgroundJobSerializer(serializers.ModelSerializer):
+    """Serializer for background job status"""
+    percent = serializers.IntegerField(read_only=True)
+    
+    class Meta:
+        model = BackgroundJob
+        fields = [
+            'id', 'kind', 'status', 'total', 'processed', 'percent',
+            'result', 'error', 'created_at', 'started_at', 'finished_at'
+        ]
+        read_only_fields = fields
@@ -0,0 +1,15 @@
+"""Celery tasks for core services"""
+from celery import shared_task
+
+from .jobs import run_job
+
+
+@shared_task
+def purge_task(job_id):
+    """Delete an object graph (enrollment, user, course, test) in chunks"""
+    from .purge import purge
+    
+    def handler(job):
+        return purge(job.params['target'], job.params['id'], progress_callback=job.set_progress)
+    
+    return run_job(job_id, handler)
@@ -1,9 +1,10 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ContentPageViewSet
+from .views import ContentPageViewSet, BackgroundJobViewSet
 
 router = DefaultRouter()
 router.register(r'content-pages', ContentPageViewSet, basename='contentpage')
+router.register(r'jobs', BackgroundJobViewSet, basename='backgroundjob')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -2,6 +2,9 @@
 Utility functions for language detection and multilingual support
 """
 
+LANGUAGES = ('ru', 'kz', 'en')
+TRANSLATED_LANGUAGES = ('kz', 'en')
+
 
 def get_request_language(request):
     """
@@ -68,3 +71,59 @@ def get_multilingual_field_value(instance, field_name, lang='ru'):
         if not value:
             return getattr(instance, field_name, None)
         return value
+
+
+def get_resolved_language(request):
+    """
+    Язык компактного (разрешенного) представления из параметра ?lang=.
+    
+    В отличие от get_request_language заголовок Accept-Language не учитывается:
+    компактный режим включается только явно.
+    
+    Returns:
+        str | None: Код языка или None, если параметр не задан
+    """
+    if request is None or not hasattr(request, 'query_params'):
+        return None
+    lang = request.query_params.get('lang', '').lower()
+    return lang if lang in LANGUAGES else None
+
+
+def resolve_localized_fields(data, field_names, lang):
+    """
+    Оставить в словаре одно значение на каждое многоязычное поле.
+    
+    Поля field_name_kz/field_name_en удаляются, field_name получает значение
+    для языка lang (с fallback на русский, как get_multilingual_field_value).
+    
+    Args:
+        data: Сериализованный объект (изменяется на месте)
+        field_names: Базовые имена полей (например, ('title', 'description'))
+        lang: Код языка ('ru', 'kz', 'en')
+    """
+    for field_name in field_names:
+        translations = {code: data.pop(f'{field_name}_{code}', None) for code in TRANSLATED_LANGUAGES}
+        if lang != 'ru' and translations.get(lang) and field_name in data:
+            data[field_name] = translations[lang]
+    return data
+
+
+def apply_translation(instance, field_names, lang):
+    """
+    Перенести перевод в базовые поля объекта (новое языковое издание).
+    
+    Непустое значение field_name_<lang> записывается в field_name;
+    для 'ru' объект не меняется.
+    
+    Args:
+        instance: Объект модели (изменяется на месте)
+        field_names: Базовые имена полей (например, ('title', 'description'))
+        lang: Код языка ('ru', 'kz', 'en')
+    """
+    if lang not in TRANSLATED_LANGUAGES:
+        return instance
+    for field_name in field_names:
+        value = getattr(instance, f'{field_name}_{lang}', '')
+        if value:
+            setattr(instance, field_name, value)
+    return instance
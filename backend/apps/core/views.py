@@ -1,8 +1,8 @@
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from .models import ContentPage
-from .serializers import ContentPageSerializer, ContentPageUpdateSerializer
+from .models import ContentPage, BackgroundJob
+from .serializers import ContentPageSerializer, ContentPageUpdateSerializer, BackgroundJobSerializer
 from .utils import get_request_language
 
 
@@ -70,3 +70,47 @@ class ContentPageViewSet(viewsets.ModelViewSet):
             'language': lang,
             'updated_at': None,
         }, status=status.HTTP_200_OK)
+
+
+class BackgroundJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """ViewSet for polling background job status"""
+    serializer_class = BackgroundJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filterset_fields = ['kind', 'status']
+    
+    def get_queryset(self):
+        """Users see their own jobs, admins see all jobs"""
+        queryset = BackgroundJob.objects.all()
+        if not getattr(self.request.user, 'is_admin', False):
+            queryset = queryset.filter(created_by=self.request.user)
+        return queryset
+
+
+def purge_response(target, obj_id, user, data=None):
+    """
+    Delete object graph via chunked purge and build API response
+    
+    Small graphs are deleted inline (200 with data, or 204 without data),
+    large ones are deleted by a background job (202 with job_id).
+    """
+    from .purge import start_purge
+    
+    job, result = start_purge(target, obj_id, user=user)
+    if job is not None:
+        return Response({
+            'message': 'Deletion started',
+            'job_id': job.id,
+            'status': job.status,
+        }, status=status.HTTP_202_ACCEPTED)
+    if data is None:
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    return Response(dict(data, deleted=result['deleted']), status=status.HTTP_200_OK)
+
+
+class PurgeDestroyMixin:
+    """destroy() through the chunked purge service instead of in-memory cascade"""
+    purge_target = None
+    
+    def destroy(self, request, *args, **kwargs):
+        instance = self.get_object()
+        return purge_response(self.purge_target, instance.pk, request.user)
@@ -0,0 +1,240 @@
+"""
+Write-behind buffers in the cache
+
+Frequent small updates (player heartbeats, answer autosave) are accumulated
+in the cache and written to the database in periodic batches instead of one
+write per request.
+
+Cache keys of a buffer <name>:
+    wb:<name>:seq             - last sequence number (cache.incr)
+    wb:<name>:flushed         - last flushed sequence number
+    wb:<name>:slot:<n>        - item key registered under sequence number n
+    wb:<name>:pending:<key>   - flag: key is registered and not flushed yet
+    wb:<name>:count:<key>:<c> - accumulated counter c of the item (cache.incr)
+    wb:<name>:values:<key>    - last written values of the item (last write wins)
+    wb:<name>:flushing        - lock held while the buffer is being flushed
+    wb:<name>:gap:<n>         - time a flush first found slot n missing
+
+An item key is registered (gets a sequence slot) only on its first update
+after a flush, so a flush reads each changed item once. Counters are
+decremented by the flushed amount rather than deleted: increments that
+arrive while a flush is running are kept for the next one. add() takes a
+sequence number before it writes the slot, so a flush stops at a missing
+slot and passes it only after SLOT_GRACE_PERIOD (the slot was evicted).
+
+The buffer must live in a cache shared by all processes (REDIS_CACHE_URL).
+With a per-process cache (LocMemCache) every process flushes its own
+buffer inline, see flush_if_due(); callers that cannot tolerate data
+sitting in one worker's memory check is_shared_cache() and write directly.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+FLUSH_BATCH_SIZE = 500
+# Одновременно буфер записывает только один процесс (иначе счетчики попадут в БД дважды)
+FLUSH_LOCK_TIMEOUT = 10 * 60
+# Сколько секунд ждать слот, номер которого уже выдан, но ключ еще не записан
+SLOT_GRACE_PERIOD = 10
+
+# Бэкенды кэша, данные которых видны только текущему процессу
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def is_shared_cache():
+    """Виден ли кэш по умолчанию всем процессам (воркерам и Celery)"""
+    return settings.CACHES['default']['BACKEND'] not in LOCAL_CACHE_BACKENDS
+
+
+class WriteBehindBuffer:
+    """
+    Буфер отложенной записи.
+
+    Args:
+        name: Имя буфера (часть ключей кэша)
+        handler: callable(items) - запись пакета в БД, items: {key: {'counters': {...}, 'values': {...}}}
+        counters: Имена числовых счетчиков элемента (накапливаются через cache.incr)
+        timeout: Время жизни данных элемента в кэше, секунды
+    """
+
+    def __init__(self, name, handler, counters=(), timeout=None):
+        self.name = name
+        self.handler = handler
+        self.counters = tuple(counters)
+        self.timeout = timeout or settings.WRITE_BEHIND_TIMEOUT
+
+    def _key(self, *parts):
+        return ':'.join(('wb', self.name) + tuple(str(part) for part in parts))
+
+    def _incr(self, key, delta, timeout):
+        cache.add(key, 0, timeout)
+        try:
+            return cache.incr(key, delta)
+        except ValueError:
+            # Ключ вытеснен между add и incr
+            cache.set(key, delta, timeout)
+            return delta
+
+    def add(self, key, counters=None, values=None):
+        """
+        Записать изменение элемента в буфер.
+
+        Args:
+            key: Ключ элемента (строка, например 'user_id:lesson_id')
+            counters: {counter: delta} - прибавить к счетчикам
+            values: {field: value} - заменить последние значения
+        """
+        for counter, delta in (counters or {}).items():
+            if delta:
+                self._incr(self._key('count', key, counter), delta, self.timeout)
+        if values is not None:
+            cache.set(self._key('values', key), values, self.timeout)
+        if cache.add(self._key('pending', key), 1, self.timeout):
+            seq = self._incr(self._key('seq'), 1, None)
+            cache.set(self._key('slot', seq), key, self.timeout)
+
+    def get(self, key):
+        """
+        Незаписанное в БД состояние элемента.
+
+        Returns:
+            dict: {'counters': {...}, 'values': {...} или None}
+        """
+        return self.get_many([key])[key]
+
+    def get_many(self, keys):
+        """
+        Незаписанное состояние нескольких элементов одним запросом к кэшу.
+
+        Returns:
+            dict: {key: {'counters': {...}, 'values': {...} или None}}
+        """
+        cache_keys = [self._key('values', key) for key in keys]
+        cache_keys += [self._key('count', key, counter) for key in keys for counter in self.counters]
+        stored = cache.get_many(cache_keys)
+        return {
+            key: {
+                'counters': {
+                    counter: stored.get(self._key('count', key, counter), 0) for counter in self.counters
+                },
+                'values': stored.get(self._key('values', key)),
+            }
+            for key in keys
+        }
+
+    def get_values(self, keys):
+        """
+        Последние значения нескольких элементов одним запросом к кэшу.
+
+        Returns:
+            dict: {key: values} для элементов, у которых есть значения
+        """
+        cache_keys = {self._key('values', key): key for key in keys}
+        return {cache_keys[cache_key]: values for cache_key, values in cache.get_many(list(cache_keys)).items()}
+
+    def flush(self, batch_size=FLUSH_BATCH_SIZE):
+        """
+        Записать накопленные изменения в БД пакетами.
+
+        Если handler падает, номер последнего записанного пакета не сдвигается
+        и счетчики не уменьшаются - элементы будут записаны при следующем вызове.
+
+        Returns:
+            int: Количество записанных элементов (0, если запись уже выполняется)
+        """
+        if not cache.add(self._key('flushing'), 1, FLUSH_LOCK_TIMEOUT):
+            return 0
+        try:
+            return self._flush(batch_size)
+        finally:
+            cache.delete(self._key('flushing'))
+
+    def _gap_expired(self, seq):
+        """Прошло ли SLOT_GRACE_PERIOD с момента, когда слот seq впервые не нашелся"""
+        now = time.time()
+        gap_key = self._key('gap', seq)
+        if cache.add(gap_key, now, SLOT_GRACE_PERIOD * 10):
+            return False
+        return now - (cache.get(gap_key) or now) >= SLOT_GRACE_PERIOD
+
+    def _flush(self, batch_size):
+        flushed = cache.get(self._key('flushed')) or 0
+        last = cache.get(self._key('seq')) or 0
+        total = 0
+
+        for start in range(flushed + 1, last + 1, batch_size):
+            seqs = range(start, min(start + batch_size, last + 1))
+            slot_keys = [self._key('slot', seq) for seq in seqs]
+            slots = cache.get_many(slot_keys)
+
+            # Слот еще не записан (add между incr и set): дальше него не продвигаемся
+            gap = next(
+                (seq for seq, slot_key in zip(seqs, slot_keys) if slot_key not in slots and not self._gap_expired(seq)),
+                None,
+            )
+            if gap is not None:
+                seqs = range(start, gap)
+                slot_keys = slot_keys[:len(seqs)]
+            if not seqs:
+                break
+            keys = list(dict.fromkeys(slots[slot_key] for slot_key in slot_keys if slot_key in slots))
+
+            # Сначала снимаем флаг: изменения, пришедшие во время записи, получат новый слот
+            cache.delete_many([self._key('pending', key) for key in keys])
+
+            cache_keys = [self._key('values', key) for key in keys]
+            cache_keys += [self._key('count', key, counter) for key in keys for counter in self.counters]
+            stored = cache.get_many(cache_keys)
+
+            items = {}
+            for key in keys:
+                counters = {
+                    counter: stored.get(self._key('count', key, counter), 0)
+                    for counter in self.counters
+                }
+                values = stored.get(self._key('values', key))
+                if values is None and not any(counters.values()):
+                    continue
+                items[key] = {'counters': counters, 'values': values}
+
+            if items:
+                self.handler(items)
+            for key, item in items.items():
+                for counter, amount in item['counters'].items():
+                    if amount:
+                        try:
+                            cache.decr(self._key('count', key, counter), amount)
+                        except ValueError:
+                            pass
+
+            cache.delete_many(slot_keys)
+            cache.set(self._key('flushed'), seqs[-1], None)
+            total += len(items)
+            if gap is not None:
+                break
+
+        return total
+
+    def flush_if_due(self):
+        """
+        Записать буфер, если с последней записи прошло WRITE_BEHIND_FLUSH_INTERVAL.
+
+        Вызывается после add(): обеспечивает запись и без периодической задачи,
+        в том числе с кэшем отдельного процесса. Между процессами с общим
+        кэшем запись выполняет только тот, кто первым занял интервал.
+        """
+        interval = settings.WRITE_BEHIND_FLUSH_INTERVAL
+        if not interval or not cache.add(self._key('flush_lock'), 1, interval):
+            return 0
+        try:
+            return self.flush()
+        except Exception as e:
+            logger.error(f"Write-behind flush of {self.name} failed: {e}", exc_info=True)
+            return 0
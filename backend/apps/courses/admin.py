@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Category, Course, Module, Lesson, CourseEnrollment, LessonProgress, CourseCompletionVerification
+from .models import Category, Course, Module, Lesson, CourseEnrollment, LessonProgress, CourseCompletionVerification, CoursePackage
 
 
 @admin.register(Course)
@@ -28,6 +28,7 @@ class LessonAdmin(admin.ModelAdmin):
     search_fields = ('title', 'description', 'content')
     ordering = ('module', 'order', 'id')
     readonly_fields = ('created_at', 'updated_at')
+    raw_id_fields = ('test',)
 
 
 @admin.register(CourseEnrollment)
@@ -54,3 +55,11 @@ class CourseCompletionVerificationAdmin(admin.ModelAdmin):
     search_fields = ('enrollment__user__full_name', 'enrollment__user__phone', 'enrollment__course__title')
     readonly_fields = ('otp_code', 'otp_expires_at', 'verified_at', 'created_at', 'updated_at')
 
+
+@admin.register(CoursePackage)
+class CoursePackageAdmin(admin.ModelAdmin):
+    list_display = ('course', 'language', 'status', 'size', 'built_at')
+    list_filter = ('status', 'language')
+    search_fields = ('course__title',)
+    readonly_fields = ('tree_version', 'size', 'job', 'error', 'built_at', 'created_at', 'updated_at')
+    raw_id_fields = ('course',)
@@ -5,4 +5,6 @@ class CoursesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.courses'
     verbose_name = 'Courses'
-
+    
+    def ready(self):
+        import apps.courses.signals
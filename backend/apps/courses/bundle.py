@@ -0,0 +1,340 @@
+"""
+Course export/import bundles
+
+A bundle is a zip archive:
+    manifest.json     - format, version, counts
+    course.json       - course row
+    tests.ndjson      - linked tests (lesson tests and final test), one JSON object per line
+    questions.ndjson  - questions of these tests
+    modules.ndjson    - course modules
+    lessons.ndjson    - lessons of these modules
+    media/<path>      - local media files referenced by lesson URLs
+
+Export is a generator of zip chunks: rows are read with iterator() and
+written line by line, so a large course is never held in memory as a whole.
+Import recreates everything with bulk_create in one transaction and remaps
+ids (Lesson.module, Lesson.test, Question.test, Course.final_test).
+"""
+import io
+import json
+import zipfile
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from apps.search.index import reindex_queryset
+from apps.search.registry import ENTITIES
+from apps.tests.models import Test, Question
+from .models import Category, Course, Module, Lesson
+from .utils import course_tree_batch, get_course_test_ids
+
+BUNDLE_FORMAT = 'unicover-course-bundle'
+BUNDLE_VERSION = 1
+IMPORT_BATCH_SIZE = 500
+
+MEDIA_URL_FIELDS = ('video_url', 'thumbnail_url', 'pdf_url')
+SKIP_FIELDS = {'created_at', 'updated_at'}
+
+
+class BundleError(Exception):
+    """Invalid or unsupported bundle"""
+
+
+class _ChunkWriter(io.RawIOBase):
+    """Write-only stream that collects written bytes until they are popped"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def pop(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _row(obj, exclude=()):
+    """Concrete model fields of obj as a dict (FK as <name>_id)"""
+    return {
+        f.attname: getattr(obj, f.attname)
+        for f in obj._meta.concrete_fields
+        if f.name not in SKIP_FIELDS and f.name not in exclude
+    }
+
+
+def _dumps(data):
+    return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False)
+
+
+def _category_ref(category):
+    if category is None:
+        return None
+    return {'name': category.name, 'name_kz': category.name_kz, 'name_en': category.name_en}
+
+
+def media_storage_path(url):
+    """Storage path of a media URL (relative to MEDIA_URL), or None for external URLs"""
+    if not url:
+        return None
+    path = urlparse(url).path
+    if not path.startswith(settings.MEDIA_URL):
+        return None
+    return path[len(settings.MEDIA_URL):] or None
+
+
+def _flush(writer):
+    data = writer.pop()
+    if data:
+        yield data
+
+
+def iter_course_bundle(course, include_media=True):
+    """
+    Сформировать архив курса по частям.
+
+    Yields:
+        bytes: Очередная часть zip-архива
+    """
+    writer = _ChunkWriter()
+    test_ids = get_course_test_ids(course)
+    counts = {}
+    media = set()
+
+    with zipfile.ZipFile(writer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        course_data = _row(course, exclude={'category', 'total_required_lessons'})
+        course_data['category'] = _category_ref(course.category)
+        archive.writestr('course.json', _dumps(course_data))
+        yield from _flush(writer)
+
+        sources = [
+            ('tests.ndjson', Test.objects.filter(id__in=test_ids).select_related('category')),
+            ('questions.ndjson', Question.objects.filter(test_id__in=test_ids).order_by('test_id', 'order', 'id')),
+            ('modules.ndjson', Module.objects.filter(course=course).order_by('order', 'id')),
+            ('lessons.ndjson', Lesson.objects.filter(module__course=course).order_by('module_id', 'order', 'id')),
+        ]
+        for name, queryset in sources:
+            counts[name] = 0
+            with archive.open(name, 'w') as entry:
+                for obj in queryset.iterator(chunk_size=IMPORT_BATCH_SIZE):
+                    if isinstance(obj, Test):
+                        data = _row(obj, exclude={'category'})
+                        data['category'] = _category_ref(obj.category)
+                    else:
+                        data = _row(obj)
+                    if isinstance(obj, Lesson) and include_media:
+                        for field in MEDIA_URL_FIELDS:
+                            path = media_storage_path(getattr(obj, field))
+                            if path and path not in media and default_storage.exists(path):
+                                media.add(path)
+                    entry.write((_dumps(data) + '\n').encode('utf-8'))
+                    counts[name] += 1
+                    yield from _flush(writer)
+
+        for name in sorted(media):
+            with default_storage.open(name, 'rb') as source, archive.open(f'media/{name}', 'w') as entry:
+                for chunk in iter(lambda: source.read(64 * 1024), b''):
+                    entry.write(chunk)
+                    yield from _flush(writer)
+
+        archive.writestr('manifest.json', _dumps({
+            'format': BUNDLE_FORMAT,
+            'version': BUNDLE_VERSION,
+            'source_course_id': course.id,
+            'exported_at': timezone.now(),
+            'counts': counts,
+            'media': len(media),
+        }))
+    yield from _flush(writer)
+
+
+def _read_ndjson(archive, name):
+    """Iterate over JSON rows of an ndjson entry; BundleError if it is missing or malformed"""
+    try:
+        entry = archive.open(name)
+    except KeyError:
+        raise BundleError(f'Missing bundle entry: {name}')
+    with entry:
+        try:
+            for number, line in enumerate(io.TextIOWrapper(entry, encoding='utf-8'), start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise BundleError(f'{name}: malformed line {number}: {e}')
+                if not isinstance(row, dict):
+                    raise BundleError(f'{name}: line {number} is not a JSON object')
+                yield row
+        except UnicodeDecodeError:
+            raise BundleError(f'{name}: not a UTF-8 file')
+
+
+def _batched(rows, size=IMPORT_BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _get_category(ref):
+    if not ref:
+        return None
+    category, _ = Category.objects.get_or_create(
+        name=ref['name'],
+        defaults={'name_kz': ref.get('name_kz', ''), 'name_en': ref.get('name_en', '')},
+    )
+    return category
+
+
+def _fields(model, data, exclude=()):
+    """Keep only known concrete fields, drop the source id"""
+    allowed = {f.attname for f in model._meta.concrete_fields if not f.primary_key}
+    return {k: v for k, v in data.items() if k in allowed and k not in exclude}
+
+
+def _mapped_id(id_map, row, field, entry):
+    """New id of the row referenced by row[field]; BundleError if it is not in the bundle"""
+    try:
+        return id_map[row[field]]
+    except KeyError:
+        raise BundleError(f'{entry}: row {row.get("id")} references missing {field} {row.get(field)}')
+
+
+def _import_media(archive, media_base_url, saved):
+    """Copy media files into default_storage, return {old_path: new_url}"""
+    urls = {}
+    for info in archive.infolist():
+        if not info.filename.startswith('media/') or info.is_dir():
+            continue
+        name = info.filename[len('media/'):]
+        if default_storage.exists(name) and default_storage.size(name) == info.file_size:
+            new_name = name
+        else:
+            with archive.open(info) as source:
+                new_name = default_storage.save(name, File(source, name=name))
+            saved.append(new_name)
+        urls[name] = media_base_url + new_name
+    return urls
+
+
+def import_course_bundle(fileobj, media_base_url=None, status=None):
+    """
+    Импортировать курс из архива.
+
+    Args:
+        fileobj: Путь или файловый объект zip-архива
+        media_base_url: Префикс URL для скопированных медиафайлов (по умолчанию MEDIA_URL)
+        status: Переопределить статус курса (например, 'draft')
+
+    Returns:
+        tuple: (Course, counts)
+    """
+    if status and status not in dict(Course.STATUS_CHOICES):
+        raise BundleError(f'Unknown course status: {status}')
+    media_base_url = media_base_url or settings.MEDIA_URL
+    saved_media = []
+
+    try:
+        archive = zipfile.ZipFile(fileobj)
+    except zipfile.BadZipFile:
+        raise BundleError('File is not a zip archive')
+
+    with archive:
+        try:
+            manifest = json.loads(archive.read('manifest.json'))
+            course_data = json.loads(archive.read('course.json'))
+        except KeyError as e:
+            raise BundleError(f'Missing bundle entry: {e}')
+        if manifest.get('format') != BUNDLE_FORMAT or manifest.get('version') != BUNDLE_VERSION:
+            raise BundleError('Unsupported bundle format or version')
+
+        try:
+            media_urls = _import_media(archive, media_base_url, saved_media)
+            with transaction.atomic():
+                course, counts = _import_rows(archive, course_data, media_urls, status)
+        except Exception:
+            for name in saved_media:
+                default_storage.delete(name)
+            raise
+
+    return course, counts
+
+
+def _import_rows(archive, course_data, media_urls, status):
+    counts = {'tests': 0, 'questions': 0, 'modules': 0, 'lessons': 0}
+
+    categories = {}
+
+    def category_for(ref):
+        key = ref['name'] if ref else None
+        if key not in categories:
+            categories[key] = _get_category(ref)
+        return categories[key]
+
+    test_map = {}
+    for batch in _batched(_read_ndjson(archive, 'tests.ndjson')):
+        tests = [
+            Test(category=category_for(row.get('category')), **_fields(Test, row, exclude={'category_id'}))
+            for row in batch
+        ]
+        Test.objects.bulk_create(tests)
+        test_map.update({row['id']: test.id for row, test in zip(batch, tests)})
+        counts['tests'] += len(tests)
+
+    # bulk_create не отправляет post_save - индексируем новые тесты для поиска
+    search_entity = ENTITIES['tests']
+    reindex_queryset(search_entity, search_entity.get_queryset().filter(id__in=test_map.values()))
+
+    for batch in _batched(_read_ndjson(archive, 'questions.ndjson')):
+        questions = [
+            Question(**dict(_fields(Question, row), test_id=_mapped_id(test_map, row, 'test_id', 'questions.ndjson')))
+            for row in batch
+        ]
+        Question.objects.bulk_create(questions)
+        counts['questions'] += len(questions)
+
+    course_fields = _fields(Course, course_data, exclude={'category_id', 'total_required_lessons'})
+    course_fields['final_test_id'] = test_map.get(course_data.get('final_test_id'))
+    if status:
+        course_fields['status'] = status
+    course = Course.objects.create(category=category_for(course_data.get('category')), **course_fields)
+
+    with course_tree_batch(course.id):
+        module_map = {}
+        for batch in _batched(_read_ndjson(archive, 'modules.ndjson')):
+            modules = [Module(**dict(_fields(Module, row), course_id=course.id)) for row in batch]
+            Module.objects.bulk_create(modules)
+            module_map.update({row['id']: module.id for row, module in zip(batch, modules)})
+            counts['modules'] += len(modules)
+
+        for batch in _batched(_read_ndjson(archive, 'lessons.ndjson')):
+            lessons = []
+            for row in batch:
+                fields = _fields(Lesson, row)
+                fields['module_id'] = _mapped_id(module_map, row, 'module_id', 'lessons.ndjson')
+                fields['test_id'] = test_map.get(row.get('test_id'))
+                for field in MEDIA_URL_FIELDS:
+                    path = media_storage_path(fields.get(field))
+                    if path in media_urls:
+                        fields[field] = media_urls[path]
+                lessons.append(Lesson(**fields))
+            Lesson.objects.bulk_create(lessons)
+            counts['lessons'] += len(lessons)
+
+    return course, counts
+
@@ -0,0 +1,82 @@
+"""
+Copying courses with modules, lessons and linked tests (new language editions)
+"""
+from django.db import transaction
+
+from apps.core.utils import apply_translation
+from apps.tests.clone import clone_tests, copy_instance
+from apps.tests.models import Test
+from .models import Module, Lesson
+from .utils import course_tree_batch, get_course_test_ids
+
+
+def clone_course(course, language=None, translate=False, title=None):
+    """
+    Скопировать курс целиком одной транзакцией.
+
+    Копируются модули, уроки, итоговый тест и тесты уроков с вопросами
+    (bulk_create на каждую модель). Копия создается в статусе
+    'in_development'.
+
+    Args:
+        course: Исходный Course
+        language: Язык нового издания (None - как у исходного курса)
+        translate: Перенести поля _kz/_en языка language в базовые поля
+        title: Название копии (по умолчанию - как у исходного курса)
+
+    Returns:
+        tuple: (Course, counts)
+    """
+    with transaction.atomic():
+        test_map = clone_tests(
+            Test.objects.filter(id__in=list(get_course_test_ids(course))),
+            language=language,
+            translate=translate,
+        )
+
+        clone = copy_instance(
+            course,
+            status='in_development',
+            total_required_lessons=0,
+            final_test_id=test_map[course.final_test_id].id if course.final_test_id in test_map else None,
+        )
+        if language:
+            clone.language = language
+            if translate:
+                apply_translation(clone, ('title', 'description'), language)
+        if title:
+            clone.title = title
+        clone.save()
+
+        with course_tree_batch(clone.id):
+            modules = list(Module.objects.filter(course=course).order_by('order', 'id'))
+            module_clones = []
+            for module in modules:
+                module_clone = copy_instance(module, course_id=clone.id)
+                if language:
+                    module_clone.language = language
+                    if translate:
+                        apply_translation(module_clone, ('title', 'description'), language)
+                module_clones.append(module_clone)
+            Module.objects.bulk_create(module_clones)
+            module_map = {module.id: module_clone.id for module, module_clone in zip(modules, module_clones)}
+
+            lesson_clones = []
+            for lesson in Lesson.objects.filter(module__course=course).order_by('module_id', 'order', 'id').iterator():
+                lesson_clone = copy_instance(
+                    lesson,
+                    module_id=module_map[lesson.module_id],
+                    test_id=test_map[lesson.test_id].id if lesson.test_id in test_map else None,
+                )
+                if language:
+                    lesson_clone.language = language
+                    if translate:
+                        apply_translation(lesson_clone, ('title', 'description', 'content'), language)
+                lesson_clones.append(lesson_clone)
+            Lesson.objects.bulk_create(lesson_clones, batch_size=500)
+
+    return clone, {
+        'tests': len(test_map),
+        'modules': len(module_clones),
+        'lessons': len(lesson_clones),
+    }
@@ -0,0 +1,156 @@
+"""
+Learner dashboard: enrollments, final tests, protocols, certificates and
+notifications of one user in a fixed number of queries
+"""
+from django.db.models import Count, Q
+
+from apps.certificates.models import Certificate
+from apps.core.utils import get_multilingual_field_value
+from apps.exams.models import TestAttempt, ExtraAttemptRequest, AttemptQuota
+from apps.notifications.models import Notification
+from apps.protocols.models import Protocol
+from .models import CourseEnrollment
+
+# Статусы записи, при которых итоговый тест уже не ожидается
+FINAL_TEST_DONE_STATUSES = ('exam_passed', 'pending_pdek', 'completed', 'failed', 'annulled')
+
+# Статусы протокола, при которых он больше не требует действий
+CLOSED_PROTOCOL_STATUSES = ('signed_chairman', 'rejected', 'annulled')
+
+
+def _attempt_stats(user, test_ids):
+    """
+    Попытки пользователя по тестам.
+
+    Использовано и доступно попыток - из AttemptQuota (как при старте попытки);
+    для тестов без строки квоты счетчики берутся из таблиц попыток и запросов
+    (третий запрос только в этом случае).
+
+    Returns:
+        dict: {test_id: {'used', 'passed', 'in_progress', 'extra'}}
+    """
+    stats = {test_id: {'used': 0, 'passed': False, 'in_progress': False, 'extra': 0} for test_id in test_ids}
+    if not stats:
+        return stats
+
+    quotas = {
+        row['test_id']: row
+        for row in AttemptQuota.objects.filter(user=user, test_id__in=stats).values(
+            'test_id', 'attempts_used', 'extra_attempts'
+        )
+    }
+
+    attempts = TestAttempt.objects.filter(user=user, test_id__in=stats).values('test_id').annotate(
+        used=Count('id'),
+        passed=Count('id', filter=Q(passed=True)),
+        in_progress=Count('id', filter=Q(completed_at__isnull=True)),
+    ).order_by()
+    for row in attempts:
+        stats[row['test_id']].update(used=row['used'], passed=row['passed'] > 0, in_progress=row['in_progress'] > 0)
+
+    for test_id, quota in quotas.items():
+        stats[test_id].update(used=quota['attempts_used'], extra=quota['extra_attempts'])
+
+    missing = [test_id for test_id in stats if test_id not in quotas]
+    if missing:
+        extra = ExtraAttemptRequest.objects.filter(
+            user=user, test_id__in=missing, status='approved'
+        ).values('test_id').annotate(count=Count('id')).order_by()
+        for row in extra:
+            stats[row['test_id']]['extra'] = row['count']
+
+    return stats
+
+
+def get_learner_dashboard(user, lang='ru'):
+    """
+    Сводка для личного кабинета слушателя.
+
+    Число запросов не зависит от количества курсов: записи с курсами и
+    итоговыми тестами (1), квоты и попытки по итоговым тестам (2, только если
+    они есть; +1 для тестов без строки квоты), открытые протоколы (1),
+    сертификаты (1), непрочитанные уведомления (1).
+
+    Args:
+        user: Слушатель
+        lang: Язык названий курсов и тестов ('ru', 'kz', 'en')
+
+    Returns:
+        dict: enrollments, pending_final_tests, open_protocols, certificates,
+            unread_notifications
+    """
+    enrollments = list(
+        CourseEnrollment.objects.filter(user=user).select_related('course', 'course__final_test')
+    )
+
+    final_test_ids = {e.course.final_test_id for e in enrollments if e.course.final_test_id}
+    attempt_stats = _attempt_stats(user, final_test_ids)
+
+    enrollment_rows = []
+    pending_final_tests = []
+    for enrollment in enrollments:
+        course = enrollment.course
+        final_test = course.final_test
+        row = {
+            'id': enrollment.id,
+            'course_id': course.id,
+            'course_title': get_multilingual_field_value(course, 'title', lang),
+            'status': enrollment.status,
+            'progress': enrollment.progress,
+            'completed_lessons': enrollment.completed_lessons,
+            'total_required_lessons': course.total_required_lessons,
+            'enrolled_at': enrollment.enrolled_at,
+            'completed_at': enrollment.completed_at,
+            'final_test': None,
+        }
+
+        if final_test is not None:
+            stats = attempt_stats[final_test.id]
+            max_allowed = final_test.max_attempts + stats['extra']
+            row['final_test'] = {
+                'id': final_test.id,
+                'title': get_multilingual_field_value(final_test, 'title', lang),
+                'max_attempts': max_allowed,
+                'attempts_used': stats['used'],
+                'remaining_attempts': max(max_allowed - stats['used'], 0),
+                'passed': stats['passed'],
+                'in_progress': stats['in_progress'],
+            }
+            if (
+                final_test.is_active
+                and not stats['passed']
+                and enrollment.status not in FINAL_TEST_DONE_STATUSES
+            ):
+                pending_final_tests.append({'enrollment_id': enrollment.id, 'course_id': course.id, **row['final_test']})
+
+        enrollment_rows.append(row)
+
+    open_protocols = list(
+        Protocol.objects.filter(student=user).exclude(status__in=CLOSED_PROTOCOL_STATUSES).values(
+            'id', 'number', 'course_id', 'test_id', 'status', 'result', 'score', 'exam_date', 'created_at'
+        )
+    )
+
+    certificates = []
+    for certificate in Certificate.objects.filter(student=user).select_related('course').only(
+        'id', 'number', 'course', 'issued_at', 'valid_until', 'file', 'pdf_url',
+        'course__id', 'course__title', 'course__title_kz', 'course__title_en',
+    ):
+        certificates.append({
+            'id': certificate.id,
+            'number': certificate.number,
+            'course_id': certificate.course_id,
+            'course_title': get_multilingual_field_value(certificate.course, 'title', lang),
+            'issued_at': certificate.issued_at,
+            'valid_until': certificate.valid_until,
+            'has_file': bool(certificate.file),
+            'pdf_url': certificate.pdf_url,
+        })
+
+    return {
+        'enrollments': enrollment_rows,
+        'pending_final_tests': pending_final_tests,
+        'open_protocols': open_protocols,
+        'certificates': certificates,
+        'unread_notifications': Notification.objects.filter(user=user, read=False).count(),
+    }
@@ -0,0 +1,170 @@
+"""
+Bulk course enrollment: resolving users by ids, phones or uploaded files
+and inserting enrollments and notifications in batches
+"""
+import csv
+import io
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.accounts.models import User
+from apps.notifications.models import Notification
+from apps.notifications.utils import build_course_assigned_notification
+from .models import CourseEnrollment
+
+
+ENROLL_BATCH_SIZE = 500
+
+
+def normalize_phone(phone):
+    """Normalize phone number to 7XXXXXXXXXX format"""
+    normalized_phone = ''.join(filter(str.isdigit, str(phone)))
+    if normalized_phone.startswith('8'):
+        normalized_phone = '7' + normalized_phone[1:]
+    if not normalized_phone.startswith('7'):
+        normalized_phone = '7' + normalized_phone
+    return normalized_phone
+
+
+def parse_id_list(value):
+    """Accept list or comma-separated string of ids"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(',')
+    result = []
+    for item in value:
+        try:
+            result.append(int(str(item).strip()))
+        except (TypeError, ValueError):
+            continue
+    return result
+
+
+def parse_enrollment_file(uploaded_file):
+    """
+    Read user ids and phones from uploaded XLSX or CSV file.
+    
+    The first column of every row is used. Values with 10+ digits are treated as
+    phone numbers, shorter numeric values as user ids. Header and empty rows are skipped.
+    
+    Returns:
+        tuple: (user_ids, phones)
+    """
+    name = (uploaded_file.name or '').lower()
+    if name.endswith('.csv'):
+        text = uploaded_file.read().decode('utf-8-sig')
+        rows = csv.reader(io.StringIO(text))
+    else:
+        from openpyxl import load_workbook
+        wb = load_workbook(uploaded_file, read_only=True, data_only=True)
+        rows = wb.active.iter_rows(values_only=True)
+    
+    user_ids = []
+    phones = []
+    for row in rows:
+        if not row or row[0] is None:
+            continue
+        value = str(row[0]).strip()
+        if isinstance(row[0], float) and row[0].is_integer():
+            value = str(int(row[0]))
+        digits = value
+        for char in ' +-()':
+            digits = digits.replace(char, '')
+        if not digits.isdigit():
+            # Заголовок или нечисловое значение
+            continue
+        if len(digits) >= 10:
+            phones.append(normalize_phone(digits))
+        else:
+            user_ids.append(int(digits))
+    return user_ids, phones
+
+
+def resolve_users(user_ids=None, phones=None):
+    """
+    Resolve users by ids and phones in a single query.
+    
+    Returns:
+        tuple: (resolved user ids in request order, not found info dict)
+    """
+    user_ids = list(dict.fromkeys(user_ids or []))
+    phones = list(dict.fromkeys(normalize_phone(p) for p in (phones or [])))
+    if not user_ids and not phones:
+        return [], {'user_ids': [], 'phones': []}
+    
+    found = dict(
+        User.objects.filter(Q(id__in=user_ids) | Q(phone__in=phones)).values_list('id', 'phone')
+    )
+    found_phones = {phone: user_id for user_id, phone in found.items()}
+    
+    resolved = [uid for uid in user_ids if uid in found]
+    resolved += [found_phones[p] for p in phones if p in found_phones]
+    not_found = {
+        'user_ids': [uid for uid in user_ids if uid not in found],
+        'phones': [p for p in phones if p not in found_phones],
+    }
+    return list(dict.fromkeys(resolved)), not_found
+
+
+def enroll_users(course, user_ids=None, phones=None, progress_callback=None):
+    """
+    Enroll users into course with bulk_create.
+    
+    Enrollments are inserted in batches with ignore_conflicts=True, and
+    "course assigned" notifications are created in the same batch
+    (bulk_create does not fire the post_save signal) only for the rows this
+    batch actually inserted: rows skipped as conflicts with a concurrent
+    enrollment are counted as already enrolled.
+    
+    Args:
+        course: Course instance
+        user_ids: List of user ids
+        phones: List of phone numbers
+        progress_callback: Optional callable(processed_count)
+        
+    Returns:
+        dict: enrolled (list of new user ids), already_enrolled count, not_found
+    """
+    resolved, not_found = resolve_users(user_ids, phones)
+    
+    enrolled = []
+    already_enrolled = 0
+    for start in range(0, len(resolved), ENROLL_BATCH_SIZE):
+        batch = resolved[start:start + ENROLL_BATCH_SIZE]
+        existing = set(
+            CourseEnrollment.objects.filter(course=course, user_id__in=batch).values_list('user_id', flat=True)
+        )
+        new_ids = [uid for uid in batch if uid not in existing]
+        
+        created_ids = []
+        if new_ids:
+            with transaction.atomic():
+                batch_start = timezone.now()
+                CourseEnrollment.objects.bulk_create(
+                    [CourseEnrollment(user_id=uid, course=course, status='assigned') for uid in new_ids],
+                    ignore_conflicts=True
+                )
+                # Строки, пропущенные из-за конфликта (параллельное зачисление), не уведомляем
+                created = set(
+                    CourseEnrollment.objects.filter(
+                        course=course, user_id__in=new_ids, enrolled_at__gte=batch_start
+                    ).values_list('user_id', flat=True)
+                )
+                created_ids = [uid for uid in new_ids if uid in created]
+                Notification.objects.bulk_create(
+                    [build_course_assigned_notification(uid, course) for uid in created_ids]
+                )
+            enrolled.extend(created_ids)
+        already_enrolled += len(batch) - len(created_ids)
+        
+        if progress_callback:
+            progress_callback(start + len(batch))
+    
+    return {
+        'enrolled': enrolled,
+        'already_enrolled': already_enrolled,
+        'not_found': not_found,
+    }
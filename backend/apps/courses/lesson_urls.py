@@ -1,7 +1,11 @@
 from django.urls import path
+from django.views.decorators.gzip import gzip_page
 from .views import LessonViewSet
 
 urlpatterns = [
+    path('sync/', LessonViewSet.as_view({'post': 'sync'}), name='lesson-sync'),
+    path('<int:pk>/content/', gzip_page(LessonViewSet.as_view({'get': 'content'})), name='lesson-content'),
+    path('<int:pk>/heartbeat/', LessonViewSet.as_view({'post': 'heartbeat'}), name='lesson-heartbeat'),
     path('<int:pk>/complete/', LessonViewSet.as_view({'post': 'complete'}), name='lesson-complete'),
 ]
 
@@ -0,0 +1,32 @@
+"""
+Management command to export a course into a bundle (zip)
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.courses.models import Course
+from apps.courses.bundle import iter_course_bundle
+
+
+class Command(BaseCommand):
+    help = 'Export course with modules, lessons, linked tests and media into a zip bundle'
+
+    def add_arguments(self, parser):
+        parser.add_argument('course_id', type=int, help='Course ID')
+        parser.add_argument('output', type=str, help='Output zip file path')
+        parser.add_argument(
+            '--no-media',
+            action='store_true',
+            help='Do not include media files referenced by lessons',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            course = Course.objects.select_related('category').get(pk=options['course_id'])
+        except Course.DoesNotExist:
+            raise CommandError(f'Course {options["course_id"]} not found')
+
+        with open(options['output'], 'wb') as output:
+            for chunk in iter_course_bundle(course, include_media=not options['no_media']):
+                output.write(chunk)
+
+        self.stdout.write(self.style.SUCCESS(f'Exported course "{course.title}" to {options["output"]}'))
@@ -0,0 +1,17 @@
+"""
+Management command to write buffered lesson heartbeats to the database
+"""
+from django.core.management.base import BaseCommand
+
+from apps.courses.progress import lesson_heartbeats
+
+
+class Command(BaseCommand):
+    help = 'Flush buffered lesson heartbeats (watch time, player position) to LessonProgress'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Buffered items per write batch')
+
+    def handle(self, *args, **options):
+        count = lesson_heartbeats.flush(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Flushed {count} lesson heartbeat records'))
@@ -0,0 +1,39 @@
+"""
+Management command to import a course from a bundle created by export_course
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.courses.bundle import import_course_bundle, BundleError
+
+
+class Command(BaseCommand):
+    help = 'Import course from a zip bundle (creates a new course with new ids)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('bundle', type=str, help='Path to zip bundle')
+        parser.add_argument(
+            '--status',
+            type=str,
+            help='Override course status, e.g. draft',
+        )
+        parser.add_argument(
+            '--media-base-url',
+            type=str,
+            help='URL prefix for imported media files (default: MEDIA_URL), e.g. https://lms.example.kz/media/',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            course, counts = import_course_bundle(
+                options['bundle'],
+                media_base_url=options['media_base_url'],
+                status=options['status'],
+            )
+        except (BundleError, FileNotFoundError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported course "{course.title}" (id={course.id}): '
+            f'{counts["modules"]} modules, {counts["lessons"]} lessons, '
+            f'{counts["tests"]} tests, {counts["questions"]} questions'
+        ))
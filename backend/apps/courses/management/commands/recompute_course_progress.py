@@ -0,0 +1,30 @@
+"""
+Management command to recalculate enrollment progress of courses
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.courses.models import Course
+from apps.courses.progress import recompute_course_progress
+from apps.courses.utils import refresh_total_required_lessons
+
+
+class Command(BaseCommand):
+    help = 'Recalculate completed lessons and progress of all enrollments of the given courses (or all courses)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('course_ids', nargs='*', type=int, help='Course IDs (default: all courses)')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Enrollments per bulk_update batch')
+
+    def handle(self, *args, **options):
+        course_ids = options['course_ids'] or list(Course.objects.values_list('id', flat=True))
+        missing = set(course_ids) - set(Course.objects.filter(id__in=course_ids).values_list('id', flat=True))
+        if missing:
+            raise CommandError(f'Courses not found: {", ".join(map(str, sorted(missing)))}')
+
+        for course_id in course_ids:
+            refresh_total_required_lessons(course_id)
+            result = recompute_course_progress(course_id, batch_size=options['batch_size'])
+            self.stdout.write(
+                f"Course {course_id}: {result['updated']} of {result['enrollments']} enrollments updated"
+            )
+        self.stdout.write(self.style.SUCCESS(f'Recomputed progress of {len(course_ids)} courses'))
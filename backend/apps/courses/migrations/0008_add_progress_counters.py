@@ -0,0 +1,43 @@
+# Generated manually for denormalized progress counters
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_counters(apps, schema_editor):
+    Course = apps.get_model('courses', 'Course')
+    Lesson = apps.get_model('courses', 'Lesson')
+    CourseEnrollment = apps.get_model('courses', 'CourseEnrollment')
+    LessonProgress = apps.get_model('courses', 'LessonProgress')
+    
+    totals = Lesson.objects.filter(required=True).values('module__course').annotate(total=Count('id'))
+    for row in totals:
+        Course.objects.filter(pk=row['module__course']).update(total_required_lessons=row['total'])
+    
+    completed = LessonProgress.objects.filter(
+        completed=True,
+        lesson__required=True,
+    ).values('enrollment').annotate(done=Count('id'))
+    for row in completed:
+        CourseEnrollment.objects.filter(pk=row['enrollment']).update(completed_lessons=row['done'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0007_add_is_standalone_test'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='total_required_lessons',
+            field=models.IntegerField(default=0, editable=False, help_text='Number of required lessons (maintained automatically)'),
+        ),
+        migrations.AddField(
+            model_name='courseenrollment',
+            name='completed_lessons',
+            field=models.IntegerField(default=0, editable=False, help_text='Number of completed required lessons (maintained automatically)'),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated manually to replace Lesson.test_id string with a foreign key
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_lesson_tests(apps, schema_editor):
+    Lesson = apps.get_model('courses', 'Lesson')
+    Test = apps.get_model('tests', 'Test')
+    
+    legacy = {}
+    rows = Lesson.objects.exclude(legacy_test_id__isnull=True).exclude(legacy_test_id='')
+    for lesson_id, value in rows.values_list('id', 'legacy_test_id'):
+        value = value.strip()
+        if value.isdigit():
+            legacy.setdefault(int(value), []).append(lesson_id)
+    
+    # Ссылки на несуществующие тесты не переносятся
+    existing = set(Test.objects.filter(id__in=list(legacy)).values_list('id', flat=True))
+    for test_id in existing:
+        Lesson.objects.filter(id__in=legacy[test_id]).update(test_id=test_id)
+
+
+def restore_legacy_test_ids(apps, schema_editor):
+    Lesson = apps.get_model('courses', 'Lesson')
+    
+    for lesson_id, test_id in Lesson.objects.filter(test__isnull=False).values_list('id', 'test_id'):
+        Lesson.objects.filter(id=lesson_id).update(legacy_test_id=str(test_id))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tests', '0009_add_is_standalone'),
+        ('courses', '0008_add_progress_counters'),
+    ]
+
+    operations = [
+        # Освобождаем колонку test_id для внешнего ключа
+        migrations.RenameField(
+            model_name='lesson',
+            old_name='test_id',
+            new_name='legacy_test_id',
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='test',
+            field=models.ForeignKey(blank=True, help_text='Test for quiz type', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='lessons', to='tests.test'),
+        ),
+        migrations.RunPython(backfill_lesson_tests, restore_legacy_test_ids),
+        migrations.RemoveField(
+            model_name='lesson',
+            name='legacy_test_id',
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated manually for offline course packages
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_backgroundjob'),
+        ('courses', '0009_lesson_test_fk'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CoursePackage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('language', models.CharField(choices=[('ru', 'Russian'), ('kz', 'Kazakh'), ('en', 'English')], max_length=2)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('building', 'Building'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('tree_version', models.CharField(blank=True, help_text='Fingerprint of the course tree the package is built for', max_length=64)),
+                ('file', models.FileField(blank=True, null=True, upload_to='course_packages/')),
+                ('size', models.BigIntegerField(default=0, help_text='Package size in bytes')),
+                ('error', models.TextField(blank=True)),
+                ('built_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='packages', to='courses.course')),
+                ('job', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.backgroundjob')),
+            ],
+            options={
+                'db_table': 'course_packages',
+                'unique_together': {('course', 'language')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated manually for lesson heartbeat aggregation
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0010_coursepackage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lessonprogress',
+            name='time_spent',
+            field=models.PositiveIntegerField(default=0, help_text='Accumulated watch/read time in seconds'),
+        ),
+        migrations.AddField(
+            model_name='lessonprogress',
+            name='last_position',
+            field=models.PositiveIntegerField(default=0, help_text='Last player position in seconds (resume point)'),
+        ),
+        migrations.AddField(
+            model_name='lessonprogress',
+            name='last_activity_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -73,6 +73,7 @@ class Course(models.Model):
     language = models.CharField(max_length=2, choices=LANGUAGE_CHOICES, default='ru', help_text='Language of the course content')
     final_test = models.ForeignKey('tests.Test', related_name='final_courses', on_delete=models.SET_NULL, null=True, blank=True, help_text='Final test for course completion')
     is_standalone_test = models.BooleanField(default=False, help_text='If True, this course is displayed as a standalone test on Training Programs page')
+    total_required_lessons = models.IntegerField(default=0, editable=False, help_text='Number of required lessons (maintained automatically)')
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -147,7 +148,7 @@ class Lesson(models.Model):
     video_url = models.URLField(blank=True, null=True)
     thumbnail_url = models.URLField(blank=True, null=True)
     pdf_url = models.URLField(blank=True, null=True)
-    test_id = models.CharField(max_length=100, blank=True, null=True, help_text='Test ID for quiz type')
+    test = models.ForeignKey('tests.Test', related_name='lessons', on_delete=models.SET_NULL, null=True, blank=True, help_text='Test for quiz type')
     duration = models.IntegerField(default=0, help_text='Duration in minutes')
     order = models.IntegerField(default=0)
     required = models.BooleanField(default=True)
@@ -185,6 +186,7 @@ class CourseEnrollment(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='enrollments', on_delete=models.CASCADE)
     course = models.ForeignKey(Course, related_name='enrollments', on_delete=models.CASCADE)
     progress = models.IntegerField(default=0, help_text='Progress percentage')
+    completed_lessons = models.IntegerField(default=0, editable=False, help_text='Number of completed required lessons (maintained automatically)')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='assigned')
     enrolled_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True)
@@ -205,6 +207,9 @@ class LessonProgress(models.Model):
     lesson = models.ForeignKey(Lesson, related_name='progress', on_delete=models.CASCADE)
     completed = models.BooleanField(default=False)
     completed_at = models.DateTimeField(null=True, blank=True)
+    time_spent = models.PositiveIntegerField(default=0, help_text='Accumulated watch/read time in seconds')
+    last_position = models.PositiveIntegerField(default=0, help_text='Last player position in seconds (resume point)')
+    last_activity_at = models.DateTimeField(null=True, blank=True)
     
     class Meta:
         db_table = 'lesson_progress'
@@ -281,3 +286,34 @@ class CourseCompletionVerification(models.Model):
         self.save()
         return True
 
+
+
+class CoursePackage(models.Model):
+    """Offline course package: zip with lesson texts, downloadable PDFs and a manifest (one per language)"""
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('building', 'Building'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
+    
+    course = models.ForeignKey(Course, related_name='packages', on_delete=models.CASCADE)
+    language = models.CharField(max_length=2, choices=Course.LANGUAGE_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    tree_version = models.CharField(max_length=64, blank=True, help_text='Fingerprint of the course tree the package is built for')
+    file = models.FileField(upload_to='course_packages/', null=True, blank=True)
+    size = models.BigIntegerField(default=0, help_text='Package size in bytes')
+    job = models.ForeignKey('core.BackgroundJob', related_name='+', on_delete=models.SET_NULL, null=True, blank=True)
+    error = models.TextField(blank=True)
+    built_at = models.DateTimeField(null=True, blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'course_packages'
+        unique_together = ['course', 'language']
+    
+    def __str__(self):
+        return f"{self.course.title} ({self.language}) - {self.get_status_display()}"
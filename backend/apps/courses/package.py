@@ -0,0 +1,189 @@
+"""
+Offline course packages for learners
+
+A package is a zip archive of one course in one language:
+    manifest.json      - course, modules and lesson summaries, paths of bundled files
+    lessons/<id>.json  - lesson text resolved to the package language
+    files/<id>/<name>  - PDFs of lessons with allow_download
+
+The archive is built once by a background job, stored in default_storage
+(CoursePackage.file) and rebuilt only when the course tree fingerprint
+changes. Progress made offline is sent back through POST /api/lessons/sync/.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import zipfile
+from datetime import timedelta
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from apps.core.jobs import start_job
+from apps.core.utils import resolve_localized_fields
+from .bundle import media_storage_path
+from .models import Module, Lesson, CoursePackage
+from .utils import get_course_tree
+
+PACKAGE_FORMAT = 'unicover-offline-package'
+PACKAGE_VERSION = 1
+SYNC_ENDPOINT = '/api/lessons/sync/'
+
+# Сборка, не завершившаяся за это время (например, упал воркер), запускается заново
+BUILD_TIMEOUT = timedelta(hours=1)
+# Неудачная сборка того же дерева повторяется не раньше этого времени (или по явному retry)
+FAILED_RETRY_AFTER = timedelta(hours=1)
+
+
+def get_package_version(course):
+    """
+    Отпечаток дерева курса для офлайн-пакета.
+
+    Хранится вместе с файлом пакета, поэтому строится по данным БД, а не по
+    версии дерева в кэше (случайный токен, который теряется при вытеснении).
+    """
+    modules = Module.objects.filter(course=course).aggregate(count=Count('id'), changed=Max('updated_at'))
+    lessons = Lesson.objects.filter(module__course=course).aggregate(count=Count('id'), changed=Max('updated_at'))
+    raw = '|'.join(str(value) for value in (
+        course.updated_at.isoformat(),
+        modules['count'], modules['changed'],
+        lessons['count'], lessons['changed'],
+    ))
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def request_course_package(course, language, user=None, retry=False):
+    """
+    Получить актуальный пакет курса или запустить его сборку.
+
+    Неудачная сборка при неизменном дереве не запускается заново при каждом
+    запросе: пакет остается в статусе 'failed' до изменения дерева, истечения
+    FAILED_RETRY_AFTER или явного retry.
+
+    Returns:
+        tuple: (CoursePackage, ready) - ready=False, пока пакет собирается
+            или если сборка не удалась (status='failed')
+    """
+    from .tasks import build_course_package_task
+
+    version = get_package_version(course)
+    package, _ = CoursePackage.objects.get_or_create(course=course, language=language)
+
+    if package.tree_version == version:
+        if package.status == 'ready' and package.file:
+            return package, True
+        if package.status in ('pending', 'building') and package.updated_at > timezone.now() - BUILD_TIMEOUT:
+            return package, False
+        if package.status == 'failed' and not retry and package.updated_at > timezone.now() - FAILED_RETRY_AFTER:
+            return package, False
+
+    # Условное обновление: сборку запускает только один из параллельных запросов
+    claimed = CoursePackage.objects.filter(
+        pk=package.pk,
+        status=package.status,
+        tree_version=package.tree_version,
+        updated_at=package.updated_at,
+    ).update(status='pending', tree_version=version, error='', updated_at=timezone.now())
+    if claimed:
+        job = start_job('course_package', build_course_package_task, params={'package_id': package.pk}, user=user)
+        CoursePackage.objects.filter(pk=package.pk).update(job=job)
+
+    package.refresh_from_db()
+    return package, False
+
+
+def _dumps(data):
+    return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False)
+
+
+def build_course_package(package, progress_callback=None):
+    """
+    Собрать zip-архив пакета и сохранить его в хранилище.
+
+    Args:
+        package: CoursePackage
+        progress_callback: callable(processed) - количество обработанных уроков
+
+    Returns:
+        dict: {'lessons': int, 'files': int, 'size': int}
+    """
+    course = package.course
+    version = get_package_version(course)
+    CoursePackage.objects.filter(pk=package.pk).update(status='building', updated_at=timezone.now())
+
+    try:
+        modules = get_course_tree(course, package.language, full=True)
+        course_data = resolve_localized_fields(
+            {'id': course.id, 'title': course.title, 'title_kz': course.title_kz, 'title_en': course.title_en,
+             'description': course.description, 'description_kz': course.description_kz,
+             'description_en': course.description_en},
+            ('title', 'description'),
+            package.language,
+        )
+        lessons_count = 0
+        files_count = 0
+
+        with tempfile.TemporaryFile() as tmp:
+            with zipfile.ZipFile(tmp, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+                outline = []
+                for module in modules:
+                    items = []
+                    for lesson in module['lessons']:
+                        item = dict(lesson)
+                        content = item.pop('content', '')
+                        if content:
+                            item['content_path'] = f"lessons/{lesson['id']}.json"
+                            archive.writestr(item['content_path'], _dumps({'id': lesson['id'], 'content': content}))
+
+                        path = media_storage_path(lesson.get('pdf_url')) if lesson.get('allow_download') else None
+                        if path and default_storage.exists(path):
+                            item['file_path'] = f"files/{lesson['id']}/{os.path.basename(path)}"
+                            with default_storage.open(path, 'rb') as source, archive.open(item['file_path'], 'w') as entry:
+                                for chunk in iter(lambda: source.read(64 * 1024), b''):
+                                    entry.write(chunk)
+                            files_count += 1
+
+                        items.append(item)
+                        lessons_count += 1
+                        if progress_callback:
+                            progress_callback(lessons_count)
+                    outline.append(dict(module, lessons=items))
+
+                archive.writestr('manifest.json', _dumps({
+                    'format': PACKAGE_FORMAT,
+                    'version': PACKAGE_VERSION,
+                    'language': package.language,
+                    'tree_version': version,
+                    'built_at': timezone.now(),
+                    'course': course_data,
+                    'modules': outline,
+                    'sync': {'url': SYNC_ENDPOINT, 'max_events': 500},
+                }))
+
+            old_name = package.file.name if package.file else None
+            tmp.seek(0)
+            package.file.save(f'course-{course.id}-{package.language}.zip', File(tmp), save=False)
+            size = package.file.size
+    except Exception as e:
+        CoursePackage.objects.filter(pk=package.pk).update(
+            status='failed', error=str(e), updated_at=timezone.now()
+        )
+        raise
+
+    CoursePackage.objects.filter(pk=package.pk).update(
+        status='ready',
+        tree_version=version,
+        file=package.file.name,
+        size=size,
+        error='',
+        built_at=timezone.now(),
+        updated_at=timezone.now(),
+    )
+    if old_name and old_name != package.file.name:
+        default_storage.delete(old_name)
+
+    return {'lessons': lessons_count, 'files': files_count, 'size': size}
@@ -0,0 +1,286 @@
+"""
+Batch synchronization of lesson progress for offline clients
+and write-behind aggregation of player heartbeats
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from apps.core.write_behind import WriteBehindBuffer, is_shared_cache
+from .models import Course, Lesson, CourseEnrollment, LessonProgress
+from .utils import calculate_progress
+
+
+def sync_lesson_progress(user, events):
+    """
+    Применить пакет событий завершения уроков пользователя.
+
+    События могут относиться к разным курсам. LessonProgress создается и
+    обновляется пакетно, прогресс каждой затронутой записи на курс
+    пересчитывается один раз агрегирующим запросом (повторная отправка
+    того же пакета безопасна).
+
+    Args:
+        user: Пользователь
+        events: [{'lesson_id': int, 'completed_at': datetime | None}]
+
+    Returns:
+        dict: {'lessons': {lesson_id: status}, 'enrollments': [...]}
+    """
+    now = timezone.now()
+
+    # Одно событие на урок: самое раннее время завершения, будущее время не принимаем
+    completed_at_by_lesson = {}
+    for event in events:
+        completed_at = min(event.get('completed_at') or now, now)
+        lesson_id = event['lesson_id']
+        if lesson_id not in completed_at_by_lesson or completed_at < completed_at_by_lesson[lesson_id]:
+            completed_at_by_lesson[lesson_id] = completed_at
+
+    lesson_courses = dict(
+        Lesson.objects.filter(id__in=completed_at_by_lesson).values_list('id', 'module__course_id')
+    )
+    enrollments = {
+        e.course_id: e
+        for e in CourseEnrollment.objects.filter(
+            user=user,
+            course_id__in=set(lesson_courses.values())
+        ).select_related('course')
+    }
+
+    statuses = {}
+    enrollment_by_lesson = {}
+    for lesson_id in completed_at_by_lesson:
+        if lesson_id not in lesson_courses:
+            statuses[lesson_id] = 'not_found'
+        elif lesson_courses[lesson_id] not in enrollments:
+            statuses[lesson_id] = 'not_enrolled'
+        else:
+            enrollment_by_lesson[lesson_id] = enrollments[lesson_courses[lesson_id]]
+
+    if not enrollment_by_lesson:
+        return {'lessons': statuses, 'enrollments': []}
+
+    affected = {e.id: e for e in enrollment_by_lesson.values()}
+    existing = {
+        p.lesson_id: p
+        for p in LessonProgress.objects.filter(
+            enrollment_id__in=affected,
+            lesson_id__in=enrollment_by_lesson
+        )
+    }
+
+    to_create = []
+    to_update = []
+    for lesson_id, enrollment in enrollment_by_lesson.items():
+        progress = existing.get(lesson_id)
+        if progress is None:
+            to_create.append(LessonProgress(
+                enrollment=enrollment,
+                lesson_id=lesson_id,
+                completed=True,
+                completed_at=completed_at_by_lesson[lesson_id],
+            ))
+            statuses[lesson_id] = 'completed'
+        elif not progress.completed:
+            progress.completed = True
+            progress.completed_at = completed_at_by_lesson[lesson_id]
+            to_update.append(progress)
+            statuses[lesson_id] = 'completed'
+        else:
+            statuses[lesson_id] = 'already_completed'
+
+    with transaction.atomic():
+        if to_create:
+            # Параллельная отправка того же урока не приводит к ошибке уникальности
+            LessonProgress.objects.bulk_create(to_create, ignore_conflicts=True)
+        if to_update:
+            LessonProgress.objects.bulk_update(to_update, ['completed', 'completed_at'])
+
+        # Счетчики пересчитываются по фактическим данным, а не инкрементом
+        completed = dict(
+            LessonProgress.objects.filter(
+                enrollment_id__in=affected,
+                completed=True,
+                lesson__required=True,
+            ).values('enrollment_id').annotate(done=Count('id')).values_list('enrollment_id', 'done')
+        )
+        for enrollment in affected.values():
+            enrollment.completed_lessons = completed.get(enrollment.id, 0)
+            enrollment.progress = calculate_progress(
+                enrollment.completed_lessons,
+                enrollment.course.total_required_lessons
+            )
+        CourseEnrollment.objects.bulk_update(affected.values(), ['completed_lessons', 'progress'])
+
+    return {
+        'lessons': statuses,
+        'enrollments': [
+            {
+                'enrollment_id': enrollment.id,
+                'course_id': enrollment.course_id,
+                'progress': enrollment.progress,
+                'completed_lessons': enrollment.completed_lessons,
+                'total_lessons': enrollment.course.total_required_lessons,
+                'all_lessons_completed': (
+                    enrollment.course.total_required_lessons > 0 and
+                    enrollment.completed_lessons >= enrollment.course.total_required_lessons
+                ),
+            }
+            for enrollment in affected.values()
+        ],
+    }
+
+
+RECOMPUTE_BATCH_SIZE = 2000
+
+
+def recompute_course_progress(course_id, batch_size=RECOMPUTE_BATCH_SIZE):
+    """
+    Пересчитать completed_lessons и progress всех зачислений курса.
+
+    Один группирующий запрос по LessonProgress (завершенные обязательные
+    уроки этого курса) и bulk_update только изменившихся записей.
+    Вызывается после изменения структуры курса (см. utils.schedule_progress_recompute).
+
+    Returns:
+        dict: {'enrollments': int, 'updated': int}
+    """
+    total = Course.objects.filter(pk=course_id).values_list('total_required_lessons', flat=True).first()
+    if total is None:
+        return {'enrollments': 0, 'updated': 0}
+
+    completed = dict(
+        LessonProgress.objects.filter(
+            enrollment__course_id=course_id,
+            completed=True,
+            lesson__required=True,
+            lesson__module__course_id=course_id,
+        ).values('enrollment_id').annotate(done=Count('id')).values_list('enrollment_id', 'done')
+    )
+
+    count = 0
+    changed = []
+    enrollments = CourseEnrollment.objects.filter(course_id=course_id).only('id', 'completed_lessons', 'progress')
+    for enrollment in enrollments.iterator(chunk_size=batch_size):
+        count += 1
+        done = completed.get(enrollment.id, 0)
+        progress = calculate_progress(done, total)
+        if enrollment.completed_lessons != done or enrollment.progress != progress:
+            enrollment.completed_lessons = done
+            enrollment.progress = progress
+            changed.append(enrollment)
+
+    if changed:
+        CourseEnrollment.objects.bulk_update(changed, ['completed_lessons', 'progress'], batch_size=batch_size)
+    return {'enrollments': count, 'updated': len(changed)}
+
+
+def _write_heartbeats(items):
+    """
+    Записать накопленные heartbeat'ы в LessonProgress (обработчик буфера).
+
+    items: {'<user_id>:<lesson_id>': {'counters': {'seconds': int}, 'values': {'position': int, 'at': str}}}
+    Уроки без track_progress и уроки курсов, на которые пользователь не
+    зачислен, пропускаются.
+    """
+    parsed = {}
+    for key, item in items.items():
+        user_id, lesson_id = (int(part) for part in key.split(':'))
+        parsed[(user_id, lesson_id)] = item
+
+    lesson_courses = dict(
+        Lesson.objects.filter(
+            id__in={lesson_id for _, lesson_id in parsed},
+            track_progress=True,
+        ).values_list('id', 'module__course_id')
+    )
+    enrollment_ids = {
+        (user_id, course_id): enrollment_id
+        for enrollment_id, user_id, course_id in CourseEnrollment.objects.filter(
+            user_id__in={user_id for user_id, _ in parsed},
+            course_id__in=set(lesson_courses.values()),
+        ).values_list('id', 'user_id', 'course_id')
+    }
+
+    updates = {}
+    for (user_id, lesson_id), item in parsed.items():
+        enrollment_id = enrollment_ids.get((user_id, lesson_courses.get(lesson_id)))
+        if enrollment_id is not None:
+            updates[(enrollment_id, lesson_id)] = item
+    if not updates:
+        return
+
+    with transaction.atomic():
+        existing = set(
+            LessonProgress.objects.filter(
+                enrollment_id__in={enrollment_id for enrollment_id, _ in updates},
+                lesson_id__in={lesson_id for _, lesson_id in updates},
+            ).values_list('enrollment_id', 'lesson_id')
+        )
+        LessonProgress.objects.bulk_create(
+            [LessonProgress(enrollment_id=e, lesson_id=l) for e, l in updates if (e, l) not in existing],
+            ignore_conflicts=True,
+        )
+
+        rows = [
+            progress
+            for progress in LessonProgress.objects.filter(
+                enrollment_id__in={enrollment_id for enrollment_id, _ in updates},
+                lesson_id__in={lesson_id for _, lesson_id in updates},
+            ).only('id', 'enrollment_id', 'lesson_id', 'last_position', 'last_activity_at')
+            if (progress.enrollment_id, progress.lesson_id) in updates
+        ]
+        for progress in rows:
+            item = updates[(progress.enrollment_id, progress.lesson_id)]
+            # Время прибавляется в БД: параллельная запись из другого источника не теряется
+            progress.time_spent = F('time_spent') + item['counters'].get('seconds', 0)
+            values = item['values'] or {}
+            if 'position' in values:
+                progress.last_position = values['position']
+            if values.get('at'):
+                progress.last_activity_at = parse_datetime(values['at'])
+        LessonProgress.objects.bulk_update(rows, ['time_spent', 'last_position', 'last_activity_at'])
+
+
+lesson_heartbeats = WriteBehindBuffer('lesson_heartbeat', _write_heartbeats, counters=('seconds',))
+
+
+def record_lesson_heartbeat(user, lesson_id, position=None, elapsed=0):
+    """
+    Учесть тик плеера: время просмотра и позицию.
+
+    Запись только в кэш; в LessonProgress данные попадают пакетно
+    (periodic task flush_lesson_heartbeats_task, команда flush_lesson_heartbeats
+    или запись по интервалу при очередном heartbeat).
+
+    Args:
+        user: Пользователь
+        lesson_id: Id урока
+        position: Позиция плеера в секундах (None - не менять)
+        elapsed: Секунды с предыдущего heartbeat (ограничиваются LESSON_HEARTBEAT_MAX_ELAPSED)
+    """
+    key = f'{user.id}:{lesson_id}'
+    values = None
+    if position is not None:
+        values = {'position': position, 'at': timezone.now().isoformat()}
+    elapsed = max(0, min(elapsed, settings.LESSON_HEARTBEAT_MAX_ELAPSED))
+    lesson_heartbeats.add(key, counters={'seconds': elapsed}, values=values)
+    lesson_heartbeats.flush_if_due()
+
+
+def get_pending_heartbeats(user, lesson_ids):
+    """
+    Еще не записанные в БД секунды и позиции уроков (для точки возобновления).
+
+    Без общего кэша буфер процесса может быть старее БД - тогда пусто.
+
+    Returns:
+        dict: {lesson_id: {'counters': {'seconds': ...}, 'values': {...} или None}}
+    """
+    if not lesson_ids or not is_shared_cache():
+        return {}
+    keys = {f'{user.id}:{lesson_id}': lesson_id for lesson_id in lesson_ids}
+    return {keys[key]: item for key, item in lesson_heartbeats.get_many(list(keys)).items()}
@@ -1,27 +1,103 @@
 from rest_framework import serializers
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
 from .models import Category, Course, Module, Lesson, CourseEnrollment, LessonProgress, CourseCompletionVerification
 from apps.accounts.serializers import UserSerializer
+from apps.core.serializers import LocalizedFieldsMixin, ReorderSerializer
+from apps.tests.models import Test
+from .utils import get_course_tree, get_category_counts, course_tree_batch
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(LocalizedFieldsMixin, serializers.ModelSerializer):
     """Category serializer"""
-    courses_count = serializers.IntegerField(read_only=True, source='courses.count')
+    localized_fields = ('name',)
+    courses_count = serializers.SerializerMethodField()
+    course_counts = serializers.SerializerMethodField()
+    tests_count = serializers.SerializerMethodField()
     
     class Meta:
         model = Category
         fields = [
             'id', 'name', 'name_kz', 'name_en', 'description', 'icon',
-            'order', 'is_active', 'courses_count', 'created_at', 'updated_at'
+            'order', 'is_active', 'courses_count', 'course_counts', 'tests_count',
+            'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at', 'courses_count']
+        read_only_fields = ['id', 'created_at', 'updated_at', 'courses_count', 'course_counts', 'tests_count']
+    
+    def _get_counts(self, obj):
+        # Счетчики всех категорий считаются одним группирующим запросом (и кэшируются),
+        # а не COUNT на каждую категорию, в том числе во вложенных сериализаторах курсов/тестов
+        counts = self.context.get('_category_counts')
+        if counts is None:
+            counts = self.context['_category_counts'] = get_category_counts()
+        return counts.get(obj.id, {})
+    
+    def get_courses_count(self, obj):
+        return self._get_counts(obj).get('courses_count', 0)
+    
+    def get_course_counts(self, obj):
+        counts = self._get_counts(obj)
+        return {
+            'by_status': counts.get('courses_by_status', {}),
+            'by_language': counts.get('courses_by_language', {}),
+            'published_by_language': counts.get('published_by_language', {}),
+        }
+    
+    def get_tests_count(self, obj):
+        return self._get_counts(obj).get('tests_count', 0)
+
 
+class LessonTestIdField(serializers.PrimaryKeyRelatedField):
+    """
+    Lesson.test exposed under the legacy `test_id` key.
+    
+    Frontend works with test ids as strings, so the id is returned as a string;
+    on input strings, integers, empty string and null are accepted.
+    """
+    
+    def to_internal_value(self, data):
+        if data == '':
+            return None
+        return super().to_internal_value(data)
+    
+    def to_representation(self, value):
+        return str(value.pk)
 
-class LessonSerializer(serializers.ModelSerializer):
-    """Lesson serializer"""
+
+class LessonSummarySerializer(LocalizedFieldsMixin, serializers.ModelSerializer):
+    """
+    Lesson without text bodies (content, content_kz, content_en).
+    
+    Used in course outlines; the body is loaded separately from
+    /api/lessons/{id}/content/.
+    """
+    localized_fields = ('title', 'description')
     completed = serializers.BooleanField(read_only=True, required=False)
+    test_id = LessonTestIdField(
+        source='test',
+        queryset=Test.objects.all(),
+        required=False,
+        allow_null=True
+    )
     
     class Meta:
         model = Lesson
+        fields = [
+            'id', 'title', 'title_kz', 'title_en', 'description', 'description_kz', 'description_en',
+            'type', 'video_url', 'thumbnail_url', 'pdf_url', 'test_id',
+            'duration', 'order', 'required', 'allow_download',
+            'track_progress', 'passing_score', 'max_attempts',
+            'language', 'completed', 'created_at', 'updated_at'
+        ]
+        read_only_fields = ['id', 'created_at', 'updated_at', 'completed']
+
+
+class LessonSerializer(LessonSummarySerializer):
+    """Lesson serializer (full, with text bodies)"""
+    localized_fields = ('title', 'description', 'content')
+    
+    class Meta(LessonSummarySerializer.Meta):
         fields = [
             'id', 'title', 'title_kz', 'title_en', 'description', 'description_kz', 'description_en',
             'type', 'content', 'content_kz', 'content_en',
@@ -30,12 +106,22 @@ class LessonSerializer(serializers.ModelSerializer):
             'track_progress', 'passing_score', 'max_attempts',
             'language', 'completed', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at', 'completed']
 
 
-class ModuleSerializer(serializers.ModelSerializer):
-    """Module serializer with nested lessons"""
-    lessons = LessonSerializer(many=True, read_only=True)
+class LessonContentSerializer(LocalizedFieldsMixin, serializers.ModelSerializer):
+    """Lesson text body for /api/lessons/{id}/content/"""
+    localized_fields = ('content',)
+    
+    class Meta:
+        model = Lesson
+        fields = ['id', 'type', 'content', 'content_kz', 'content_en', 'updated_at']
+        read_only_fields = fields
+
+
+class ModuleSerializer(LocalizedFieldsMixin, serializers.ModelSerializer):
+    """Module serializer with nested lesson summaries"""
+    localized_fields = ('title', 'description')
+    lessons = LessonSummarySerializer(many=True, read_only=True)
     
     class Meta:
         model = Module
@@ -46,9 +132,15 @@ class ModuleSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class CourseSerializer(serializers.ModelSerializer):
-    """Course serializer with nested modules"""
-    modules = ModuleSerializer(many=True, read_only=True)
+class ModuleDetailSerializer(ModuleSerializer):
+    """Module serializer with full nested lessons (course editor)"""
+    lessons = LessonSerializer(many=True, read_only=True)
+
+
+class CourseSerializer(LocalizedFieldsMixin, serializers.ModelSerializer):
+    """Course serializer with nested modules (served from the course tree cache)"""
+    localized_fields = ('title', 'description')
+    modules = serializers.SerializerMethodField()
     category = CategorySerializer(read_only=True)
     category_id = serializers.PrimaryKeyRelatedField(
         queryset=Category.objects.filter(is_active=True),
@@ -69,6 +161,18 @@ class CourseSerializer(serializers.ModelSerializer):
             'language', 'final_test_id', 'is_standalone_test', 'modules', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
+    
+    def get_modules(self, obj):
+        """
+        Return cached modules -> lessons tree (resolved to one language for ?lang=).
+        
+        Lessons are summaries unless context['full_lessons'] is set (course editor).
+        """
+        return get_course_tree(
+            obj,
+            self.get_resolved_language() or 'all',
+            full=self.context.get('full_lessons', False),
+        )
 
 
 class CourseCreateUpdateSerializer(serializers.ModelSerializer):
@@ -92,79 +196,216 @@ class CourseCreateUpdateSerializer(serializers.ModelSerializer):
         ]
     
     def create(self, validated_data):
-        modules_data = validated_data.pop('modules', [])
-        course = Course.objects.create(**validated_data)
+        modules_data = validated_data.pop('modules', None) or []
         
-        for module_index, module_data in enumerate(modules_data):
-            lessons_data = module_data.pop('lessons', [])
-            # Remove order from module_data to avoid duplicate keyword argument
-            module_data.pop('order', None)
-            module = Module.objects.create(course=course, order=module_index + 1, **module_data)
-            
-            for lesson_index, lesson_data in enumerate(lessons_data):
-                # Remove order from lesson_data to avoid duplicate keyword argument
-                lesson_data.pop('order', None)
-                Lesson.objects.create(module=module, order=lesson_index + 1, **lesson_data)
+        with transaction.atomic():
+            course = Course.objects.create(**validated_data)
+            with course_tree_batch(course.id) as batch:
+                self.tree_changes = self._sync_tree(course, modules_data)
+                batch.recompute_progress = self.tree_changes['required_lessons_changed']
         
         return course
     
     def update(self, instance, validated_data):
         modules_data = validated_data.pop('modules', None)
+        self.tree_changes = None
         
-        # Update course fields
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
+        with transaction.atomic():
+            # Update course fields
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            instance.save()
+            
+            if modules_data is not None:
+                with course_tree_batch(instance.id) as batch:
+                    self.tree_changes = self._sync_tree(instance, modules_data)
+                    batch.recompute_progress = self.tree_changes['required_lessons_changed']
+        
+        return instance
+    
+    def _sync_tree(self, course, modules_data):
+        """
+        Apply modules/lessons payload to the course as a diff.
+        
+        Existing tree is loaded once (2 queries), removed rows are deleted with
+        one filtered delete per model, changed rows are written with bulk_update
+        and new rows with bulk_create. Orders follow payload positions.
         
-        if modules_data is not None:
-            # Delete existing modules (or update if ID provided)
-            existing_module_ids = [m.id for m in instance.modules.all()]
-            new_module_ids = [m.get('id') for m in modules_data if m.get('id')]
+        Returns:
+            dict: created/updated/deleted counts for modules and lessons,
+                required_lessons_changed - required lessons added, removed or toggled
+        """
+        now = timezone.now()
+        existing_modules = {m.id: m for m in Module.objects.filter(course=course)}
+        existing_lessons = {l.id: l for l in Lesson.objects.filter(module__course=course)}
+        
+        module_plan = []
+        modules_to_create = []
+        modules_to_update = []
+        moved_module_ids = []
+        kept_module_ids = set()
+        
+        for module_index, module_data in enumerate(modules_data):
+            order = module_index + 1
+            fields = _payload_fields(module_data, MODULE_FIELDS)
+            module = existing_modules.get(_payload_id(module_data))
             
-            # Delete modules not in new data
-            for module in instance.modules.all():
-                if module.id not in new_module_ids:
-                    module.delete()
+            if module is not None and module.id not in kept_module_ids:
+                kept_module_ids.add(module.id)
+                changed = _assign(module, fields)
+                if module.order != order:
+                    moved_module_ids.append(module.id)
+                    module.order = order
+                    changed = True
+                if changed:
+                    module.updated_at = now
+                    modules_to_update.append(module)
+            else:
+                module = Module(course=course, order=order, **fields)
+                modules_to_create.append(module)
             
-            # Update or create modules
-            for module_index, module_data in enumerate(modules_data):
-                module_id = module_data.pop('id', None)
-                lessons_data = module_data.pop('lessons', [])
-                # Remove order from module_data to avoid duplicate keyword argument
-                module_data.pop('order', None)
-                
-                if module_id and Module.objects.filter(id=module_id, course=instance).exists():
-                    module = Module.objects.get(id=module_id)
-                    for attr, value in module_data.items():
-                        setattr(module, attr, value)
-                    module.order = module_index + 1
-                    module.save()
-                else:
-                    module = Module.objects.create(course=instance, order=module_index + 1, **module_data)
-                
-                # Update or create lessons
-                existing_lesson_ids = [l.id for l in module.lessons.all()]
-                new_lesson_ids = [l.get('id') for l in lessons_data if l.get('id')]
-                
-                for lesson in module.lessons.all():
-                    if lesson.id not in new_lesson_ids:
-                        lesson.delete()
-                
-                for lesson_index, lesson_data in enumerate(lessons_data):
-                    lesson_id = lesson_data.pop('id', None)
-                    # Remove order from lesson_data to avoid duplicate keyword argument
-                    lesson_data.pop('order', None)
-                    
-                    if lesson_id and Lesson.objects.filter(id=lesson_id, module=module).exists():
-                        lesson = Lesson.objects.get(id=lesson_id)
-                        for attr, value in lesson_data.items():
-                            setattr(lesson, attr, value)
-                        lesson.order = lesson_index + 1
-                        lesson.save()
+            module_plan.append((module, module_data.get('lessons') or []))
+        
+        kept_lesson_ids = set()
+        lesson_plan = []
+        for module, lessons_data in module_plan:
+            for lesson_index, lesson_data in enumerate(lessons_data):
+                lesson = existing_lessons.get(_payload_id(lesson_data))
+                if lesson is not None:
+                    if lesson.id in kept_lesson_ids:
+                        lesson = None
                     else:
-                        Lesson.objects.create(module=module, order=lesson_index + 1, **lesson_data)
+                        kept_lesson_ids.add(lesson.id)
+                lesson_plan.append((module, lesson_index + 1, lesson_data, lesson))
         
-        return instance
+        # Delete removed lessons first so that their orders are free
+        removed_lesson_ids = [lid for lid in existing_lessons if lid not in kept_lesson_ids]
+        removed_module_ids = [mid for mid in existing_modules if mid not in kept_module_ids]
+        required_changed = any(existing_lessons[lid].required for lid in removed_lesson_ids)
+        lessons_deleted = 0
+        modules_deleted = 0
+        if removed_lesson_ids:
+            lessons_deleted = Lesson.objects.filter(id__in=removed_lesson_ids).delete()[1].get(Lesson._meta.label, 0)
+        
+        # Modules: move changed (and removed) orders out of the way with a negative
+        # unique value, then write final values. Removed modules are deleted last,
+        # after their kept lessons have been moved to other modules.
+        if moved_module_ids or removed_module_ids:
+            Module.objects.filter(id__in=moved_module_ids + removed_module_ids).update(order=-F('order') - 1)
+        if modules_to_update:
+            Module.objects.bulk_update(modules_to_update, MODULE_FIELDS + ['order', 'updated_at'])
+        if modules_to_create:
+            Module.objects.bulk_create(modules_to_create)
+        
+        test_ids = _resolve_lesson_tests(lesson_data for _, _, lesson_data, _ in lesson_plan)
+        lessons_to_create = []
+        lessons_to_update = []
+        moved_lesson_ids = []
+        for module, order, lesson_data, lesson in lesson_plan:
+            fields = _payload_fields(lesson_data, LESSON_FIELDS)
+            if 'test_id' in fields:
+                fields['test_id'] = test_ids.get(fields['test_id'])
+            if lesson is not None:
+                was_required = lesson.required
+                changed = _assign(lesson, fields)
+                required_changed = required_changed or lesson.required != was_required
+                if lesson.module_id != module.id or lesson.order != order:
+                    moved_lesson_ids.append(lesson.id)
+                    lesson.module = module
+                    lesson.order = order
+                    changed = True
+                if changed:
+                    lesson.updated_at = now
+                    lessons_to_update.append(lesson)
+            else:
+                lesson = Lesson(module=module, order=order, **fields)
+                required_changed = required_changed or lesson.required
+                lessons_to_create.append(lesson)
+        
+        if moved_lesson_ids:
+            Lesson.objects.filter(id__in=moved_lesson_ids).update(order=-F('order') - 1)
+        if lessons_to_update:
+            Lesson.objects.bulk_update(lessons_to_update, LESSON_FIELDS + ['module', 'order', 'updated_at'])
+        if lessons_to_create:
+            Lesson.objects.bulk_create(lessons_to_create)
+        
+        if removed_module_ids:
+            modules_deleted = Module.objects.filter(id__in=removed_module_ids).delete()[1].get(Module._meta.label, 0)
+        
+        return {
+            'modules': {
+                'created': len(modules_to_create),
+                'updated': len(modules_to_update),
+                'deleted': modules_deleted,
+            },
+            'lessons': {
+                'created': len(lessons_to_create),
+                'updated': len(lessons_to_update),
+                'deleted': lessons_deleted,
+            },
+            'required_lessons_changed': required_changed,
+        }
+
+
+def _editable_fields(model, exclude):
+    """Concrete editable model fields that may come from the editor payload"""
+    return [
+        f.attname for f in model._meta.concrete_fields
+        if f.editable and not f.primary_key and f.name not in exclude
+    ]
+
+
+MODULE_FIELDS = _editable_fields(Module, exclude={'course', 'order'})
+LESSON_FIELDS = _editable_fields(Lesson, exclude={'module', 'order'})
+
+
+def _payload_id(data):
+    """Return integer id from payload item or None"""
+    try:
+        return int(data.get('id'))
+    except (TypeError, ValueError):
+        return None
+
+
+def _payload_fields(data, allowed):
+    """Keep only known model fields from a raw payload dict"""
+    return {key: value for key, value in data.items() if key in allowed}
+
+
+def _resolve_lesson_tests(lessons_data):
+    """
+    Map raw `test_id` payload values to existing Test ids with one query.
+    
+    Empty values map to None; unknown ids raise ValidationError.
+    """
+    parsed = {}
+    for data in lessons_data:
+        value = data.get('test_id')
+        if value is None or value == '':
+            continue
+        # Проверяем до использования как ключа: список или объект в payload не хешируется
+        if not isinstance(value, (int, str)) or isinstance(value, bool):
+            raise serializers.ValidationError({'modules': f'Invalid test_id: {value}'})
+        try:
+            parsed[value] = int(value)
+        except (TypeError, ValueError):
+            raise serializers.ValidationError({'modules': f'Invalid test_id: {value}'})
+    
+    existing = set(Test.objects.filter(id__in=set(parsed.values())).values_list('id', flat=True)) if parsed else set()
+    missing = [str(value) for value, test_id in parsed.items() if test_id not in existing]
+    if missing:
+        raise serializers.ValidationError({'modules': f'Tests not found: {", ".join(missing)}'})
+    return parsed
+
+
+def _assign(instance, fields):
+    """Set attributes on instance, return True if any value changed"""
+    changed = False
+    for attr, value in fields.items():
+        if getattr(instance, attr) != value:
+            setattr(instance, attr, value)
+            changed = True
+    return changed
 
 
 class CourseEnrollmentSerializer(serializers.ModelSerializer):
@@ -188,12 +429,12 @@ class CourseEnrollmentSerializer(serializers.ModelSerializer):
 
 class LessonProgressSerializer(serializers.ModelSerializer):
     """Lesson progress serializer"""
-    lesson = LessonSerializer(read_only=True)
+    lesson = LessonSummarySerializer(read_only=True)
     
     class Meta:
         model = LessonProgress
-        fields = ['id', 'lesson', 'completed', 'completed_at']
-        read_only_fields = ['id', 'completed_at']
+        fields = ['id', 'lesson', 'completed', 'completed_at', 'time_spent', 'last_position', 'last_activity_at']
+        read_only_fields = ['id', 'completed_at', 'time_spent', 'last_position', 'last_activity_at']
 
 
 class CourseCompletionVerificationSerializer(serializers.ModelSerializer):
@@ -217,3 +458,25 @@ class OTPVerifySerializer(serializers.Serializer):
     """Serializer for OTP verification"""
     otp_code = serializers.CharField(max_length=6, min_length=6)
 
+
+
+class LessonReorderSerializer(ReorderSerializer):
+    """Ordered lesson ids of one module"""
+    module_id = serializers.IntegerField()
+
+
+class LessonProgressEventSerializer(serializers.Serializer):
+    """Single offline lesson completion event"""
+    lesson_id = serializers.IntegerField()
+    completed_at = serializers.DateTimeField(required=False, allow_null=True)
+
+
+class LessonProgressSyncSerializer(serializers.Serializer):
+    """Batch of offline lesson completion events"""
+    events = LessonProgressEventSerializer(many=True, allow_empty=False, max_length=500)
+
+
+class LessonHeartbeatSerializer(serializers.Serializer):
+    """Player heartbeat: position and seconds elapsed since the previous tick"""
+    position = serializers.IntegerField(min_value=0, required=False, allow_null=True)
+    elapsed = serializers.IntegerField(min_value=0, required=False, default=0)
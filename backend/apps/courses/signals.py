@@ -0,0 +1,93 @@
+"""Signals for keeping cached course structure in sync"""
+from django.db.models.signals import post_init, post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from apps.tests.models import Test
+from .models import Category, Course, Module, Lesson
+from .utils import (
+    invalidate_course_tree, invalidate_category_tree, refresh_total_required_lessons, in_course_tree_batch,
+)
+
+# Поля, от которых зависят счетчики каталога (список категорий, фасеты курсов)
+CATEGORY_COUNT_FIELDS = {
+    Course: ('category_id', 'status', 'language', 'format', 'is_standalone_test'),
+    Test: ('category_id', 'is_active', 'language'),
+}
+
+
+def _count_state(instance):
+    # __dict__ вместо getattr: не загружать отложенные поля (only()/defer())
+    return tuple(instance.__dict__.get(field) for field in CATEGORY_COUNT_FIELDS[type(instance)])
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def course_changed(sender, instance, **kwargs):
+    """Bump course tree version when course is saved or deleted"""
+    if in_course_tree_batch():
+        return
+    invalidate_course_tree(instance.pk)
+
+
+@receiver(post_save, sender=Module)
+@receiver(post_delete, sender=Module)
+def module_changed(sender, instance, **kwargs):
+    """Bump course tree version when module is saved or deleted"""
+    if in_course_tree_batch():
+        return
+    invalidate_course_tree(instance.course_id)
+    origin = kwargs.get('origin')
+    if origin is not None and not (isinstance(origin, Course) or getattr(origin, 'model', None) is Course):
+        # Уроки удаленного модуля не пересчитывают счетчик сами (см. lesson_changed)
+        refresh_total_required_lessons(instance.course_id)
+
+
+@receiver(post_save, sender=Lesson)
+@receiver(post_delete, sender=Lesson)
+def lesson_changed(sender, instance, **kwargs):
+    """Bump course tree version and required lessons total when lesson is saved or deleted"""
+    if in_course_tree_batch():
+        return
+    # При каскадном удалении модуля или курса версию сбросит их собственный сигнал
+    origin = kwargs.get('origin')
+    if isinstance(origin, (Module, Course)) or getattr(origin, 'model', None) in (Module, Course):
+        return
+    if Lesson._meta.get_field('module').is_cached(instance):
+        course_id = instance.module.course_id
+    else:
+        course_id = Module.objects.filter(pk=instance.module_id).values_list('course_id', flat=True).first()
+    invalidate_course_tree(course_id)
+    refresh_total_required_lessons(course_id)
+
+
+@receiver(pre_delete, sender=Test)
+def test_deleting(sender, instance, **kwargs):
+    """Bump tree version of courses whose lessons reference the deleted test (SET_NULL skips signals)"""
+    course_ids = Module.objects.filter(lessons__test=instance).values_list('course_id', flat=True).distinct()
+    for course_id in course_ids:
+        invalidate_course_tree(course_id)
+
+
+@receiver(post_init, sender=Course)
+@receiver(post_init, sender=Test)
+def remember_category_count_state(sender, instance, **kwargs):
+    """Remember fields affecting category counters to detect changes on save"""
+    instance._category_count_state = _count_state(instance)
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=Test)
+def category_count_source_saved(sender, instance, created, **kwargs):
+    """Bump category tree version when a course/test changes a catalog counter field (category, status, language...)"""
+    state = _count_state(instance)
+    if created or state != getattr(instance, '_category_count_state', None):
+        invalidate_category_tree()
+    instance._category_count_state = state
+
+
+@receiver(post_delete, sender=Course)
+@receiver(post_delete, sender=Test)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_tree_changed(sender, instance, **kwargs):
+    """Bump category tree version when a category is saved or a course/test is deleted"""
+    invalidate_category_tree()
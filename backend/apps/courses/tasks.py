@@ -0,0 +1,61 @@
+"""Celery tasks for courses"""
+from celery import shared_task
+
+from apps.core.jobs import run_job
+
+
+@shared_task
+def bulk_enroll_task(job_id):
+    """Enroll a large list of users into a course in the background"""
+    from .models import Course
+    from .enrollment import enroll_users
+    
+    def handler(job):
+        course = Course.objects.get(pk=job.params['course_id'])
+        result = enroll_users(
+            course,
+            user_ids=job.params.get('user_ids'),
+            phones=job.params.get('phones'),
+            progress_callback=job.set_progress,
+        )
+        return {
+            'enrolled': len(result['enrolled']),
+            'already_enrolled': result['already_enrolled'],
+            'not_found': result['not_found'],
+        }
+    
+    return run_job(job_id, handler)
+
+
+@shared_task
+def build_course_package_task(job_id):
+    """Build an offline course package (zip) in the background"""
+    from .models import CoursePackage, Lesson
+    from .package import build_course_package
+    
+    def handler(job):
+        package = CoursePackage.objects.select_related('course').get(pk=job.params['package_id'])
+        job.mark_running(total=Lesson.objects.filter(module__course=package.course).count())
+        return build_course_package(package, progress_callback=job.set_progress)
+    
+    return run_job(job_id, handler)
+
+
+@shared_task
+def flush_lesson_heartbeats_task():
+    """Write buffered lesson heartbeats (watch time, position) to LessonProgress"""
+    from .progress import lesson_heartbeats
+    
+    return lesson_heartbeats.flush()
+
+
+@shared_task
+def recompute_course_progress_task(course_id):
+    """Recalculate progress of all enrollments after the course structure changed"""
+    from django.core.cache import cache
+    from .progress import recompute_course_progress
+    from .utils import PROGRESS_RECOMPUTE_KEY
+    
+    # Снимаем флаг до чтения данных: следующие изменения поставят задачу снова
+    cache.delete(PROGRESS_RECOMPUTE_KEY.format(course_id=course_id))
+    return recompute_course_progress(course_id)
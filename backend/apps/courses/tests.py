@@ -0,0 +1,136 @@
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.accounts.models import User
+from apps.certificates.models import Certificate
+from apps.exams.models import TestAttempt, ExtraAttemptRequest
+from apps.exams.quota import get_quota
+from apps.notifications.models import Notification
+from apps.protocols.models import Protocol
+from apps.tests.models import Test
+from .dashboard import get_learner_dashboard
+from .models import Course, CourseEnrollment, Module, Lesson
+
+# Записи с курсами, квоты, попытки, протоколы, сертификаты, уведомления
+DASHBOARD_QUERIES = 6
+
+
+class LearnerDashboardTests(TestCase):
+    """Число запросов личного кабинета не зависит от количества курсов"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(phone='+77010000001', password='password', role='student')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def enroll(self, count):
+        for index in range(count):
+            test = Test.objects.create(title=f'Final test {index}', max_attempts=2)
+            course = Course.objects.create(title=f'Course {index}', final_test=test, status='published')
+            enrollment = CourseEnrollment.objects.create(user=self.user, course=course, status='in_progress')
+            TestAttempt.objects.create(test=test, user=self.user, completed_at=timezone.now(), score=40, passed=False)
+            ExtraAttemptRequest.objects.create(user=self.user, test=test, reason='retry', status='approved')
+            get_quota(self.user.id, test.id)
+            Protocol.objects.create(
+                student=self.user, course=course, enrollment=enrollment, exam_date=timezone.now(),
+                score=40, passing_score=80, result='failed', status='pending_pdek',
+            )
+            Certificate.objects.create(student=self.user, course=course, qr_code='test')
+            Notification.objects.create(user=self.user, type='extra_attempt_approved', title='Approved', message='')
+
+    def test_query_count_is_bounded(self):
+        self.enroll(1)
+        with self.assertNumQueries(DASHBOARD_QUERIES):
+            get_learner_dashboard(self.user)
+
+        self.enroll(9)
+        with self.assertNumQueries(DASHBOARD_QUERIES):
+            data = get_learner_dashboard(self.user)
+
+        self.assertEqual(len(data['enrollments']), 10)
+        self.assertEqual(len(data['pending_final_tests']), 10)
+        self.assertEqual(len(data['open_protocols']), 10)
+        self.assertEqual(len(data['certificates']), 10)
+        # Сигналы тоже создают уведомления (зачисление, протокол, сертификат)
+        self.assertEqual(data['unread_notifications'], Notification.objects.filter(user=self.user, read=False).count())
+
+    def test_remaining_attempts(self):
+        self.enroll(1)
+        response = self.client.get('/api/courses/dashboard/')
+
+        self.assertEqual(response.status_code, 200)
+        final_test = response.data['enrollments'][0]['final_test']
+        self.assertEqual(final_test['max_attempts'], 3)
+        self.assertEqual(final_test['attempts_used'], 1)
+        self.assertEqual(final_test['remaining_attempts'], 2)
+        self.assertEqual(response.data['pending_final_tests'][0]['remaining_attempts'], 2)
+
+    def test_deleted_attempt_frees_slot(self):
+        self.enroll(1)
+        TestAttempt.objects.filter(user=self.user).delete()
+        response = self.client.get('/api/courses/dashboard/')
+
+        final_test = response.data['enrollments'][0]['final_test']
+        self.assertEqual(final_test['attempts_used'], 0)
+        self.assertEqual(final_test['remaining_attempts'], 3)
+
+
+@mock.patch('apps.courses.utils.schedule_progress_recompute')
+class ProgressRecomputeSchedulingTests(TestCase):
+    """Пересчет прогресса зачислений ставится только при изменении обязательных уроков"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(phone='+77010000002', password='password', role='admin')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.course = Course.objects.create(title='Course')
+        self.module = Module.objects.create(course=self.course, title='Module', order=1)
+        self.lessons = [
+            Lesson.objects.create(module=self.module, title=f'Lesson {index}', order=index + 1)
+            for index in range(2)
+        ]
+
+    def save_tree(self, lessons):
+        payload = {'modules': [{'id': self.module.id, 'title': 'Module', 'lessons': lessons}]}
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(f'/api/courses/{self.course.id}/', payload, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        return response
+
+    def test_unchanged_save_and_reorder_skip_recompute(self, schedule):
+        self.save_tree([{'id': lesson.id, 'title': lesson.title} for lesson in self.lessons])
+        response = self.client.post(
+            f'/api/courses/{self.course.id}/reorder_lessons/',
+            {'module_id': self.module.id, 'ids': [lesson.id for lesson in reversed(self.lessons)]},
+            format='json',
+        )
+
+        self.assertEqual(response.status_code, 200)
+        schedule.assert_not_called()
+
+    def test_reorder_lessons_rejects_invalid_module_id(self, schedule):
+        for module_id in ('abc', [self.module.id]):
+            response = self.client.post(
+                f'/api/courses/{self.course.id}/reorder_lessons/',
+                {'module_id': module_id, 'ids': [lesson.id for lesson in self.lessons]},
+                format='json',
+            )
+            self.assertEqual(response.status_code, 400)
+
+    def test_unhashable_lesson_test_id_is_rejected(self, schedule):
+        for test_id in ([1], {'id': 1}):
+            payload = {'modules': [{'id': self.module.id, 'lessons': [{'title': 'Lesson', 'test_id': test_id}]}]}
+            response = self.client.patch(f'/api/courses/{self.course.id}/', payload, format='json')
+            self.assertEqual(response.status_code, 400)
+
+    def test_toggled_required_lesson_schedules_recompute(self, schedule):
+        response = self.save_tree([
+            {'id': self.lessons[0].id, 'title': self.lessons[0].title, 'required': False},
+            {'id': self.lessons[1].id, 'title': self.lessons[1].title},
+        ])
+
+        self.assertTrue(response.data['tree_changes']['required_lessons_changed'])
+        schedule.assert_called_once_with(self.course.id)
@@ -0,0 +1,364 @@
+"""
+Utility functions for course structure caching and progress counters
+"""
+import logging
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q
+from django.db.models.functions import Least
+
+from apps.core.cache import get_version, bump_version_on_commit
+from apps.core.write_behind import is_shared_cache
+
+logger = logging.getLogger(__name__)
+
+COURSE_TREE_VERSION_KEY = 'course_tree_version:{course_id}'
+COURSE_TREE_KEY = 'course_tree:{course_id}:{lang}:{variant}:{version}'
+CATEGORY_TREE_VERSION_KEY = 'category_tree_version'
+CATEGORY_TREE_KEY = 'category_tree:{lang}:{version}'
+CATEGORY_COUNTS_KEY = 'category_counts:{version}'
+CATALOG_FACETS_KEY = 'catalog_facets:{lang}:{scope}:{version}'
+PROGRESS_RECOMPUTE_KEY = 'course_progress_recompute:{course_id}'
+PROGRESS_RECOMPUTE_PENDING_TIMEOUT = 60 * 60
+
+_tree_batch = threading.local()
+
+
+def get_course_tree_version(course_id):
+    """Получить текущую версию дерева курса (модули и уроки)"""
+    return get_version(COURSE_TREE_VERSION_KEY.format(course_id=course_id))
+
+
+def invalidate_course_tree(course_id):
+    """
+    Сбросить кэшированное дерево курса (для всех языков).
+    
+    Версия меняется после коммита транзакции, чтобы параллельный запрос
+    не закэшировал старые данные под новой версией.
+    """
+    if course_id is None:
+        return
+    bump_version_on_commit(COURSE_TREE_VERSION_KEY.format(course_id=course_id))
+
+
+class _TreeBatch:
+    """Состояние пакетного изменения; recompute_progress=False - обязательные уроки не менялись"""
+
+    def __init__(self):
+        self.recompute_progress = True
+
+
+@contextmanager
+def course_tree_batch(course_id):
+    """
+    Пакетное изменение структуры курса.
+    
+    Внутри блока сигналы Course/Module/Lesson не выполняют построчную работу
+    (сброс кэша, пересчет счетчиков); она выполняется один раз при выходе.
+    Пересчет прогресса зачислений ставится, только если вызывающий код не
+    сбросил batch.recompute_progress (порядок и поля уроков на прогресс не влияют).
+    """
+    batch = _TreeBatch()
+    _tree_batch.depth = getattr(_tree_batch, 'depth', 0) + 1
+    try:
+        yield batch
+    finally:
+        _tree_batch.depth -= 1
+    invalidate_course_tree(course_id)
+    # Уроки могли быть удалены и добавлены при неизменном количестве
+    if not refresh_total_required_lessons(course_id) and batch.recompute_progress:
+        schedule_progress_recompute(course_id)
+
+
+def in_course_tree_batch():
+    """Выполняется ли сейчас пакетное изменение структуры курса"""
+    return getattr(_tree_batch, 'depth', 0) > 0
+
+
+def get_course_tree(course, lang='all', full=False):
+    """
+    Получить сериализованные модули курса с вложенными уроками.
+
+    Фрагмент кэшируется по id курса, языку и версии дерева. Версия меняется
+    при сохранении или удалении Course, Module или Lesson (см. signals.py).
+
+    Args:
+        course: Экземпляр Course
+        lang: Вариант представления: 'all' - все языковые поля,
+            'ru'/'kz'/'en' - одно значение на поле (см. LocalizedFieldsMixin)
+        full: Уроки с текстом (content*) - для редактора курса;
+            по умолчанию только краткие данные уроков
+
+    Returns:
+        list: Сериализованные модули (новый объект при каждом вызове)
+    """
+    from .serializers import ModuleSerializer, ModuleDetailSerializer
+
+    key = COURSE_TREE_KEY.format(
+        course_id=course.pk,
+        lang=lang,
+        variant='full' if full else 'summary',
+        version=get_course_tree_version(course.pk),
+    )
+    data = cache.get(key)
+    if data is not None:
+        return data
+
+    # Используем prefetch, если он уже выполнен вызывающим кодом
+    if 'modules' in getattr(course, '_prefetched_objects_cache', {}):
+        modules = course.modules.all()
+    else:
+        modules = course.modules.prefetch_related('lessons')
+
+    context = {'lang': lang} if lang != 'all' else {}
+    serializer_class = ModuleDetailSerializer if full else ModuleSerializer
+    data = serializer_class(modules, many=True, context=context).data
+    # Приводим ReturnList/OrderedDict к обычным структурам перед сохранением
+    data = [dict(module, lessons=[dict(lesson) for lesson in module['lessons']]) for module in data]
+    cache.set(key, data, settings.COURSE_TREE_CACHE_TIMEOUT)
+    return data
+
+
+def invalidate_category_tree():
+    """Сбросить кэш категорий и счетчиков курсов/тестов по категориям"""
+    bump_version_on_commit(CATEGORY_TREE_VERSION_KEY)
+
+
+def get_category_counts():
+    """
+    Счетчики курсов и тестов по категориям (два группирующих запроса, результат кэшируется).
+
+    Returns:
+        dict: {category_id: {
+            'courses_count': int,
+            'courses_by_status': {status: int},
+            'courses_by_language': {lang: int},
+            'published_by_language': {lang: int},
+            'tests_count': int,
+            'tests_by_language': {lang: int},
+        }}
+    """
+    from django.db.models import Count
+    from apps.tests.models import Test
+    from .models import Course
+
+    key = CATEGORY_COUNTS_KEY.format(version=get_version(CATEGORY_TREE_VERSION_KEY))
+    counts = cache.get(key)
+    if counts is not None:
+        return counts
+
+    counts = {}
+
+    def entry(category_id):
+        return counts.setdefault(category_id, {
+            'courses_count': 0,
+            'courses_by_status': {},
+            'courses_by_language': {},
+            'published_by_language': {},
+            'tests_count': 0,
+            'tests_by_language': {},
+        })
+
+    course_rows = Course.objects.filter(category__isnull=False).values(
+        'category_id', 'status', 'language'
+    ).annotate(n=Count('id')).order_by()
+    for row in course_rows:
+        item = entry(row['category_id'])
+        item['courses_count'] += row['n']
+        item['courses_by_status'][row['status']] = item['courses_by_status'].get(row['status'], 0) + row['n']
+        item['courses_by_language'][row['language']] = item['courses_by_language'].get(row['language'], 0) + row['n']
+        if row['status'] == 'published':
+            item['published_by_language'][row['language']] = item['published_by_language'].get(row['language'], 0) + row['n']
+
+    test_rows = Test.objects.filter(category__isnull=False, is_active=True).values(
+        'category_id', 'language'
+    ).annotate(n=Count('id')).order_by()
+    for row in test_rows:
+        item = entry(row['category_id'])
+        item['tests_count'] += row['n']
+        item['tests_by_language'][row['language']] = row['n']
+
+    cache.set(key, counts, settings.CATEGORY_TREE_CACHE_TIMEOUT)
+    return counts
+
+
+def get_category_tree(lang='all'):
+    """
+    Сериализованный список всех категорий со счетчиками (кэшируется по языку и версии).
+
+    Args:
+        lang: 'all' - все языковые поля, 'ru'/'kz'/'en' - компактный вариант
+
+    Returns:
+        list: Категории в порядке (order, name), включая неактивные
+    """
+    from .models import Category
+    from .serializers import CategorySerializer
+
+    key = CATEGORY_TREE_KEY.format(lang=lang, version=get_version(CATEGORY_TREE_VERSION_KEY))
+    data = cache.get(key)
+    if data is not None:
+        return data
+
+    context = {'lang': lang} if lang != 'all' else {}
+    data = [dict(item) for item in CategorySerializer(Category.objects.all(), many=True, context=context).data]
+    cache.set(key, data, settings.CATEGORY_TREE_CACHE_TIMEOUT)
+    return data
+
+
+def get_catalog_facets(language=None, published_only=False):
+    """
+    Счетчики курсов по значениям фильтров каталога (один группирующий запрос, результат кэшируется).
+
+    Кэш сбрасывается вместе со списком категорий (invalidate_category_tree).
+
+    Args:
+        language: Язык курсов (None - все языки); названия категорий на этом языке
+        published_only: Только опубликованные курсы (каталог для гостей)
+
+    Returns:
+        dict: {'total': int, 'status': {...}, 'language': {...}, 'format': {...},
+               'is_standalone_test': {'true': int, 'false': int},
+               'category': [{'id', 'name', 'count'}]}
+    """
+    from django.db.models import Count
+    from apps.core.utils import get_multilingual_field_value
+    from .models import Category, Course
+
+    key = CATALOG_FACETS_KEY.format(
+        lang=language or 'all',
+        scope='published' if published_only else 'all',
+        version=get_version(CATEGORY_TREE_VERSION_KEY),
+    )
+    facets = cache.get(key)
+    if facets is not None:
+        return facets
+
+    queryset = Course.objects.all()
+    if language:
+        queryset = queryset.filter(language=language)
+    if published_only:
+        queryset = queryset.filter(status='published')
+
+    facets = {'total': 0, 'status': {}, 'language': {}, 'format': {}, 'is_standalone_test': {}}
+    category_counts = {}
+    rows = queryset.values(
+        'status', 'language', 'format', 'is_standalone_test', 'category_id'
+    ).annotate(n=Count('id')).order_by()
+    for row in rows:
+        facets['total'] += row['n']
+        for field in ('status', 'language', 'format'):
+            facets[field][row[field]] = facets[field].get(row[field], 0) + row['n']
+        standalone = 'true' if row['is_standalone_test'] else 'false'
+        facets['is_standalone_test'][standalone] = facets['is_standalone_test'].get(standalone, 0) + row['n']
+        if row['category_id'] is not None:
+            category_counts[row['category_id']] = category_counts.get(row['category_id'], 0) + row['n']
+
+    facets['category'] = [
+        {
+            'id': category.id,
+            'name': get_multilingual_field_value(category, 'name', language or 'ru'),
+            'count': category_counts[category.id],
+        }
+        for category in Category.objects.filter(id__in=category_counts).only('id', 'name', 'name_kz', 'name_en')
+    ]
+
+    cache.set(key, facets, settings.CATEGORY_TREE_CACHE_TIMEOUT)
+    return facets
+
+
+def refresh_total_required_lessons(course_id):
+    """
+    Пересчитать Course.total_required_lessons для курса.
+
+    Returns:
+        bool: Счетчик изменился (пересчет прогресса уже поставлен)
+    """
+    from .models import Course, Lesson
+
+    if course_id is None:
+        return False
+    total = Lesson.objects.filter(module__course_id=course_id, required=True).count()
+    # update() не вызывает post_save и не сбрасывает кэш дерева без необходимости
+    changed = Course.objects.filter(pk=course_id).exclude(total_required_lessons=total).update(
+        total_required_lessons=total
+    )
+    if changed:
+        schedule_progress_recompute(course_id)
+    return bool(changed)
+
+
+def schedule_progress_recompute(course_id):
+    """
+    Поставить в очередь пересчет прогресса всех зачислений курса (после коммита).
+
+    Повторные вызовы до начала выполнения задачи не ставят ее повторно:
+    задача снимает флаг перед чтением данных, поэтому изменения, сделанные
+    во время пересчета, запланируют его снова. Флаг работает только в общем
+    кэше: в кэше процесса его не увидит и не снимет воркер Celery.
+    """
+    from .tasks import recompute_course_progress_task
+
+    key = PROGRESS_RECOMPUTE_KEY.format(course_id=course_id)
+    dedupe = is_shared_cache()
+
+    def enqueue():
+        if dedupe and not cache.add(key, 1, PROGRESS_RECOMPUTE_PENDING_TIMEOUT):
+            return
+        try:
+            recompute_course_progress_task.delay(course_id)
+        except Exception as e:
+            # Брокер недоступен - пересчитываем сразу, чтобы не блокировать сохранение курса
+            logger.warning(f"Could not queue progress recompute for course {course_id}: {e}")
+            if dedupe:
+                cache.delete(key)
+            from .progress import recompute_course_progress
+            recompute_course_progress(course_id)
+
+    transaction.on_commit(enqueue)
+
+
+def get_course_test_ids(course):
+    """
+    Id тестов курса: тесты уроков и итоговый тест.
+    
+    Один запрос с join по Lesson.test (индексированный внешний ключ).
+    """
+    from apps.tests.models import Test
+
+    return list(
+        Test.objects.filter(
+            Q(lessons__module__course=course) | Q(final_courses=course)
+        ).values_list('id', flat=True).distinct()
+    )
+
+
+def calculate_progress(completed_lessons, total_lessons):
+    """Процент прохождения курса по количеству пройденных уроков"""
+    if total_lessons <= 0:
+        return 0
+    return min(int(completed_lessons * 100 / total_lessons), 100)
+
+
+def increment_completed_lessons(enrollment, total_lessons):
+    """
+    Атомарно увеличить счетчик пройденных уроков записи на курс.
+
+    Должна вызываться в той же транзакции, что и создание/обновление LessonProgress.
+    Обновляет enrollment.completed_lessons и enrollment.progress на переданном экземпляре.
+    """
+    from .models import CourseEnrollment
+
+    if total_lessons > 0:
+        progress = Least((F('completed_lessons') + 1) * 100 / total_lessons, 100)
+    else:
+        progress = 0
+    CourseEnrollment.objects.filter(pk=enrollment.pk).update(
+        completed_lessons=F('completed_lessons') + 1,
+        progress=progress,
+    )
+    enrollment.refresh_from_db(fields=['completed_lessons', 'progress'])
@@ -3,7 +3,14 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
+from apps.search.filters import IndexedSearchFilter
+from apps.core.filters import LocalizedFieldFilter, LocalizedOrderingFilter
 from django.utils import timezone
+from django.db import transaction
+from django.conf import settings
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
 
 from .models import Category, Course, Module, Lesson, CourseEnrollment, LessonProgress, CourseCompletionVerification
 from .serializers import (
@@ -13,14 +20,33 @@ from .serializers import (
     CourseEnrollmentSerializer,
     LessonProgressSerializer,
     LessonSerializer,
+    LessonContentSerializer,
     CourseCompletionVerificationSerializer,
     OTPRequestSerializer,
     OTPVerifySerializer,
+    LessonProgressSyncSerializer,
+    LessonHeartbeatSerializer,
+    LessonReorderSerializer,
 )
 from apps.accounts.permissions import IsAdmin, IsAdminOrReadOnly
 from apps.exams.models import TestAttempt
 from apps.accounts.models import User
-from apps.core.utils import get_request_language
+from apps.core.utils import get_request_language, get_resolved_language
+from apps.core.jobs import start_job
+from apps.core.views import PurgeDestroyMixin, purge_response
+from apps.core.serializers import CloneSerializer, ReorderSerializer
+from apps.core.ordering import apply_order
+from .utils import increment_completed_lessons, get_category_tree, get_catalog_facets, course_tree_batch
+from .enrollment import enroll_users, parse_enrollment_file, parse_id_list
+from .bundle import iter_course_bundle, import_course_bundle, BundleError
+from .package import request_course_package
+from .clone import clone_course
+from .progress import sync_lesson_progress, record_lesson_heartbeat, get_pending_heartbeats
+from .dashboard import get_learner_dashboard
+
+
+# Параметры запроса, при которых список категорий отдается из кэша
+CATEGORY_TREE_PARAMS = {'is_active', 'lang', 'page'}
 
 
 class CategoryViewSet(viewsets.ModelViewSet):
@@ -47,14 +73,42 @@ class CategoryViewSet(viewsets.ModelViewSet):
         if not hasattr(self.request.user, 'is_authenticated') or not self.request.user.is_authenticated:
             queryset = queryset.filter(is_active=True)
         return queryset
+    
+    def list(self, request, *args, **kwargs):
+        """
+        List categories.
+        
+        Without search/ordering params the list is served from the cached
+        category tree (see utils.get_category_tree); counters are not recomputed.
+        """
+        if set(request.query_params) - CATEGORY_TREE_PARAMS:
+            return super().list(request, *args, **kwargs)
+        is_active = request.query_params.get('is_active', '').lower()
+        if is_active and is_active not in ('true', 'false'):
+            return super().list(request, *args, **kwargs)
+        
+        data = get_category_tree(get_resolved_language(request) or 'all')
+        if not request.user.is_authenticated:
+            is_active = 'true'
+        if is_active:
+            data = [item for item in data if item['is_active'] == (is_active == 'true')]
+        
+        page = self.paginate_queryset(data)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(data)
 
 
-class CourseViewSet(viewsets.ModelViewSet):
+class CourseViewSet(PurgeDestroyMixin, viewsets.ModelViewSet):
     """Course ViewSet"""
-    queryset = Course.objects.prefetch_related('modules__lessons').all()
+    # Модули и уроки берутся из кэша дерева курса (см. utils.get_course_tree)
+    queryset = Course.objects.select_related('category', 'final_test').all()
+    purge_target = 'course'
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
-    filterset_fields = ['status', 'category__id', 'language']
+    filter_backends = [DjangoFilterBackend, IndexedSearchFilter, LocalizedFieldFilter, LocalizedOrderingFilter]
+    localized_filter_fields = ['title']
+    search_entity = 'courses'
+    filterset_fields = ['status', 'category__id', 'language', 'format', 'is_standalone_test']
     search_fields = ['title', 'title_kz', 'title_en', 'description']
     ordering_fields = ['created_at', 'title']
     ordering = ['-created_at']
@@ -62,10 +116,12 @@ class CourseViewSet(viewsets.ModelViewSet):
     def get_permissions(self):
         """Allow read access to all, write access only to admins"""
         # Allow authenticated users to request and verify completion OTP, self-enroll, and view course with progress
-        if self.action in ['request_completion_otp', 'verify_completion_otp', 'enroll', 'with_progress']:
+        if self.action in ['request_completion_otp', 'verify_completion_otp', 'enroll', 'with_progress', 'offline_package', 'dashboard']:
             return [permissions.IsAuthenticated()]
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'facets']:
             return [permissions.AllowAny()]
+        if self.action in ['export_bundle', 'import_bundle']:
+            return [IsAdmin()]
         return [IsAdminOrReadOnly()]
     
     def get_serializer_class(self):
@@ -73,15 +129,46 @@ class CourseViewSet(viewsets.ModelViewSet):
             return CourseCreateUpdateSerializer
         return CourseSerializer
     
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        # Редактор курса (админ) получает уроки с текстом, остальные - краткое оглавление
+        user = self.request.user
+        context['full_lessons'] = self.action == 'retrieve' and user.is_authenticated and user.is_admin
+        return context
+    
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        self.tree_changes = getattr(serializer, 'tree_changes', None)
+    
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        self.tree_changes = getattr(serializer, 'tree_changes', None)
+    
+    def create(self, request, *args, **kwargs):
+        """Create course with nested modules and lessons, report tree changes"""
+        response = super().create(request, *args, **kwargs)
+        if getattr(self, 'tree_changes', None) is not None:
+            response.data['tree_changes'] = self.tree_changes
+        return response
+    
+    def update(self, request, *args, **kwargs):
+        """Update course and apply modules/lessons diff, report tree changes"""
+        response = super().update(request, *args, **kwargs)
+        if getattr(self, 'tree_changes', None) is not None:
+            response.data['tree_changes'] = self.tree_changes
+        return response
+    
     def get_queryset(self):
         """Filter courses for public access and by language"""
         queryset = super().get_queryset()
         
         # Для detail actions (retrieve, with_progress и т.д.) не применяем фильтрацию по языку
         # чтобы можно было открыть любой курс по ID независимо от языка
-        is_detail_action = self.action in ['retrieve', 'with_progress', 'enroll', 'students', 
+        is_detail_action = self.action in ['retrieve', 'with_progress', 'enroll', 'bulk_enroll', 'students', 
                                           'request_completion_otp', 'verify_completion_otp',
-                                          'revoke_enrollment', 'update', 'partial_update', 'destroy']
+                                          'revoke_enrollment', 'update', 'partial_update', 'destroy',
+                                          'export_bundle', 'offline_package', 'clone',
+                                          'reorder_modules', 'reorder_lessons']
         
         # Для неавторизованных пользователей показываем только опубликованные курсы
         if not hasattr(self.request.user, 'is_authenticated') or not self.request.user.is_authenticated:
@@ -106,8 +193,8 @@ class CourseViewSet(viewsets.ModelViewSet):
     def students(self, request, pk=None):
         """Get students enrolled in course"""
         course = self.get_object()
-        enrollments = CourseEnrollment.objects.filter(course=course).select_related('user')
-        serializer = CourseEnrollmentSerializer(enrollments, many=True)
+        enrollments = CourseEnrollment.objects.filter(course=course).select_related('user', 'course__category', 'course__final_test')
+        serializer = CourseEnrollmentSerializer(enrollments, many=True, context={'request': request})
         return Response(serializer.data)
     
     @action(detail=True, methods=['post'])
@@ -145,26 +232,253 @@ class CourseViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        enrolled = []
-        for user_id in user_ids:
-            try:
-                from apps.accounts.models import User
-                user = User.objects.get(id=user_id)
-                enrollment, created = CourseEnrollment.objects.get_or_create(
-                    user=user,
-                    course=course,
-                    defaults={'status': 'assigned'}
-                )
-                if created:
-                    enrolled.append(user_id)
-            except User.DoesNotExist:
-                continue
+        result = enroll_users(course, user_ids=parse_id_list(user_ids))
+        enrolled = result['enrolled']
         
         return Response({
             'message': f'Enrolled {len(enrolled)} students',
             'enrolled': enrolled
         }, status=status.HTTP_200_OK)
     
+    @action(detail=True, methods=['post'])
+    def bulk_enroll(self, request, pk=None):
+        """
+        Bulk enroll users (admin only) by ids, phones or uploaded XLSX/CSV file
+        
+        Request body (JSON or multipart):
+        {
+            "user_ids": [int] | "1,2,3" (optional),
+            "phones": [str] (optional),
+            "file": XLSX/CSV file with ids or phones in the first column (optional)
+        }
+        
+        Large lists are processed as a background job: the response is 202
+        with job_id, progress is available at /api/core/jobs/{job_id}/.
+        """
+        course = self.get_object()
+        
+        user_ids = request.data.get('user_ids')
+        if hasattr(request.data, 'getlist') and len(request.data.getlist('user_ids')) > 1:
+            user_ids = request.data.getlist('user_ids')
+        user_ids = parse_id_list(user_ids)
+        
+        phones = request.data.get('phones') or []
+        if hasattr(request.data, 'getlist') and len(request.data.getlist('phones')) > 1:
+            phones = request.data.getlist('phones')
+        if isinstance(phones, str):
+            phones = [p for p in phones.split(',') if p.strip()]
+        
+        if 'file' in request.FILES:
+            try:
+                file_user_ids, file_phones = parse_enrollment_file(request.FILES['file'])
+            except Exception as e:
+                return Response({'error': f'Could not read file: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+            user_ids += file_user_ids
+            phones += file_phones
+        
+        if not user_ids and not phones:
+            return Response(
+                {'error': 'Provide user_ids, phones or file'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        total = len(user_ids) + len(phones)
+        if total > settings.BULK_ENROLL_SYNC_LIMIT:
+            from .tasks import bulk_enroll_task
+            job = start_job(
+                'bulk_enroll',
+                bulk_enroll_task,
+                params={'course_id': course.id, 'user_ids': user_ids, 'phones': phones},
+                user=request.user,
+                total=total,
+            )
+            return Response({
+                'message': 'Bulk enrollment started',
+                'job_id': job.id,
+                'status': job.status,
+            }, status=status.HTTP_202_ACCEPTED)
+        
+        result = enroll_users(course, user_ids=user_ids, phones=phones)
+        return Response({
+            'message': f'Enrolled {len(result["enrolled"])} students',
+            'enrolled': result['enrolled'],
+            'already_enrolled': result['already_enrolled'],
+            'not_found': result['not_found'],
+        }, status=status.HTTP_200_OK)
+    
+    @action(detail=True, methods=['get'])
+    def export_bundle(self, request, pk=None):
+        """Export course with modules, lessons, linked tests and media as a streamed zip (admin only)"""
+        course = self.get_object()
+        response = StreamingHttpResponse(iter_course_bundle(course), content_type='application/zip')
+        response['Content-Disposition'] = f'attachment; filename="course_{course.id}.zip"'
+        return response
+    
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """
+        Course counts for every catalog filter value in one response
+        
+        Query params: language (defaults to the request language like the
+        course list; admins get all languages unless it is given).
+        Guests see counts of published courses only. Served from cache,
+        invalidated when a course changes category, status, language, format
+        or is_standalone_test.
+        """
+        user = request.user
+        is_admin = user.is_authenticated and (user.is_staff or getattr(user, 'role', None) == 'admin')
+        
+        language = request.query_params.get('language')
+        if language not in dict(Course.LANGUAGE_CHOICES):
+            language = None if is_admin else get_request_language(request)
+        
+        facets = get_catalog_facets(language=language, published_only=not user.is_authenticated)
+        return Response(dict(facets, language=language))
+    
+    @action(detail=True, methods=['post'])
+    def reorder_modules(self, request, pk=None):
+        """
+        Reorder all modules of the course in one request (admin only)
+        
+        Request body: {"ids": [module_id, ...]} - every module of the course, in the new order
+        """
+        course = self.get_object()
+        serializer = ReorderSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        # Порядок не влияет на прогресс - пересчет зачислений не нужен
+        with course_tree_batch(course.id) as batch:
+            batch.recompute_progress = False
+            orders = apply_order(Module.objects.filter(course=course), serializer.validated_data['ids'])
+        return Response({'orders': orders}, status=status.HTTP_200_OK)
+    
+    @action(detail=True, methods=['post'])
+    def reorder_lessons(self, request, pk=None):
+        """
+        Reorder all lessons of a module in one request (admin only)
+        
+        Request body: {"module_id": int, "ids": [lesson_id, ...]} - every lesson of the module, in the new order
+        """
+        course = self.get_object()
+        serializer = LessonReorderSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        module = Module.objects.filter(course=course, pk=serializer.validated_data['module_id']).first()
+        if module is None:
+            return Response(
+                {'error': 'Module not found in this course'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        with course_tree_batch(course.id) as batch:
+            batch.recompute_progress = False
+            orders = apply_order(Lesson.objects.filter(module=module), serializer.validated_data['ids'])
+        return Response({'orders': orders}, status=status.HTTP_200_OK)
+    
+    @action(detail=True, methods=['post'])
+    def clone(self, request, pk=None):
+        """
+        Copy course with modules, lessons, final test and lesson tests (admin only)
+        
+        Request body:
+        {
+            "language": "ru" | "kz" | "en" (optional) - language of the new edition,
+            "translate": bool - copy _kz/_en fields of the language into the base fields,
+            "title": str (optional)
+        }
+        
+        The copy is created in one transaction with bulk inserts and gets
+        status 'in_development'.
+        """
+        course = self.get_object()
+        serializer = CloneSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        clone, counts = clone_course(course, **serializer.validated_data)
+        clone = Course.objects.select_related('category', 'final_test').get(pk=clone.pk)
+        data = CourseSerializer(clone, context=self.get_serializer_context()).data
+        data['copied'] = counts
+        return Response(data, status=status.HTTP_201_CREATED)
+    
+    @action(detail=True, methods=['get'])
+    def offline_package(self, request, pk=None):
+        """
+        Download offline package of the course (zip with lesson texts, downloadable PDFs and manifest)
+        
+        Query params: lang (ru, kz, en; defaults to the course language).
+        The package is built once in the background and rebuilt only after
+        the course tree changes: while it is being built the response is 202
+        with job_id, then 200 with the file (ETag = tree fingerprint).
+        A failed build of an unchanged tree returns 409 with the error;
+        admins can rebuild it at once with ?retry=1.
+        Offline progress is sent back through POST /api/lessons/sync/.
+        """
+        course = self.get_object()
+        if not request.user.is_admin and not CourseEnrollment.objects.filter(user=request.user, course=course).exists():
+            return Response(
+                {'error': 'You are not enrolled in this course'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        language = get_resolved_language(request) or course.language
+        # Повторная сборка после ошибки - только по явному запросу администратора
+        retry = request.user.is_admin and request.query_params.get('retry') in ('1', 'true')
+        package, ready = request_course_package(course, language, user=request.user, retry=retry)
+        if package.status == 'failed':
+            return Response({
+                'error': 'Package build failed',
+                'detail': package.error,
+                'job_id': package.job_id,
+                'status': package.status,
+            }, status=status.HTTP_409_CONFLICT)
+        if not ready:
+            return Response({
+                'message': 'Package is being built',
+                'job_id': package.job_id,
+                'status': package.status,
+            }, status=status.HTTP_202_ACCEPTED)
+        
+        etag = quote_etag(package.tree_version)
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            not_modified['ETag'] = etag
+            return not_modified
+        
+        response = FileResponse(
+            package.file.open('rb'),
+            as_attachment=True,
+            filename=f'course_{course.id}_{language}.zip',
+            content_type='application/zip',
+        )
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+    
+    @action(detail=False, methods=['post'])
+    def import_bundle(self, request):
+        """
+        Import course from a bundle created by export_bundle (admin only)
+        
+        Multipart body: file (zip), status (optional, e.g. "draft")
+        """
+        if 'file' not in request.FILES:
+            return Response({'error': 'file is required'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            course, counts = import_course_bundle(
+                request.FILES['file'],
+                media_base_url=request.build_absolute_uri(settings.MEDIA_URL),
+                status=request.data.get('status') or None,
+            )
+        except BundleError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'message': 'Course imported successfully',
+            'course_id': course.id,
+            'counts': counts,
+        }, status=status.HTTP_201_CREATED)
+    
     @action(detail=True, methods=['post'])
     def revoke_enrollment(self, request, pk=None):
         """Revoke course enrollment for a student (completely delete enrollment and all related data)"""
@@ -174,138 +488,92 @@ class CourseViewSet(viewsets.ModelViewSet):
         if not user_id:
             return Response({'error': 'user_id is required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        try:
-            enrollment = CourseEnrollment.objects.get(
-                course=course,
-                user_id=user_id
-            )
-            
-            enrollment_id = enrollment.id
-            
-            # Delete CourseCompletionVerification if exists (OneToOne with enrollment)
-            from .models import CourseCompletionVerification
-            try:
-                verification = CourseCompletionVerification.objects.get(enrollment=enrollment)
-                verification.delete()
-            except CourseCompletionVerification.DoesNotExist:
-                pass
-            
-            # Get all test IDs for tests in this course
-            from apps.tests.models import Test
-            from apps.courses.models import Lesson
-            course_test_ids = []
-            
-            # Get tests from lessons (lessons have test_id as string, need to find matching Test objects)
-            lesson_test_ids = Lesson.objects.filter(
-                module__course=course,
-                test_id__isnull=False
-            ).exclude(test_id='').values_list('test_id', flat=True).distinct()
-            
-            # Convert test_id strings to integers and find matching Test objects
-            for test_id_str in lesson_test_ids:
-                try:
-                    test_id = int(test_id_str)
-                    if Test.objects.filter(id=test_id).exists():
-                        course_test_ids.append(test_id)
-                except (ValueError, TypeError):
-                    # If test_id is not a valid integer, skip it
-                    continue
-            
-            # Also include final test if exists
-            if course.final_test:
-                course_test_ids.append(course.final_test.id)
-            
-            # Delete all test attempts and extra attempt requests for tests in this course by this user
-            if course_test_ids:
-                from apps.exams.models import TestAttempt, ExtraAttemptRequest
-                TestAttempt.objects.filter(
-                    user_id=user_id,
-                    test_id__in=course_test_ids
-                ).delete()
-                
-                # Delete extra attempt requests for these tests
-                ExtraAttemptRequest.objects.filter(
-                    user_id=user_id,
-                    test_id__in=course_test_ids
-                ).delete()
-            
-            # Delete all certificates related to this course and student
-            from apps.certificates.models import Certificate
-            Certificate.objects.filter(
-                student_id=user_id,
-                course=course
-            ).delete()
-            
-            # Delete all protocols related to this enrollment
-            # (Protocols will be deleted via CASCADE, but we delete explicitly to ensure certificates are handled)
-            from apps.protocols.models import Protocol
-            Protocol.objects.filter(
-                enrollment=enrollment
-            ).delete()
-            
-            # Delete all lesson progress for this enrollment
-            # (CASCADE will handle this, but we do it explicitly for clarity)
-            LessonProgress.objects.filter(enrollment=enrollment).delete()
-            
-            # Delete enrollment (CASCADE will also delete related data)
-            enrollment.delete()
-            
-            return Response({
-                'message': 'Course enrollment and all related data deleted successfully',
-                'enrollment_id': enrollment_id
-            }, status=status.HTTP_200_OK)
-        except CourseEnrollment.DoesNotExist:
+        enrollment = CourseEnrollment.objects.filter(course=course, user_id=user_id).first()
+        if enrollment is None:
             return Response(
                 {'error': 'Enrollment not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
+        
+        # Verifications, attempts and extra attempt requests for course tests,
+        # certificates, protocols and lesson progress are removed in chunks;
+        # large histories are deleted by a background job (202 with job_id)
+        return purge_response('enrollment', enrollment.id, request.user, data={
+            'message': 'Course enrollment and all related data deleted successfully',
+            'enrollment_id': enrollment.id
+        })
     
     @action(detail=False, methods=['get'])
     def my_enrollments(self, request):
         """Get current user's enrollments"""
         enrollments = CourseEnrollment.objects.filter(
             user=request.user
-        ).select_related('course').prefetch_related('course__modules__lessons')
+        ).select_related('user', 'course__category', 'course__final_test')
         
-        serializer = CourseEnrollmentSerializer(enrollments, many=True)
+        serializer = CourseEnrollmentSerializer(enrollments, many=True, context={'request': request})
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'])
+    def dashboard(self, request):
+        """
+        Learner dashboard in a fixed number of queries
+        
+        Enrollments with progress and final test attempts, pending final
+        tests, open protocols, issued certificates and the unread
+        notification count of the current user.
+        """
+        return Response(get_learner_dashboard(request.user, get_request_language(request)))
+    
     @action(detail=True, methods=['get'])
     def with_progress(self, request, pk=None):
-        """Get course with student's progress (auto-enroll if not enrolled)"""
+        """
+        Get course with student's progress (read-only)
+        
+        Nothing is written: a user who is not enrolled gets the course with
+        empty progress and "enrolled": false. Enrollment is created only by
+        POST /api/courses/{id}/enroll/.
+        """
         course = self.get_object()
         enrollment = CourseEnrollment.objects.filter(
             user=request.user,
             course=course
-        ).first()
-        
-        # Auto-enroll if not enrolled
-        if not enrollment:
-            enrollment = CourseEnrollment.objects.create(
-                user=request.user,
-                course=course,
-                status='assigned'
-            )
-        
-        # Get lesson progress
-        lesson_progress = {
-            lp.lesson_id: lp.completed 
-            for lp in LessonProgress.objects.filter(enrollment=enrollment)
-        }
+        ).only('id', 'status', 'progress').first()
+        
+        # Get lesson progress (tuples only, no model instances)
+        lesson_progress = {}
+        if enrollment is not None:
+            lesson_progress = {
+                lesson_id: (completed, last_position, time_spent)
+                for lesson_id, completed, last_position, time_spent in LessonProgress.objects.filter(
+                    enrollment=enrollment
+                ).values_list('lesson_id', 'completed', 'last_position', 'time_spent')
+            }
         
         # Serialize course with progress info
         serializer = self.get_serializer(course)
         data = serializer.data
         
-        # Add completed status to each lesson
-        if 'modules' in data:
-            for module in data['modules']:
-                if 'lessons' in module:
-                    for lesson in module['lessons']:
-                        lesson['completed'] = lesson_progress.get(lesson['id'], False)
+        # Еще не записанные heartbeat (буфер в кэше): точка возобновления и время
+        lessons = [lesson for module in data.get('modules', []) for lesson in module.get('lessons', [])]
+        pending = {}
+        if enrollment is not None:
+            pending = get_pending_heartbeats(request.user, [lesson['id'] for lesson in lessons])
         
-        data['progress'] = enrollment.progress
-        data['enrollment_status'] = enrollment.status
+        # Add completed status to each lesson
+        for lesson in lessons:
+            completed, last_position, time_spent = lesson_progress.get(lesson['id'], (False, 0, 0))
+            item = pending.get(lesson['id'])
+            if item is not None:
+                values = item['values'] or {}
+                last_position = values.get('position', last_position)
+                time_spent += item['counters'].get('seconds', 0)
+            lesson['completed'] = completed
+            lesson['last_position'] = last_position
+            lesson['time_spent'] = time_spent
+        
+        data['enrolled'] = enrollment is not None
+        data['progress'] = enrollment.progress if enrollment else 0
+        data['enrollment_status'] = enrollment.status if enrollment else None
         
         return Response(data)
     
@@ -327,13 +595,7 @@ class CourseViewSet(viewsets.ModelViewSet):
             )
         
         # Check if all lessons are completed
-        total_lessons = Lesson.objects.filter(module__course=course).count()
-        completed_lessons = LessonProgress.objects.filter(
-            enrollment=enrollment,
-            completed=True
-        ).count()
-        
-        if completed_lessons < total_lessons:
+        if enrollment.completed_lessons < course.total_required_lessons:
             return Response(
                 {'error': 'Not all lessons are completed'},
                 status=status.HTTP_400_BAD_REQUEST
@@ -596,6 +858,77 @@ class LessonViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = LessonSerializer
     
+    @action(detail=False, methods=['post'])
+    def sync(self, request):
+        """
+        Apply a batch of offline lesson completions
+        
+        Request body:
+        {
+            "events": [{"lesson_id": int, "completed_at": datetime (optional)}, ...]
+        }
+        
+        Events may span several courses. Returns per-lesson status
+        (completed, already_completed, not_enrolled, not_found) and the
+        resulting progress of every affected enrollment.
+        """
+        serializer = LessonProgressSyncSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        result = sync_lesson_progress(request.user, serializer.validated_data['events'])
+        return Response(result, status=status.HTTP_200_OK)
+    
+    @action(detail=True, methods=['get'])
+    def content(self, request, pk=None):
+        """
+        Lesson text body (content, content_kz, content_en)
+        
+        Course outlines carry lesson summaries only. The body is served with
+        an ETag (lesson id, ?lang= variant, updated_at): a repeated request with
+        If-None-Match gets 304 Not Modified without a body. Responses are
+        gzip-compressed (see lesson_urls.py).
+        """
+        lesson = self.get_object()
+        lang = get_resolved_language(request) or 'all'
+        etag = quote_etag(f'{lesson.pk}-{lang}-{lesson.updated_at.timestamp():.6f}')
+        
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            not_modified['ETag'] = etag
+            return not_modified
+        
+        serializer = LessonContentSerializer(lesson, context=self.get_serializer_context())
+        response = Response(serializer.data)
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+    
+    @action(detail=True, methods=['post'])
+    def heartbeat(self, request, pk=None):
+        """
+        Player tick: accumulate watch time and remember the resume position
+        
+        Request body:
+        {
+            "position": int (seconds, optional),
+            "elapsed": int (seconds since the previous heartbeat)
+        }
+        
+        Nothing is written to the database here: ticks are aggregated in the
+        cache and flushed to LessonProgress.time_spent / last_position in
+        batches (see progress.record_lesson_heartbeat).
+        """
+        serializer = LessonHeartbeatSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        record_lesson_heartbeat(
+            request.user,
+            int(pk),
+            position=serializer.validated_data.get('position'),
+            elapsed=serializer.validated_data['elapsed'],
+        )
+        return Response(status=status.HTTP_202_ACCEPTED)
+    
     @action(detail=True, methods=['post'])
     def complete(self, request, pk=None):
         """Mark lesson as completed"""
@@ -613,31 +946,32 @@ class LessonViewSet(viewsets.ReadOnlyModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Create or update lesson progress
-        progress, created = LessonProgress.objects.get_or_create(
-            enrollment=enrollment,
-            lesson=lesson,
-            defaults={'completed': True, 'completed_at': timezone.now()}
-        )
-        
-        if not created and not progress.completed:
-            progress.completed = True
-            progress.completed_at = timezone.now()
-            progress.save()
-        
-        # Update course progress
-        total_lessons = Lesson.objects.filter(module__course=enrollment.course).count()
-        completed_lessons = LessonProgress.objects.filter(
-            enrollment=enrollment,
-            completed=True
-        ).count()
+        course = lesson.module.course
         
-        enrollment.progress = int((completed_lessons / total_lessons * 100) if total_lessons > 0 else 0)
-        enrollment.save()
+        # Create or update lesson progress and bump enrollment counter in one transaction
+        with transaction.atomic():
+            progress, created = LessonProgress.objects.get_or_create(
+                enrollment=enrollment,
+                lesson=lesson,
+                defaults={'completed': True, 'completed_at': timezone.now()}
+            )
+            
+            newly_completed = created
+            if not created and not progress.completed:
+                # Условное обновление: счетчик увеличит только один из параллельных запросов
+                newly_completed = LessonProgress.objects.filter(
+                    pk=progress.pk,
+                    completed=False
+                ).update(completed=True, completed_at=timezone.now()) == 1
+            
+            # Update course progress (O(1): counters instead of COUNT over lessons/progress)
+            if newly_completed and lesson.required:
+                increment_completed_lessons(enrollment, course.total_required_lessons)
         
         # Check if all lessons are completed
         # Status will be changed to 'pending_pdek' after SMS verification
-        all_lessons_completed = completed_lessons >= total_lessons and total_lessons > 0
+        total_lessons = course.total_required_lessons
+        all_lessons_completed = enrollment.completed_lessons >= total_lessons and total_lessons > 0
         
         return Response({
             'message': 'Lesson completed',
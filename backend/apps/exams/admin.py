@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import TestAttempt, ExtraAttemptRequest
+from django.utils import timezone
+from apps.notifications.models import Notification
+from .models import TestAttempt, ExtraAttemptRequest, AttemptQuota
+from .quota import approve_extra_request, recount_quota
 
 
 @admin.register(TestAttempt)
@@ -11,13 +14,30 @@ class TestAttemptAdmin(admin.ModelAdmin):
     readonly_fields = ('started_at', 'completed_at', 'score', 'passed')
 
 
+@admin.register(AttemptQuota)
+class AttemptQuotaAdmin(admin.ModelAdmin):
+    list_display = ('user', 'test', 'attempts_used', 'extra_attempts', 'updated_at')
+    search_fields = ('user__phone', 'user__full_name', 'test__title')
+    readonly_fields = ('attempts_used', 'extra_attempts', 'updated_at')
+    actions = ['recount']
+    
+    @admin.action(description='Пересчитать квоты по попыткам и запросам')
+    def recount(self, request, queryset):
+        """Recount attempts used and approved extra attempts from the source tables"""
+        for quota in queryset:
+            recount_quota(quota)
+        self.message_user(request, f'Пересчитано квот: {len(queryset)}')
+
+
 @admin.register(ExtraAttemptRequest)
 class ExtraAttemptRequestAdmin(admin.ModelAdmin):
     list_display = ('user', 'test', 'status', 'processed_by', 'created_at', 'processed_at')
     list_filter = ('status', 'created_at', 'processed_at')
     search_fields = ('user__phone', 'user__full_name', 'test__title', 'reason')
     ordering = ('-created_at',)
-    readonly_fields = ('created_at', 'updated_at', 'processed_at')
+    # Статус меняется только действиями: одобрение должно увеличить квоту попыток
+    readonly_fields = ('status', 'processed_by', 'created_at', 'updated_at', 'processed_at')
+    actions = ['approve_requests', 'reject_requests']
     
     fieldsets = (
         ('Основная информация', {
@@ -30,4 +50,38 @@ class ExtraAttemptRequestAdmin(admin.ModelAdmin):
             'fields': ('created_at', 'updated_at')
         }),
     )
-
+    
+    @admin.action(description='Одобрить выбранные запросы')
+    def approve_requests(self, request, queryset):
+        """Approve pending requests through the same path as the API (quota increment)"""
+        approved = 0
+        for extra_request in queryset.filter(status='pending').select_related('test'):
+            if approve_extra_request(extra_request, request.user):
+                approved += 1
+                Notification.objects.create(
+                    user_id=extra_request.user_id,
+                    type='extra_attempt_approved',
+                    title='Запрос на дополнительные попытки одобрен',
+                    message=f'Ваш запрос на дополнительные попытки для теста "{extra_request.test.title}" был одобрен.'
+                )
+        self.message_user(request, f'Одобрено запросов: {approved}')
+    
+    @admin.action(description='Отклонить выбранные запросы')
+    def reject_requests(self, request, queryset):
+        """Reject pending requests (conditional update, as in the API)"""
+        rejected = 0
+        for extra_request in queryset.filter(status='pending').select_related('test'):
+            if ExtraAttemptRequest.objects.filter(pk=extra_request.pk, status='pending').update(
+                status='rejected',
+                processed_by=request.user,
+                processed_at=timezone.now(),
+                updated_at=timezone.now(),
+            ):
+                rejected += 1
+                Notification.objects.create(
+                    user_id=extra_request.user_id,
+                    type='extra_attempt_rejected',
+                    title='Запрос на дополнительные попытки отклонен',
+                    message=f'Ваш запрос на дополнительные попытки для теста "{extra_request.test.title}" был отклонен.'
+                )
+        self.message_user(request, f'Отклонено запросов: {rejected}')
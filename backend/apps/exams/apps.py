@@ -6,3 +6,5 @@ class ExamsConfig(AppConfig):
     name = 'apps.exams'
     verbose_name = 'Exams'
 
+    def ready(self):
+        import apps.exams.signals
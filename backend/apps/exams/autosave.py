@@ -0,0 +1,89 @@
+"""
+Autosave of in-progress test answers through a write-behind buffer
+
+Every answer change is stored in the shared cache as its own buffer item
+('<attempt_id>:<question_id>'), so concurrent autosaves of one attempt never
+overwrite each other. Buffered answers are merged into TestAttempt.answers
+in batches (periodic task, command flush_attempt_answers, interval flush),
+and always before scoring in submit.
+
+Without a shared cache (LocMemCache by default) buffered answers would stay
+in the memory of one worker, invisible to other workers and to the Celery
+flush. In that case answers are merged into the database synchronously.
+"""
+from django.db import transaction
+
+from apps.core.write_behind import WriteBehindBuffer, is_shared_cache
+from apps.tests.answer_key import get_answer_key
+from .models import TestAttempt
+
+
+def _write_answers(items):
+    """
+    Записать накопленные ответы в TestAttempt.answers (обработчик буфера).
+
+    items: {'<attempt_id>:<question_id>': {'values': {'answer': ...}}}
+    Завершенные попытки пропускаются: их ответы уже учтены при сдаче.
+    """
+    answers = {}
+    for key, item in items.items():
+        attempt_id, question_id = key.split(':')
+        if item['values'] is not None:
+            answers.setdefault(int(attempt_id), {})[question_id] = item['values']['answer']
+
+    with transaction.atomic():
+        attempts = list(
+            TestAttempt.objects.select_for_update().filter(
+                id__in=answers, completed_at__isnull=True
+            ).only('id', 'answers')
+        )
+        for attempt in attempts:
+            attempt.answers = {**(attempt.answers or {}), **answers[attempt.id]}
+        TestAttempt.objects.bulk_update(attempts, ['answers'], batch_size=500)
+
+
+attempt_answers = WriteBehindBuffer('attempt_answers', _write_answers)
+
+
+def record_answers(attempt_id, answers):
+    """
+    Записать изменения ответов попытки в буфер (без запроса к БД).
+
+    Если кэш не общий для процессов, ответы сразу объединяются с
+    TestAttempt.answers (как при записи буфера).
+
+    Args:
+        attempt_id: Id незавершенной попытки
+        answers: {question_id: answer} - только измененные ответы
+    """
+    if not is_shared_cache():
+        _write_answers({
+            f'{attempt_id}:{question_id}': {'values': {'answer': answer}}
+            for question_id, answer in answers.items()
+        })
+        return
+    for question_id, answer in answers.items():
+        attempt_answers.add(f'{attempt_id}:{question_id}', values={'answer': answer})
+    attempt_answers.flush_if_due()
+
+
+def get_pending_answers(attempt):
+    """
+    Ответы попытки из буфера: {question_id: answer}.
+
+    Значения остаются в кэше и после записи в БД, поэтому результат может
+    совпадать с attempt.answers - он всегда не старее их. Без общего кэша
+    буфер не используется: кэш процесса может хранить устаревшие ответы.
+    """
+    if not is_shared_cache():
+        return {}
+    keys = {f'{attempt.id}:{question["id"]}': question['id'] for question in get_answer_key(attempt.test_id).questions}
+    return {keys[key]: values['answer'] for key, values in attempt_answers.get_values(keys).items()}
+
+
+def apply_pending_answers(attempt):
+    """Перенести ответы из буфера в attempt.answers (сохраняет вызывающий код)"""
+    pending = get_pending_answers(attempt)
+    if pending:
+        attempt.answers = {**(attempt.answers or {}), **pending}
+    return attempt.answers
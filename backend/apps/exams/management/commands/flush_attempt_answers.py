@@ -0,0 +1,17 @@
+"""
+Management command to write autosaved test answers to the database
+"""
+from django.core.management.base import BaseCommand
+
+from apps.exams.autosave import attempt_answers
+
+
+class Command(BaseCommand):
+    help = 'Flush autosaved answers of in-progress test attempts to TestAttempt.answers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Buffered items per write batch')
+
+    def handle(self, *args, **options):
+        count = attempt_answers.flush(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Flushed {count} autosaved answers'))
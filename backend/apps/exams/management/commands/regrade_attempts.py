@@ -0,0 +1,40 @@
+"""
+Management command to regrade completed test attempts against current questions
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.exams.regrade import regrade_test
+from apps.tests.models import Test
+
+
+class Command(BaseCommand):
+    help = 'Recalculate score and passed of all completed attempts of the given tests and report pass/fail flips'
+
+    def add_arguments(self, parser):
+        parser.add_argument('test_ids', nargs='+', type=int, help='Test IDs')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Attempts per vectorized batch')
+        parser.add_argument('--dry-run', action='store_true', help='Only report changes, do not write them')
+
+    def handle(self, *args, **options):
+        tests = {test.id: test for test in Test.objects.filter(id__in=options['test_ids'])}
+        missing = set(options['test_ids']) - set(tests)
+        if missing:
+            raise CommandError(f'Tests not found: {", ".join(map(str, sorted(missing)))}')
+
+        for test_id in options['test_ids']:
+            report = regrade_test(tests[test_id], batch_size=options['batch_size'], dry_run=options['dry_run'])
+            self.stdout.write(
+                f"Test {test_id}: {report['changed']} of {report['attempts']} attempts changed, "
+                f"{report['failed_to_passed']} failed -> passed, {report['passed_to_failed']} passed -> failed"
+            )
+            for flip in report['flipped']:
+                self.stdout.write(
+                    f"  attempt {flip['attempt_id']} (user {flip['user_id']}): "
+                    f"{flip['old_score']} -> {flip['new_score']:.2f}, "
+                    f"{'passed' if flip['passed'] else 'failed'}; "
+                    f"protocols {flip['protocol_ids'] or '-'}, certificates {flip['certificate_ids'] or '-'}"
+                )
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('Dry run: no attempts were updated'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Regraded {len(tests)} tests'))
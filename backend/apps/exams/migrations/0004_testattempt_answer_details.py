@@ -0,0 +1,18 @@
+# Generated manually for materialized answer details
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0003_add_video_recording'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testattempt',
+            name='answer_details',
+            field=models.JSONField(blank=True, editable=False, help_text='Per-question breakdown computed at submit (see refresh_answer_details)', null=True),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated manually for race-free attempt quotas
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def backfill_quotas(apps, schema_editor):
+    TestAttempt = apps.get_model('exams', 'TestAttempt')
+    ExtraAttemptRequest = apps.get_model('exams', 'ExtraAttemptRequest')
+    AttemptQuota = apps.get_model('exams', 'AttemptQuota')
+    
+    quotas = {}
+    used = TestAttempt.objects.values('user_id', 'test_id').annotate(count=Count('id')).order_by()
+    for row in used:
+        quotas.setdefault((row['user_id'], row['test_id']), {})['attempts_used'] = row['count']
+    extra = ExtraAttemptRequest.objects.filter(status='approved').values('user_id', 'test_id').annotate(count=Count('id')).order_by()
+    for row in extra:
+        quotas.setdefault((row['user_id'], row['test_id']), {})['extra_attempts'] = row['count']
+    
+    AttemptQuota.objects.bulk_create(
+        [AttemptQuota(user_id=user_id, test_id=test_id, **counts) for (user_id, test_id), counts in quotas.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tests', '0001_initial'),
+        ('exams', '0004_testattempt_answer_details'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttemptQuota',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts_used', models.IntegerField(default=0, help_text='Started attempts (maintained automatically)')),
+                ('extra_attempts', models.IntegerField(default=0, help_text='Approved extra attempts (maintained automatically)')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('test', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attempt_quotas', to='tests.test')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attempt_quotas', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'attempt_quotas',
+                'unique_together': {('user', 'test')},
+            },
+        ),
+        migrations.RunPython(backfill_quotas, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from django.conf import settings
 from apps.tests.models import Test
+from apps.tests.answer_key import get_answer_key
 import os
 
 
@@ -48,6 +49,27 @@ class ExtraAttemptRequest(models.Model):
         return f"{self.user.full_name or self.user.phone} - {self.test.title} ({self.get_status_display()})"
 
 
+class AttemptQuota(models.Model):
+    """Attempts used and extra attempts granted per (user, test), see exams.quota"""
+    
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='attempt_quotas', on_delete=models.CASCADE)
+    test = models.ForeignKey(Test, related_name='attempt_quotas', on_delete=models.CASCADE)
+    attempts_used = models.IntegerField(default=0, help_text='Started attempts (maintained automatically)')
+    extra_attempts = models.IntegerField(default=0, help_text='Approved extra attempts (maintained automatically)')
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'attempt_quotas'
+        unique_together = ['user', 'test']
+    
+    def __str__(self):
+        return f"{self.user_id} - {self.test_id}: {self.attempts_used}/+{self.extra_attempts}"
+    
+    def max_allowed(self, test):
+        return test.max_attempts + self.extra_attempts
+
+
 class TestAttempt(models.Model):
     """Test attempt model"""
     
@@ -58,6 +80,7 @@ class TestAttempt(models.Model):
     score = models.FloatField(null=True, blank=True, help_text='Score percentage')
     passed = models.BooleanField(null=True, blank=True)
     answers = models.JSONField(default=dict, help_text='User answers: {question_id: answer}')
+    answer_details = models.JSONField(null=True, blank=True, editable=False, help_text='Per-question breakdown computed at submit (see refresh_answer_details)')
     video_recording = models.FileField(upload_to=test_attempt_video_upload_to, null=True, blank=True, help_text='Video recording of test attempt')
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     user_agent = models.CharField(max_length=255, blank=True)
@@ -70,183 +93,25 @@ class TestAttempt(models.Model):
         return f"{self.user.full_name or self.user.phone} - {self.test.title} ({self.score}%)"
     
     def calculate_score(self):
-        """Calculate score based on answers"""
-        import logging
-        logger = logging.getLogger(__name__)
-        
+        """Calculate score based on answers (compiled answer key of the test)"""
         if not self.answers:
             return 0, False
-        
-        total_weight = 0
-        correct_weight = 0
-        
-        for question in self.test.questions.all():
-            total_weight += question.weight
-            question_id = str(question.id)
-            
-            if question_id not in self.answers:
-                logger.debug(f"Question {question_id}: No answer provided")
-                continue
-            
-            user_answer = self.answers[question_id]
-            correct_answers = question.get_correct_answers()
-            
-            # Логирование для отладки
-            logger.debug(f"Question {question_id} (type: {question.type}):")
-            logger.debug(f"  User answer: {user_answer} (type: {type(user_answer)})")
-            logger.debug(f"  Correct answers: {correct_answers} (type: {type(correct_answers)})")
-            logger.debug(f"  Options: {question.options}")
-            
-            # Check if answer is correct based on question type
-            is_correct = False
-            if question.type in ['single_choice', 'yes_no']:
-                # For single_choice and yes_no, compare as strings
-                # For single_choice: compare ID strings
-                # For yes_no: compare text strings ("Да"/"Нет")
-                user_answer_str = str(user_answer)
-                correct_answers_str = [str(ca) for ca in correct_answers]
-                is_correct = user_answer_str in correct_answers_str
-                logger.debug(f"  Comparison: '{user_answer_str}' in {correct_answers_str} = {is_correct}")
-            elif question.type == 'multiple_choice':
-                # For multiple_choice, compare sets of ID strings
-                user_answers = user_answer if isinstance(user_answer, list) else [user_answer]
-                user_answers_set = set(str(a) for a in user_answers)
-                correct_answers_set = set(str(ca) for ca in correct_answers)
-                is_correct = user_answers_set == correct_answers_set
-                logger.debug(f"  Comparison: {user_answers_set} == {correct_answers_set} = {is_correct}")
-            elif question.type in ['matching', 'ordering', 'short_answer']:
-                # For these types, compare directly as strings
-                is_correct = str(user_answer) == str(correct_answers[0]) if correct_answers else False
-                logger.debug(f"  Comparison: '{str(user_answer)}' == '{str(correct_answers[0]) if correct_answers else None}' = {is_correct}")
-            
-            logger.debug(f"  Result: {'CORRECT' if is_correct else 'INCORRECT'}")
-            
-            if is_correct:
-                correct_weight += question.weight
-        
-        if total_weight == 0:
-            return 0, False
-        
-        score_percentage = (correct_weight / total_weight) * 100
-        passed = score_percentage >= self.test.passing_score
-        
-        return score_percentage, passed
+        return get_answer_key(self.test_id).score(self.answers, self.test.passing_score)
     
     def get_answer_details(self):
         """Get detailed information about each answer"""
         if not self.answers:
             return []
-        
-        details = []
-        for question in self.test.questions.all():
-            question_id = str(question.id)
-            user_answer = self.answers.get(question_id)
-            correct_answers = question.get_correct_answers()
-            
-            # Determine if answer is correct
-            is_correct = False
-            if question_id in self.answers:
-                user_answer_value = self.answers[question_id]
-                if question.type in ['single_choice', 'yes_no']:
-                    is_correct = str(user_answer_value) in [str(ca) for ca in correct_answers]
-                elif question.type == 'multiple_choice':
-                    user_answers = user_answer_value if isinstance(user_answer_value, list) else [user_answer_value]
-                    is_correct = set(str(a) for a in user_answers) == set(str(ca) for ca in correct_answers)
-                elif question.type in ['matching', 'ordering', 'short_answer']:
-                    is_correct = str(user_answer_value) == str(correct_answers[0]) if correct_answers else False
-            
-            # Get answer texts for display (use user_answer_value if available, otherwise user_answer)
-            user_answer_for_display = self.answers.get(question_id) if question_id in self.answers else user_answer
-            user_answer_display = self._get_answer_display(question, user_answer_for_display)
-            correct_answer_display = self._get_correct_answer_display(question, correct_answers)
-            
-            details.append({
-                'question_id': str(question.id),
-                'question_text': question.text,
-                'question_type': question.type,
-                'user_answer': user_answer_for_display if question_id in self.answers else user_answer,
-                'user_answer_display': user_answer_display,
-                'correct_answers': correct_answers,
-                'correct_answer_display': correct_answer_display,
-                'is_correct': is_correct,
-            })
-        
-        return details
-    
-    def _get_answer_display(self, question, answer_value):
-        """Get human-readable display of user answer"""
-        if answer_value is None:
-            return 'Не отвечено'
-        
-        if question.type in ['single_choice', 'yes_no']:
-            # For single_choice, find option text by ID
-            if question.type == 'single_choice' and question.options:
-                for opt in question.options:
-                    if str(opt.get('id')) == str(answer_value):
-                        return opt.get('text', str(answer_value))
-            # For yes_no, return as is (should be "Да" or "Нет")
-            if question.type == 'yes_no':
-                answer_str = str(answer_value).strip()
-                # Handle cases where answer might be stored as boolean or number
-                if answer_str in ['True', 'true', '1']:
-                    return 'Да'
-                elif answer_str in ['False', 'false', '0']:
-                    return 'Нет'
-                # Otherwise return as is (should be "Да" or "Нет")
-                return answer_str if answer_str in ['Да', 'Нет'] else str(answer_value)
-            return str(answer_value)
-        elif question.type == 'multiple_choice':
-            # For multiple_choice, find option texts by IDs
-            if not isinstance(answer_value, list):
-                answer_value = [answer_value]
-            result = []
-            for ans in answer_value:
-                found = False
-                ans_str = str(ans)
-                if question.options:
-                    for opt in question.options:
-                        opt_id = opt.get('id')
-                        if opt_id and str(opt_id) == ans_str:
-                            result.append(opt.get('text', str(ans)))
-                            found = True
-                            break
-                if not found:
-                    result.append(str(ans))
-            return ', '.join(result) if result else 'Не отвечено'
-        else:
-            return str(answer_value)
+        return get_answer_key(self.test_id).details(self.answers)
     
-    def _get_correct_answer_display(self, question, correct_answers):
-        """Get human-readable display of correct answers"""
-        if not correct_answers:
-            return 'Нет правильного ответа'
+    def refresh_answer_details(self, answer_key=None):
+        """
+        Recompute stored answer details (at submit and after regrading)
         
-        if question.type in ['single_choice', 'yes_no']:
-            # For single_choice, find option text by ID
-            if question.type == 'single_choice' and question.options:
-                ca_str = str(correct_answers[0])
-                for opt in question.options:
-                    opt_id = opt.get('id')
-                    if opt_id and str(opt_id) == ca_str:
-                        return opt.get('text', str(correct_answers[0]))
-            # For yes_no, return as is
-            return str(correct_answers[0])
-        elif question.type == 'multiple_choice':
-            # For multiple_choice, find option texts by IDs
-            result = []
-            for ca in correct_answers:
-                found = False
-                ca_str = str(ca)
-                if question.options:
-                    for opt in question.options:
-                        opt_id = opt.get('id')
-                        if opt_id and str(opt_id) == ca_str:
-                            result.append(opt.get('text', str(ca)))
-                            found = True
-                            break
-                if not found:
-                    result.append(str(ca))
-            return ', '.join(result)
+        The caller saves the attempt (answer_details field).
+        """
+        if not self.answers:
+            self.answer_details = []
         else:
-            return str(correct_answers[0]) if correct_answers else ''
-
+            self.answer_details = (answer_key or get_answer_key(self.test_id)).details(self.answers)
+        return self.answer_details
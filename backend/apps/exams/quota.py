@@ -0,0 +1,113 @@
+"""
+Attempt quotas: race-free limit of test attempts per (user, test)
+
+AttemptQuota stores the number of started attempts and of approved extra
+attempts. Starting an attempt is one conditional UPDATE that increments
+attempts_used only while it is below max_attempts + extra_attempts, so
+concurrent starts can never exceed the limit and no COUNT over
+test_attempts / extra_attempt_requests is needed.
+"""
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import AttemptQuota, TestAttempt, ExtraAttemptRequest
+
+
+def count_quota(user_id, test_id):
+    """Счетчики квоты по исходным таблицам (создание строки, пересчет)"""
+    return {
+        'attempts_used': TestAttempt.objects.filter(user_id=user_id, test_id=test_id).count(),
+        'extra_attempts': ExtraAttemptRequest.objects.filter(
+            user_id=user_id, test_id=test_id, status='approved'
+        ).count(),
+    }
+
+
+def get_quota(user_id, test_id):
+    """
+    Строка квоты (создается при первом обращении со счетчиками из таблиц).
+
+    Returns:
+        AttemptQuota
+    """
+    quota = AttemptQuota.objects.filter(user_id=user_id, test_id=test_id).first()
+    if quota is None:
+        quota, _ = AttemptQuota.objects.get_or_create(
+            user_id=user_id, test_id=test_id, defaults=count_quota(user_id, test_id),
+        )
+    return quota
+
+
+def claim_attempt(user_id, test):
+    """
+    Занять попытку атомарным условным UPDATE.
+
+    Вызывать в транзакции вместе с созданием TestAttempt: при откате
+    попытка возвращается в квоту.
+
+    Returns:
+        tuple: (claimed, max_allowed)
+    """
+    quota = get_quota(user_id, test.id)
+    claimed = AttemptQuota.objects.filter(
+        pk=quota.pk,
+        attempts_used__lt=F('extra_attempts') + test.max_attempts,
+    ).update(attempts_used=F('attempts_used') + 1)
+    if claimed:
+        return True, quota.max_allowed(test)
+    quota.refresh_from_db(fields=['attempts_used', 'extra_attempts'])
+    return False, quota.max_allowed(test)
+
+
+def grant_extra_attempt(quota):
+    """
+    Добавить одобренную дополнительную попытку.
+
+    Строку квоты нужно получить (get_quota) до смены статуса запроса на
+    'approved': иначе при создании строки запрос будет учтен дважды.
+    """
+    AttemptQuota.objects.filter(pk=quota.pk).update(extra_attempts=F('extra_attempts') + 1)
+
+
+def release_quota(user_id, test_id, field):
+    """
+    Вернуть в квоту удаленную попытку или одобренную доп. попытку.
+
+    Args:
+        field: 'attempts_used' или 'extra_attempts'
+    """
+    AttemptQuota.objects.filter(user_id=user_id, test_id=test_id).update(
+        **{field: Greatest(F(field) - 1, Value(0))}
+    )
+
+
+def recount_quota(quota):
+    """Пересчитать счетчики квоты по исходным таблицам (админка)"""
+    counts = count_quota(quota.user_id, quota.test_id)
+    AttemptQuota.objects.filter(pk=quota.pk).update(**counts)
+    return counts
+
+
+def approve_extra_request(extra_request, admin, admin_response=None):
+    """
+    Одобрить запрос на дополнительную попытку (API и админка).
+
+    Смена статуса и увеличение квоты - в одной транзакции; условный UPDATE
+    делает повторное одобрение пустой операцией.
+
+    Returns:
+        bool: True, если запрос был в статусе 'pending' и одобрен
+    """
+    now = timezone.now()
+    fields = {'status': 'approved', 'processed_by': admin, 'processed_at': now, 'updated_at': now}
+    if admin_response:
+        fields['admin_response'] = admin_response
+    with transaction.atomic():
+        quota = get_quota(extra_request.user_id, extra_request.test_id)
+        if not ExtraAttemptRequest.objects.filter(pk=extra_request.pk, status='pending').update(**fields):
+            return False
+        grant_extra_attempt(quota)
+    extra_request.refresh_from_db()
+    return True
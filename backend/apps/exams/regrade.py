@@ -0,0 +1,226 @@
+"""
+Vectorized regrading of completed test attempts after a question fix
+
+Answers of a chunk of attempts are encoded against the compiled answer key
+as an integer matrix (attempts x questions): each answer becomes a bitmask
+over the question's answer vocabulary. Correctness of the whole chunk is
+then two NumPy comparisons against the row of correct masks, and scores
+are one matrix-vector product with the question weights. Only rows whose
+score, pass/fail result or stored answer details changed are written back
+with bulk_update.
+
+Stored answer details are rebuilt only for rows without details, with a
+changed result, or whose stored entries differ from the current key
+(question text, type, correct answers; answer display of answered
+questions). The check compares stored values and builds nothing.
+"""
+import numpy as np
+
+from django.db import transaction
+
+from apps.certificates.models import Certificate
+from apps.protocols.models import Protocol
+from apps.tests.answer_key import build_answer_key, CHOICE_TYPES
+from .models import TestAttempt
+
+# Бит 62 - ответ вне словаря вопроса (для multiple_choice ответ тогда заведомо неверен)
+MAX_VOCABULARY = 62
+UNKNOWN_BIT = 1 << MAX_VOCABULARY
+SCORE_TOLERANCE = 1e-9
+
+
+class _QuestionEncoder:
+    """Кодирование ответа на один вопрос в битовую маску"""
+
+    def __init__(self, key, question):
+        self.key = key
+        self.question = question
+        self.multiple = question['type'] == 'multiple_choice'
+        vocabulary = list(dict.fromkeys([*question['options'], *sorted(question['correct_set'])]))
+        self.fallback = (
+            (question['type'] not in CHOICE_TYPES and not self.multiple)
+            or len(vocabulary) > MAX_VOCABULARY
+        )
+        if self.fallback:
+            # Сравнение строк (matching, ordering, short_answer) или слишком много вариантов:
+            # маска 1 - ответ верен по AnswerKey.is_correct
+            self.multiple = False
+            self.bits = {}
+            self.correct_mask = 1
+        else:
+            self.bits = {value: 1 << index for index, value in enumerate(vocabulary)}
+            self.correct_mask = 0
+            for value in question['correct_set']:
+                self.correct_mask |= self.bits[value]
+
+    def encode(self, answer):
+        if self.fallback:
+            return 1 if self.key.is_correct(self.question, answer) else 0
+        if self.multiple:
+            mask = 0
+            for value in (answer if isinstance(answer, list) else [answer]):
+                mask |= self.bits.get(str(value), UNKNOWN_BIT)
+            return mask
+        return self.bits.get(str(answer), 0)
+
+
+def _score_chunk(rows, encoders, index, weights, multiple, correct_masks, total_weight, passing_score):
+    """
+    Оценить пачку попыток.
+
+    Returns:
+        tuple: (scores, passed) - массивы NumPy длины len(rows)
+    """
+    codes = np.zeros((len(rows), len(encoders)), dtype=np.int64)
+    answered = np.zeros((len(rows), len(encoders)), dtype=bool)
+    has_answers = np.zeros(len(rows), dtype=bool)
+
+    for i, row in enumerate(rows):
+        answers = row[1]
+        if not answers:
+            continue
+        has_answers[i] = True
+        for question_id, answer in answers.items():
+            j = index.get(str(question_id))
+            if j is not None:
+                answered[i, j] = True
+                codes[i, j] = encoders[j].encode(answer)
+
+    # multiple_choice: набор ответов совпадает с правильным; остальные: выбран один из правильных
+    correct = answered & np.where(multiple, codes == correct_masks, (codes & correct_masks) != 0)
+
+    if total_weight == 0:
+        scores = np.zeros(len(rows))
+    else:
+        scores = correct.astype(np.int64) @ weights / total_weight * 100
+    passed = has_answers & (total_weight > 0) & (scores >= passing_score)
+    return scores, passed
+
+
+def _details_stale(details, answers, key, fingerprints):
+    """
+    Устарели ли сохраненные подробности попытки относительно ключа.
+
+    Данные вопросов (текст, тип, правильные ответы) сравниваются по всем
+    вопросам, отображение ответа пользователя - только по отвеченным.
+    """
+    if details is None:
+        return True
+    if not answers:
+        return details != []
+    if len(details) != len(fingerprints):
+        return True
+    for entry, fingerprint, question in zip(details, fingerprints, key.questions):
+        if (
+            entry.get('question_id'), entry.get('question_text'), entry.get('question_type'),
+            entry.get('correct_answers'), entry.get('correct_answer_display'),
+        ) != fingerprint:
+            return True
+        if question['id'] in answers and (
+            entry.get('user_answer_display') != key.answer_display(question, answers[question['id']])
+        ):
+            return True
+    return False
+
+
+def _review_links(attempt_ids):
+    """Протоколы и сертификаты попыток, у которых сменился результат"""
+    protocols = {}
+    for protocol_id, attempt_id in Protocol.objects.filter(attempt_id__in=attempt_ids).values_list('id', 'attempt_id'):
+        protocols.setdefault(attempt_id, []).append(protocol_id)
+    certificates = {}
+    protocol_attempts = {pid: aid for aid, pids in protocols.items() for pid in pids}
+    if protocol_attempts:
+        for certificate_id, protocol_id in Certificate.objects.filter(
+            protocol_id__in=protocol_attempts
+        ).values_list('id', 'protocol_id'):
+            certificates.setdefault(protocol_attempts[protocol_id], []).append(certificate_id)
+    return protocols, certificates
+
+
+def regrade_test(test, batch_size=5000, dry_run=False, progress_callback=None):
+    """
+    Пересчитать score/passed всех завершенных попыток теста по текущим вопросам.
+
+    Args:
+        test: Test
+        batch_size: Попыток в пачке (одна матрица и один bulk_update)
+        dry_run: Только отчет, без записи в БД
+        progress_callback: Функция(processed) для отслеживания прогресса
+
+    Returns:
+        dict: attempts, changed, failed_to_passed, passed_to_failed, flipped
+            (список попыток со сменой результата, с id протоколов и сертификатов)
+    """
+    # Ключ строится по БД: версия ключа в кэше процесса Celery может быть устаревшей
+    key = build_answer_key(test)
+    encoders = [_QuestionEncoder(key, question) for question in key.questions]
+    index = {question['id']: j for j, question in enumerate(key.questions)}
+    weights = np.array([question['weight'] for question in key.questions], dtype=np.int64)
+    multiple = np.array([encoder.multiple for encoder in encoders], dtype=bool)
+    correct_masks = np.array([encoder.correct_mask for encoder in encoders], dtype=np.int64)
+    fingerprints = [
+        (question['id'], question['text'], question['type'], question['correct'], question['correct_display'])
+        for question in key.questions
+    ]
+
+    report = {'attempts': 0, 'changed': 0, 'failed_to_passed': 0, 'passed_to_failed': 0, 'flipped': []}
+    attempts = TestAttempt.objects.filter(test=test, completed_at__isnull=False).order_by('id')
+    last_id = 0
+    while True:
+        rows = list(
+            attempts.filter(id__gt=last_id).values_list(
+                'id', 'answers', 'score', 'passed', 'user_id', 'answer_details',
+            )[:batch_size]
+        )
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        scores, passed = _score_chunk(
+            rows, encoders, index, weights, multiple, correct_masks, key.total_weight, test.passing_score,
+        )
+        old_scores = np.array([row[2] if row[2] is not None else np.nan for row in rows], dtype=float)
+        old_passed = np.array([bool(row[3]) for row in rows], dtype=bool)
+        changed = (
+            np.isnan(old_scores)
+            | (np.abs(scores - np.nan_to_num(old_scores)) > SCORE_TOLERANCE)
+            | (passed != old_passed)
+            | np.array([row[3] is None for row in rows], dtype=bool)
+        )
+        flipped = np.flatnonzero(passed != old_passed)
+
+        if flipped.size:
+            protocols, certificates = _review_links([rows[i][0] for i in flipped])
+            for i in flipped:
+                attempt_id = rows[i][0]
+                report['flipped'].append({
+                    'attempt_id': attempt_id,
+                    'user_id': rows[i][4],
+                    'old_score': rows[i][2],
+                    'new_score': float(scores[i]),
+                    'passed': bool(passed[i]),
+                    'protocol_ids': protocols.get(attempt_id, []),
+                    'certificate_ids': certificates.get(attempt_id, []),
+                })
+            report['failed_to_passed'] += int(np.count_nonzero(passed[flipped]))
+            report['passed_to_failed'] += int(np.count_nonzero(~passed[flipped]))
+
+        # Подробности ответов пересобираются (TestAttempt.refresh_answer_details) только там, где они устарели
+        updates = []
+        for i, row in enumerate(rows):
+            if not changed[i] and not _details_stale(row[5], row[1], key, fingerprints):
+                continue
+            attempt = TestAttempt(id=row[0], test_id=test.id, answers=row[1], score=float(scores[i]), passed=bool(passed[i]))
+            attempt.refresh_answer_details(key)
+            updates.append(attempt)
+        if updates and not dry_run:
+            with transaction.atomic():
+                TestAttempt.objects.bulk_update(updates, ['score', 'passed', 'answer_details'], batch_size=1000)
+
+        report['attempts'] += len(rows)
+        report['changed'] += len(updates)
+        if progress_callback:
+            progress_callback(report['attempts'])
+
+    return report
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import TestAttempt, ExtraAttemptRequest
+from .autosave import get_pending_answers
 from apps.tests.serializers import TestSerializer
 from apps.accounts.serializers import UserSerializer
 
@@ -20,6 +21,13 @@ class TestAttemptSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'started_at', 'completed_at', 'score', 'passed', 'answer_details', 'video_recording']
     
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if not instance.completed_at:
+            # Ответы автосохранения, еще не записанные в БД
+            data['answers'] = {**(data.get('answers') or {}), **get_pending_answers(instance)}
+        return data
+    
     def get_video_recording(self, obj):
         """Return video recording URL if available"""
         if obj.video_recording:
@@ -30,9 +38,11 @@ class TestAttemptSerializer(serializers.ModelSerializer):
         return None
     
     def get_answer_details(self, obj):
-        """Get detailed information about each answer"""
+        """Per-question breakdown stored at submit (computed only for attempts submitted before it was stored)"""
         if not obj.completed_at:
             return []
+        if obj.answer_details is not None:
+            return obj.answer_details
         return obj.get_answer_details()
 
 
@@ -58,7 +68,8 @@ class ExtraAttemptRequestSerializer(serializers.ModelSerializer):
             'id', 'user', 'test', 'reason', 'status', 'admin_response',
             'processed_by', 'processed_at', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at', 'processed_by', 'processed_at']
+        # status меняется только действиями approve/reject (они обновляют квоту попыток)
+        read_only_fields = ['id', 'status', 'created_at', 'updated_at', 'processed_by', 'processed_at']
 
 
 class ExtraAttemptRequestCreateSerializer(serializers.Serializer):
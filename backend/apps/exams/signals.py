@@ -0,0 +1,18 @@
+"""Signals for keeping attempt quotas in sync with deleted rows"""
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from .models import TestAttempt, ExtraAttemptRequest
+from .quota import release_quota
+
+
+@receiver(post_delete, sender=TestAttempt)
+def attempt_deleted(sender, instance, **kwargs):
+    """Free the attempt slot when an attempt is deleted"""
+    release_quota(instance.user_id, instance.test_id, 'attempts_used')
+
+
+@receiver(post_delete, sender=ExtraAttemptRequest)
+def extra_request_deleted(sender, instance, **kwargs):
+    """Withdraw the extra attempt when an approved request is deleted"""
+    if instance.status == 'approved':
+        release_quota(instance.user_id, instance.test_id, 'extra_attempts')
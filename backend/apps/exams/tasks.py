@@ -0,0 +1,27 @@
+"""Celery tasks for exams"""
+from celery import shared_task
+
+from apps.core.jobs import run_job
+
+
+@shared_task
+def regrade_test_task(job_id):
+    """Regrade all completed attempts of a test after its questions were fixed"""
+    from apps.tests.models import Test
+    from .models import TestAttempt
+    from .regrade import regrade_test
+    
+    def handler(job):
+        test = Test.objects.get(pk=job.params['test_id'])
+        job.mark_running(total=TestAttempt.objects.filter(test=test, completed_at__isnull=False).count())
+        return regrade_test(test, progress_callback=job.set_progress)
+    
+    return run_job(job_id, handler)
+
+
+@shared_task
+def flush_attempt_answers_task():
+    """Write autosaved answers of in-progress test attempts to TestAttempt.answers"""
+    from .autosave import attempt_answers
+    
+    return attempt_answers.flush()
@@ -1,7 +1,9 @@
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.generics import get_object_or_404
 from django.utils import timezone
+from django.db import transaction
 from django.db.models import Count, Q
 
 from .models import TestAttempt, ExtraAttemptRequest
@@ -14,6 +16,10 @@ from .serializers import (
     ExtraAttemptRequestProcessSerializer,
 )
 from apps.tests.models import Test
+from apps.tests.answer_key import get_answer_key
+from apps.core.write_behind import is_shared_cache
+from .autosave import record_answers, apply_pending_answers
+from .quota import claim_attempt, get_quota, approve_extra_request
 from apps.accounts.permissions import IsAdminOrReadOnly
 
 
@@ -46,35 +52,24 @@ class TestAttemptViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        # Check max attempts (including approved extra attempts)
-        user_attempts = TestAttempt.objects.filter(
-            user=request.user,
-            test=test
-        ).count()
-        
-        # Count approved extra attempt requests
-        approved_extra_attempts = ExtraAttemptRequest.objects.filter(
-            user=request.user,
-            test=test,
-            status='approved'
-        ).count()
-        
-        max_allowed = test.max_attempts + approved_extra_attempts
-        
-        if user_attempts >= max_allowed:
-            return Response(
-                {'error': f'Maximum attempts ({max_allowed}) reached'},
-                status=status.HTTP_400_BAD_REQUEST
+        # Check max attempts (including approved extra attempts): one conditional
+        # increment of the quota row, concurrent starts cannot exceed the limit
+        with transaction.atomic():
+            claimed, max_allowed = claim_attempt(request.user.id, test)
+            if not claimed:
+                return Response(
+                    {'error': f'Maximum attempts ({max_allowed}) reached'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            # Create new attempt
+            attempt = TestAttempt.objects.create(
+                test=test,
+                user=request.user,
+                ip_address=self._get_client_ip(request),
+                user_agent=request.META.get('HTTP_USER_AGENT', '')
             )
         
-        # Create new attempt
-        attempt = TestAttempt.objects.create(
-            test=test,
-            user=request.user,
-            ip_address=self._get_client_ip(request),
-            user_agent=request.META.get('HTTP_USER_AGENT', '')
-        )
-        
         return Response(
             TestAttemptSerializer(attempt, context={'request': request}).data,
             status=status.HTTP_201_CREATED
@@ -102,17 +97,60 @@ class TestAttemptViewSet(viewsets.ModelViewSet):
         serializer = TestAttemptSaveSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        # Update answers - объединяем с существующими ответами
+        # Проверка по скомпилированному ключу ответов: вопросы этого теста, существующие варианты
+        errors = get_answer_key(attempt.test_id).validate(serializer.validated_data['answers'])
+        if errors:
+            return Response(
+                {'error': 'Invalid answers', 'answers': errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Update answers - объединяем с существующими ответами (включая еще не записанные автосохранением)
+        apply_pending_answers(attempt)
         if not attempt.answers:
             attempt.answers = {}
         attempt.answers.update(serializer.validated_data['answers'])
-        attempt.save()
+        attempt.save(update_fields=['answers'])
+        # Буфер автосохранения не должен потом перезаписать эти ответы более старыми
+        if is_shared_cache():
+            record_answers(attempt.id, serializer.validated_data['answers'])
         
         return Response(
             TestAttemptSerializer(attempt, context={'request': request}).data,
             status=status.HTTP_200_OK
         )
     
+    @action(detail=True, methods=['post'])
+    def autosave(self, request, pk=None):
+        """
+        Autosave changed answers during test (write-behind)
+        
+        Answers are buffered in the shared cache and written to the attempt
+        in batches (always before scoring in submit); without a shared cache
+        they are written directly. The response is only an acknowledgement,
+        without the serialized attempt.
+        """
+        # Одна легкая выборка вместо get_object() с select_related('test', 'user')
+        attempt = get_object_or_404(TestAttempt.objects.only('id', 'user', 'test', 'completed_at'), pk=pk)
+        if attempt.user_id != request.user.id:
+            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+        if attempt.completed_at:
+            return Response({'error': 'Test already completed'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        serializer = TestAttemptSaveSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        answers = serializer.validated_data['answers']
+        
+        errors = get_answer_key(attempt.test_id).validate(answers)
+        if errors:
+            return Response(
+                {'error': 'Invalid answers', 'answers': errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        record_answers(attempt.id, answers)
+        return Response({'saved': len(answers)}, status=status.HTTP_202_ACCEPTED)
+    
     @action(detail=True, methods=['post'])
     def submit(self, request, pk=None):
         """Submit test attempt and calculate score"""
@@ -150,10 +188,14 @@ class TestAttemptViewSet(viewsets.ModelViewSet):
                 )
             attempt.video_recording = video_file
         
+        # Ответы автосохранения, еще не записанные в БД, входят в оценку
+        apply_pending_answers(attempt)
+        
         # Calculate score
         score, passed = attempt.calculate_score()
         attempt.score = score
         attempt.passed = passed
+        attempt.refresh_answer_details()
         attempt.completed_at = timezone.now()
         attempt.save()
         
@@ -273,18 +315,9 @@ class ExtraAttemptRequestViewSet(viewsets.ModelViewSet):
             )
         
         # Check if max attempts actually reached
-        user_attempts = TestAttempt.objects.filter(
-            user=request.user,
-            test=test
-        ).count()
-        
-        approved_extra_attempts = ExtraAttemptRequest.objects.filter(
-            user=request.user,
-            test=test,
-            status='approved'
-        ).count()
-        
-        max_allowed = test.max_attempts + approved_extra_attempts
+        quota = get_quota(request.user.id, test.id)
+        user_attempts = quota.attempts_used
+        max_allowed = quota.max_allowed(test)
         
         if user_attempts < max_allowed:
             return Response(
@@ -334,13 +367,12 @@ class ExtraAttemptRequestViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Approve request
-        extra_request.status = 'approved'
-        extra_request.processed_by = request.user
-        extra_request.processed_at = timezone.now()
-        if request.data.get('admin_response'):
-            extra_request.admin_response = request.data['admin_response']
-        extra_request.save()
+        # Approve request: status change and quota increment in one transaction
+        if not approve_extra_request(extra_request, request.user, request.data.get('admin_response')):
+            return Response(
+                {'error': 'Request is already processed'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
         # Create notification for student
         from apps.notifications.models import Notification
@@ -376,12 +408,20 @@ class ExtraAttemptRequestViewSet(viewsets.ModelViewSet):
         serializer = ExtraAttemptRequestProcessSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        # Reject request
-        extra_request.status = 'rejected'
-        extra_request.processed_by = request.user
-        extra_request.processed_at = timezone.now()
-        extra_request.admin_response = serializer.validated_data.get('admin_response', '')
-        extra_request.save()
+        # Reject request (only while still pending: a concurrent approval wins)
+        updated = ExtraAttemptRequest.objects.filter(pk=extra_request.pk, status='pending').update(
+            status='rejected',
+            processed_by=request.user,
+            processed_at=timezone.now(),
+            updated_at=timezone.now(),
+            admin_response=serializer.validated_data.get('admin_response', ''),
+        )
+        if not updated:
+            return Response(
+                {'error': 'Request is already processed'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        extra_request.refresh_from_db()
         
         # Create notification for student
         from apps.notifications.models import Notification
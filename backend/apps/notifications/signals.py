@@ -5,18 +5,14 @@ from .models import Notification
 from apps.courses.models import CourseEnrollment
 from apps.protocols.models import Protocol
 from apps.certificates.models import Certificate
+from .utils import build_course_assigned_notification
 
 
 @receiver(post_save, sender=CourseEnrollment)
 def notify_course_assigned(sender, instance, created, **kwargs):
     """Notify user when enrolled in course"""
     if created:
-        Notification.objects.create(
-            user=instance.user,
-            type='course_assigned',
-            title='Курс назначен',
-            message=f'Вам назначен курс "{instance.course.title}"'
-        )
+        build_course_assigned_notification(instance.user_id, instance.course).save()
 
 
 @receiver(post_save, sender=Protocol)
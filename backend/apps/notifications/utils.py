@@ -2,6 +2,7 @@ from django.core.mail import send_mass_mail, send_mail
 from django.conf import settings
 from apps.accounts.models import User
 from apps.courses.models import Course
+from .models import Notification
 from typing import List, Optional
 
 
@@ -169,3 +170,17 @@ def send_course_reminder(
         recipient_list=recipient_list
     )
 
+
+def build_course_assigned_notification(user_id: int, course: Course) -> Notification:
+    """
+    Build (unsaved) "course assigned" notification
+    
+    Used both by the post_save signal and by bulk enrollment,
+    which inserts notifications with bulk_create.
+    """
+    return Notification(
+        user_id=user_id,
+        type='course_assigned',
+        title='Курс назначен',
+        message=f'Вам назначен курс "{course.title}"'
+    )
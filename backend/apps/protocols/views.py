@@ -2,7 +2,8 @@ from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.filters import OrderingFilter
+from apps.search.filters import IndexedSearchFilter
 from django.http import HttpResponse
 from django.utils import timezone
 
@@ -24,7 +25,8 @@ class ProtocolViewSet(viewsets.ModelViewSet):
     queryset = Protocol.objects.select_related('student', 'course', 'attempt', 'enrollment').prefetch_related('signatures__signer').all()
     serializer_class = ProtocolSerializer
     permission_classes = [IsAdminOrReadOnly]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, IndexedSearchFilter, OrderingFilter]
+    search_entity = 'protocols'
     filterset_fields = ['status', 'result']
     search_fields = ['number', 'student__full_name', 'student__phone', 'course__title']
     ordering_fields = ['created_at', 'exam_date']
@@ -0,0 +1,9 @@
+from django.contrib import admin
+from .models import SearchDocument
+
+
+@admin.register(SearchDocument)
+class SearchDocumentAdmin(admin.ModelAdmin):
+    list_display = ('entity', 'object_id', 'title', 'is_public', 'updated_at')
+    list_filter = ('entity', 'is_public')
+    readonly_fields = ('updated_at',)
@@ -0,0 +1,158 @@
+"""
+Full-text queries against the search index
+
+SQLite uses the FTS5 table search_documents_fts, PostgreSQL the generated
+search_vector column. Every query token is matched as a prefix, so partial
+input from typeahead pickers ("ива", "7777") finds documents. Other database
+backends fall back to icontains over SearchDocument.body.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Count, Q
+from django.db.models.expressions import RawSQL
+
+from .models import SearchDocument
+from .registry import normalize_text
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+MAX_TOKENS = 8
+
+
+def tokenize(query):
+    """Разбить строку запроса на токены (без спецсимволов FTS)"""
+    return TOKEN_RE.findall(normalize_text(query or '').lower())[:MAX_TOKENS]
+
+
+def _query_expression(tokens, vendor):
+    """Выражение полнотекстового запроса: все токены как префиксы (AND)"""
+    if vendor == 'sqlite':
+        return ' '.join(f'"{token}"*' for token in tokens)
+    return ' & '.join(f'{token}:*' for token in tokens)
+
+
+def _match_sql(tokens):
+    """
+    SQL, выбирающий id документов по запросу.
+
+    Returns:
+        tuple: (sql, params) или None, если full-text индекс недоступен
+    """
+    vendor = connection.vendor
+    if vendor == 'sqlite':
+        return (
+            'SELECT rowid FROM search_documents_fts WHERE search_documents_fts MATCH %s',
+            [_query_expression(tokens, vendor)],
+        )
+    if vendor == 'postgresql':
+        return (
+            "SELECT id FROM search_documents WHERE search_vector @@ to_tsquery('simple', %s)",
+            [_query_expression(tokens, vendor)],
+        )
+    return None
+
+
+def _match_filter(tokens):
+    """Q-фильтр SearchDocument по токенам запроса"""
+    match = _match_sql(tokens)
+    if match is None:
+        condition = Q()
+        for token in tokens:
+            condition &= Q(body__icontains=token)
+        return condition
+    return Q(id__in=RawSQL(*match))
+
+
+def _ranked_ids(tokens, match_filter, entities, public_only, limit, offset):
+    """Id подходящих документов в порядке релевантности (одна страница)"""
+    vendor = connection.vendor
+    if vendor not in ('sqlite', 'postgresql'):
+        queryset = SearchDocument.objects.filter(match_filter)
+        if entities:
+            queryset = queryset.filter(entity__in=entities)
+        if public_only:
+            queryset = queryset.filter(is_public=True)
+        return list(queryset.order_by('title', 'id').values_list('id', flat=True)[offset:offset + limit])
+
+    conditions = []
+    params = [_query_expression(tokens, vendor)]
+    if vendor == 'sqlite':
+        sql = (
+            'SELECT search_documents.id FROM search_documents_fts '
+            'JOIN search_documents ON search_documents.id = search_documents_fts.rowid '
+            'WHERE search_documents_fts MATCH %s'
+        )
+        order = 'bm25(search_documents_fts, 10.0, 1.0), search_documents.id'
+    else:
+        sql = (
+            "SELECT id FROM search_documents, to_tsquery('simple', %s) query "
+            'WHERE search_vector @@ query'
+        )
+        order = 'ts_rank(search_vector, query) DESC, id'
+
+    if entities:
+        conditions.append('search_documents.entity IN (%s)' % ', '.join(['%s'] * len(entities)))
+        params.extend(entities)
+    if public_only:
+        conditions.append('search_documents.is_public = %s')
+        params.append(True)
+    for condition in conditions:
+        sql += f' AND {condition}'
+    sql += f' ORDER BY {order} LIMIT %s OFFSET %s'
+    params.extend([limit, offset])
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def search(query, entities=None, public_only=False, limit=20, offset=0):
+    """
+    Поиск по индексу.
+
+    Args:
+        query: Строка запроса
+        entities: Список имен сущностей (None - все)
+        public_only: Только публичные документы (для не-администраторов)
+        limit, offset: Пагинация результатов
+
+    Returns:
+        dict: {'results': [SearchDocument], 'facets': {entity: count}, 'total': int}
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return {'results': [], 'facets': {}, 'total': 0}
+
+    match_filter = _match_filter(tokens)
+    base = SearchDocument.objects.filter(match_filter)
+    if public_only:
+        base = base.filter(is_public=True)
+
+    # Фасеты считаются без фильтра по сущности, чтобы показывать счетчики всех вкладок
+    facets = {
+        row['entity']: row['count']
+        for row in base.values('entity').annotate(count=Count('id')).order_by()
+    }
+
+    total = sum(count for entity, count in facets.items() if not entities or entity in entities)
+
+    ids = _ranked_ids(tokens, match_filter, entities, public_only, limit, offset)
+    documents = SearchDocument.objects.in_bulk(ids)
+    return {
+        'results': [documents[pk] for pk in ids if pk in documents],
+        'facets': facets,
+        'total': total,
+    }
+
+
+def matching_object_ids(query, entity):
+    """
+    Подзапрос id объектов сущности, подходящих под запрос.
+
+    Используется для фильтрации querysets viewset'ов: queryset.filter(pk__in=...).
+    Возвращает None, если в запросе нет токенов.
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return None
+    return SearchDocument.objects.filter(_match_filter(tokens), entity=entity).values('object_id')
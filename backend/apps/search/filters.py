@@ -0,0 +1,26 @@
+from rest_framework.filters import SearchFilter
+
+from .backends import matching_object_ids
+from .models import SearchDocument
+
+
+class IndexedSearchFilter(SearchFilter):
+    """
+    SearchFilter backed by the full-text index.
+    
+    Viewsets set `search_entity` (name from apps.search.registry); `?search=`
+    is then resolved by the index instead of icontains over search_fields.
+    Until the entity is indexed (rebuild_search_index) the regular
+    SearchFilter behaviour is used.
+    """
+    
+    def filter_queryset(self, request, queryset, view):
+        entity = getattr(view, 'search_entity', None)
+        query = request.query_params.get(self.search_param, '')
+        if not entity or not query.strip():
+            return super().filter_queryset(request, queryset, view)
+        
+        object_ids = matching_object_ids(query, entity)
+        if object_ids is None or not SearchDocument.objects.filter(entity=entity).exists():
+            return super().filter_queryset(request, queryset, view)
+        return queryset.filter(pk__in=object_ids)
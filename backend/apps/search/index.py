@@ -0,0 +1,72 @@
+"""
+Keeping SearchDocument rows in sync with indexed models
+"""
+from .models import SearchDocument
+from .registry import ENTITIES, USER_DEPENDENT_ENTITIES, get_entity_for_model
+
+REBUILD_BATCH_SIZE = 1000
+
+
+def index_instance(instance, entity=None):
+    """Создать или обновить документ объекта"""
+    entity = entity or get_entity_for_model(type(instance))
+    if entity is None:
+        return
+    SearchDocument.objects.update_or_create(
+        entity=entity.name,
+        object_id=instance.pk,
+        defaults=entity.build_document(instance),
+    )
+
+
+def remove_instance(instance, entity=None):
+    """Удалить документ объекта из индекса"""
+    entity = entity or get_entity_for_model(type(instance))
+    if entity is None:
+        return
+    SearchDocument.objects.filter(entity=entity.name, object_id=instance.pk).delete()
+
+
+def reindex_queryset(entity, queryset, batch_size=REBUILD_BATCH_SIZE):
+    """
+    Переиндексировать объекты queryset пакетами.
+
+    Старые документы пакета удаляются одним запросом, новые вставляются bulk_create.
+
+    Returns:
+        int: Количество проиндексированных объектов
+    """
+    count = 0
+    batch = []
+    for obj in queryset.iterator(chunk_size=batch_size):
+        batch.append(obj)
+        if len(batch) >= batch_size:
+            count += _write_batch(entity, batch)
+            batch = []
+    if batch:
+        count += _write_batch(entity, batch)
+    return count
+
+
+def _write_batch(entity, objects):
+    SearchDocument.objects.filter(entity=entity.name, object_id__in=[obj.pk for obj in objects]).delete()
+    SearchDocument.objects.bulk_create([
+        SearchDocument(entity=entity.name, object_id=obj.pk, **entity.build_document(obj))
+        for obj in objects
+    ])
+    return len(objects)
+
+
+def rebuild_entity(entity_name, batch_size=REBUILD_BATCH_SIZE):
+    """Полностью перестроить индекс сущности"""
+    entity = ENTITIES[entity_name]
+    SearchDocument.objects.filter(entity=entity.name).delete()
+    return reindex_queryset(entity, entity.get_queryset(), batch_size=batch_size)
+
+
+def reindex_user_documents(user):
+    """Обновить документы, содержащие данные пользователя (протоколы, сертификаты)"""
+    for entity_name, field in USER_DEPENDENT_ENTITIES.items():
+        entity = ENTITIES[entity_name]
+        queryset = entity.get_queryset().filter(**{field: user})
+        reindex_queryset(entity, queryset)
@@ -0,0 +1,35 @@
+"""
+Management command to rebuild the full-text search index
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.search.index import rebuild_entity, REBUILD_BATCH_SIZE
+from apps.search.registry import ENTITIES
+
+
+class Command(BaseCommand):
+    help = 'Rebuild search index (all entities or selected with --entity)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--entity',
+            action='append',
+            dest='entities',
+            help=f'Entity to rebuild, can be repeated. Available: {", ".join(ENTITIES)}'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=REBUILD_BATCH_SIZE,
+            help='Objects per bulk insert'
+        )
+    
+    def handle(self, *args, **options):
+        entities = options['entities'] or list(ENTITIES)
+        unknown = [e for e in entities if e not in ENTITIES]
+        if unknown:
+            raise CommandError(f'Unknown entity: {", ".join(unknown)}')
+        
+        for entity in entities:
+            count = rebuild_entity(entity, batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Indexed {count} {entity}'))
@@ -0,0 +1,27 @@
+from django.db import models
+
+
+class SearchDocument(models.Model):
+    """
+    Denormalized search document for one indexed object.
+    
+    Full-text index lives next to the table: FTS5 virtual table
+    search_documents_fts on SQLite, generated tsvector column on PostgreSQL
+    (see migrations/0001_initial.py).
+    """
+    
+    entity = models.CharField(max_length=30, help_text='Entity name from search registry, e.g. users')
+    object_id = models.IntegerField()
+    title = models.CharField(max_length=500)
+    subtitle = models.CharField(max_length=500, blank=True)
+    body = models.TextField(blank=True, help_text='All searchable text of the object')
+    is_public = models.BooleanField(default=False, help_text='Visible to non-admin users')
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'search_documents'
+        unique_together = ['entity', 'object_id']
+    
+    def __str__(self):
+        return f"{self.entity}:{self.object_id} {self.title}"
@@ -0,0 +1,155 @@
+"""
+Indexed entities: which models go to the search index and how their documents are built
+"""
+import re
+
+from django.apps import apps
+
+
+class SearchEntity:
+    """
+    Описание индексируемой сущности.
+
+    Поля задаются путями атрибутов через точку (например, 'student.full_name').
+
+    Args:
+        name: Имя сущности в API (/api/search/?entity=<name>)
+        model: Метка модели 'app_label.ModelName'
+        title: Поле заголовка результата
+        subtitle: Поле подзаголовка результата
+        fields: Дополнительные поля для полнотекстового поиска
+        digit_fields: Поля, для которых индексируется также форма из одних цифр (телефоны)
+        select_related: Связи для выборки при перестроении индекса
+        is_public: callable(obj) -> bool; None - только для администраторов
+        public_fields: Поля модели, от которых зависит is_public
+    """
+
+    def __init__(self, name, model, title, subtitle=None, fields=(), digit_fields=(),
+                 select_related=(), is_public=None, public_fields=()):
+        self.name = name
+        self.model_label = model
+        self.title = title
+        self.subtitle = subtitle
+        self.fields = fields
+        self.digit_fields = digit_fields
+        self.select_related = select_related
+        self.is_public = is_public
+        # Поля модели, изменение которых требует переиндексации (для save(update_fields=...))
+        paths = (title, subtitle or '') + tuple(fields) + tuple(digit_fields)
+        self.watch_fields = {path.split('.')[0] for path in paths if path} | set(public_fields)
+
+    @property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+    def get_queryset(self):
+        queryset = self.model._default_manager.all()
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        return queryset
+
+    def build_document(self, obj):
+        """Собрать поля SearchDocument для объекта"""
+        parts = []
+        for path in (self.title,) + tuple(self.fields):
+            value = _resolve(obj, path)
+            if value:
+                parts.append(value)
+        for path in self.digit_fields:
+            digits = re.sub(r'\D', '', _resolve(obj, path))
+            if digits:
+                parts.append(digits)
+
+        return {
+            'title': _resolve(obj, self.title)[:500] or str(obj)[:500],
+            'subtitle': _resolve(obj, self.subtitle)[:500] if self.subtitle else '',
+            'body': normalize_text(' '.join(parts)),
+            'is_public': bool(self.is_public(obj)) if self.is_public else False,
+        }
+
+
+def _resolve(obj, path):
+    """Значение атрибута по пути через точку ('' если где-то None)"""
+    for attr in path.split('.'):
+        obj = getattr(obj, attr, None)
+        if obj is None:
+            return ''
+    return str(obj)
+
+
+def normalize_text(text):
+    """Приведение текста к виду индекса (ё/е не различаются токенайзером)"""
+    return text.replace('ё', 'е').replace('Ё', 'Е')
+
+
+ENTITIES = {
+    entity.name: entity for entity in [
+        SearchEntity(
+            'courses', 'courses.Course',
+            title='title',
+            subtitle='category.name',
+            fields=('title_kz', 'title_en', 'description', 'description_kz', 'description_en',
+                    'category.name', 'category.name_kz', 'category.name_en'),
+            select_related=('category',),
+            is_public=lambda course: course.status == 'published',
+            public_fields=('status',),
+        ),
+        SearchEntity(
+            'tests', 'tests.Test',
+            title='title',
+            subtitle='category.name',
+            fields=('title_kz', 'title_en', 'category.name'),
+            select_related=('category',),
+            is_public=lambda test: test.is_active,
+            public_fields=('is_active',),
+        ),
+        SearchEntity(
+            'users', 'accounts.User',
+            title='full_name',
+            subtitle='phone',
+            fields=('phone', 'email', 'iin', 'organization', 'city'),
+            digit_fields=('phone',),
+        ),
+        SearchEntity(
+            'protocols', 'protocols.Protocol',
+            title='number',
+            subtitle='student.full_name',
+            fields=('student.full_name', 'student.phone', 'student.iin', 'course.title', 'test.title'),
+            digit_fields=('student.phone',),
+            select_related=('student', 'course', 'test'),
+        ),
+        SearchEntity(
+            'certificates', 'certificates.Certificate',
+            title='number',
+            subtitle='student.full_name',
+            fields=('student.full_name', 'student.phone', 'student.iin', 'course.title'),
+            digit_fields=('student.phone',),
+            select_related=('student', 'course'),
+        ),
+        SearchEntity(
+            'vacancies', 'vacancies.Vacancy',
+            title='title',
+            subtitle='location',
+            fields=('title_kz', 'title_en', 'description', 'description_kz', 'description_en',
+                    'requirements', 'requirements_kz', 'requirements_en',
+                    'responsibilities', 'responsibilities_kz', 'responsibilities_en', 'location'),
+            is_public=lambda vacancy: vacancy.is_active and vacancy.status == 'published',
+            public_fields=('is_active', 'status'),
+        ),
+    ]
+}
+
+# Документы, зависящие от данных пользователя (ФИО, телефон)
+USER_DEPENDENT_ENTITIES = {
+    'protocols': 'student',
+    'certificates': 'student',
+}
+
+
+def get_entity_for_model(model):
+    """Найти сущность индекса по классу модели"""
+    label = model._meta.label
+    for entity in ENTITIES.values():
+        if entity.model_label == label:
+            return entity
+    return None
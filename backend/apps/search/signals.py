@@ -0,0 +1,33 @@
+"""Signals for keeping the search index in sync"""
+from django.db.models.signals import post_save, post_delete
+
+from .index import index_instance, remove_instance, reindex_user_documents
+from .registry import ENTITIES
+
+
+def _make_save_handler(entity):
+    def handler(sender, instance, **kwargs):
+        if kwargs.get('raw'):
+            return
+        update_fields = kwargs.get('update_fields')
+        if update_fields and not set(update_fields) & entity.watch_fields:
+            # Например, обновление last_login при входе
+            return
+        index_instance(instance, entity)
+        if entity.name == 'users' and not kwargs.get('created'):
+            reindex_user_documents(instance)
+    return handler
+
+
+def _make_delete_handler(entity):
+    def handler(sender, instance, **kwargs):
+        remove_instance(instance, entity)
+    return handler
+
+
+def connect_signals():
+    """Подключить обработчики ко всем моделям из реестра"""
+    for entity in ENTITIES.values():
+        uid = f'search_index_{entity.name}'
+        post_save.connect(_make_save_handler(entity), sender=entity.model, weak=False, dispatch_uid=uid)
+        post_delete.connect(_make_delete_handler(entity), sender=entity.model, weak=False, dispatch_uid=uid)
@@ -0,0 +1,57 @@
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .backends import search
+from .registry import ENTITIES
+
+MAX_LIMIT = 50
+
+
+class SearchView(APIView):
+    """
+    Unified search across courses, tests, users, protocols, certificates and vacancies
+    
+    Query params:
+        q: search string (every word is matched as a prefix - suitable for typeahead)
+        entity: comma separated entity names (optional)
+        limit, offset: pagination (limit <= 50)
+    
+    Non-admin users only get public documents (published courses, active tests,
+    published vacancies).
+    """
+    permission_classes = [permissions.AllowAny]
+    
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        entities = [e for e in request.query_params.get('entity', '').split(',') if e]
+        unknown = [e for e in entities if e not in ENTITIES]
+        if unknown:
+            return Response(
+                {'error': f'Unknown entity: {", ".join(unknown)}', 'entities': list(ENTITIES)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), MAX_LIMIT)
+            offset = max(int(request.query_params.get('offset', 0)), 0)
+        except ValueError:
+            return Response({'error': 'limit and offset must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        is_admin = request.user.is_authenticated and getattr(request.user, 'is_admin', False)
+        result = search(query, entities=entities or None, public_only=not is_admin, limit=limit, offset=offset)
+        
+        return Response({
+            'query': query,
+            'total': result['total'],
+            'facets': result['facets'],
+            'results': [
+                {
+                    'entity': doc.entity,
+                    'id': doc.object_id,
+                    'title': doc.title,
+                    'subtitle': doc.subtitle,
+                }
+                for doc in result['results']
+            ],
+        })
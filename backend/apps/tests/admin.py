@@ -1,4 +1,6 @@
 from django.contrib import admin
+from apps.core.jobs import start_job
+from apps.exams.tasks import regrade_test_task
 from .models import Test, Question
 
 
@@ -9,6 +11,20 @@ class TestAdmin(admin.ModelAdmin):
     search_fields = ('title',)
     ordering = ('-created_at',)
     readonly_fields = ('created_at', 'updated_at', 'questions_count')
+    actions = ['regrade_attempts']
+    
+    @admin.action(description='Пересчитать результаты завершенных попыток')
+    def regrade_attempts(self, request, queryset):
+        """Regrade attempts of the selected tests in background jobs (report in job result)"""
+        jobs = [
+            start_job('regrade_test', regrade_test_task, {'test_id': test.id}, user=request.user)
+            for test in queryset
+        ]
+        self.message_user(
+            request,
+            f"Запущен пересчет попыток: задания {', '.join(f'#{job.pk}' for job in jobs)}. "
+            f"Попытки со сменой результата (сдан/не сдан) перечислены в результате задания.",
+        )
 
 
 @admin.register(Question)
@@ -0,0 +1,205 @@
+"""
+Compiled answer keys for test scoring
+
+The questions of a test are compiled once into plain data (correct answers
+as string sets, weights, option id -> text maps) and kept in the shared
+cache under a version that changes on every Question save or delete.
+Scoring, answer details and answer validation read the compiled key
+instead of reloading and re-parsing the questions for every answer.
+
+The version token is only seen by all processes in a shared cache
+(REDIS_CACHE_URL). With a per-process cache a question edit would bump it
+in one worker only, so the key is then compiled from the database on
+every call.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.core.cache import get_version, bump_version_on_commit
+from apps.core.write_behind import is_shared_cache
+from .models import Question
+
+ANSWER_KEY_VERSION_KEY = 'answer_key_version:{test_id}'
+ANSWER_KEY = 'answer_key:{test_id}:{version}'
+
+CHOICE_TYPES = ('single_choice', 'yes_no')
+EXACT_TYPES = ('matching', 'ordering', 'short_answer')
+
+NOT_ANSWERED = 'Не отвечено'
+NO_CORRECT_ANSWER = 'Нет правильного ответа'
+
+
+def invalidate_answer_key(test_id):
+    """Сбросить скомпилированный ключ ответов теста (после коммита транзакции)"""
+    if test_id is None:
+        return
+    bump_version_on_commit(ANSWER_KEY_VERSION_KEY.format(test_id=test_id))
+
+
+def _correct_display(question_type, correct_answers, options):
+    """Текст правильного ответа (как TestAttempt._get_correct_answer_display)"""
+    if not correct_answers:
+        return NO_CORRECT_ANSWER
+    if question_type == 'multiple_choice':
+        return ', '.join(options.get(str(ca), str(ca)) for ca in correct_answers)
+    if question_type == 'single_choice':
+        return options.get(str(correct_answers[0]), str(correct_answers[0]))
+    return str(correct_answers[0])
+
+
+def compile_question(question):
+    """
+    Скомпилировать вопрос в словарь для ключа ответов.
+
+    Returns:
+        dict: id, type, weight, text, correct (исходный список), correct_set
+            (строки), options ({id: text} вариантов с id)
+    """
+    correct_answers = question.get_correct_answers()
+    options = {}
+    for opt in question.options or []:
+        if isinstance(opt, dict) and opt.get('id'):
+            options.setdefault(str(opt['id']), opt.get('text', str(opt['id'])))
+    return {
+        'id': str(question.id),
+        'type': question.type,
+        'weight': question.weight,
+        'text': question.text,
+        'correct': correct_answers,
+        'correct_set': frozenset(str(ca) for ca in correct_answers),
+        'correct_display': _correct_display(question.type, correct_answers, options),
+        'options': options,
+    }
+
+
+class AnswerKey:
+    """Скомпилированный ключ ответов теста (вопросы в порядке теста)"""
+
+    def __init__(self, questions):
+        self.questions = questions
+        self.by_id = {q['id']: q for q in questions}
+        self.total_weight = sum(q['weight'] for q in questions)
+
+    def is_correct(self, question, answer):
+        """Верен ли ответ на вопрос (сравнение строк, как в calculate_score)"""
+        question_type = question['type']
+        if question_type in CHOICE_TYPES:
+            return str(answer) in question['correct_set']
+        if question_type == 'multiple_choice':
+            answers = answer if isinstance(answer, list) else [answer]
+            return {str(a) for a in answers} == question['correct_set']
+        if question_type in EXACT_TYPES:
+            return bool(question['correct']) and str(answer) == str(question['correct'][0])
+        return False
+
+    def score(self, answers, passing_score):
+        """
+        Оценить ответы.
+
+        Returns:
+            tuple: (процент, сдан ли тест)
+        """
+        if not answers or self.total_weight == 0:
+            return 0, False
+        correct_weight = 0
+        for question_id, answer in answers.items():
+            question = self.by_id.get(str(question_id))
+            if question is not None and self.is_correct(question, answer):
+                correct_weight += question['weight']
+        score_percentage = (correct_weight / self.total_weight) * 100
+        return score_percentage, score_percentage >= passing_score
+
+    def answer_display(self, question, answer):
+        """Текст ответа пользователя (как TestAttempt._get_answer_display)"""
+        if answer is None:
+            return NOT_ANSWERED
+        question_type = question['type']
+        options = question['options']
+        if question_type == 'single_choice':
+            return options.get(str(answer), str(answer))
+        if question_type == 'yes_no':
+            answer_str = str(answer).strip()
+            if answer_str in ('True', 'true', '1'):
+                return 'Да'
+            if answer_str in ('False', 'false', '0'):
+                return 'Нет'
+            return answer_str if answer_str in ('Да', 'Нет') else str(answer)
+        if question_type == 'multiple_choice':
+            answers = answer if isinstance(answer, list) else [answer]
+            return ', '.join(options.get(str(a), str(a)) for a in answers) or NOT_ANSWERED
+        return str(answer)
+
+    def details(self, answers):
+        """Подробности по каждому вопросу (TestAttempt.get_answer_details)"""
+        if not answers:
+            return []
+        details = []
+        for question in self.questions:
+            question_id = question['id']
+            answered = question_id in answers
+            user_answer = answers.get(question_id)
+            details.append({
+                'question_id': question_id,
+                'question_text': question['text'],
+                'question_type': question['type'],
+                'user_answer': user_answer,
+                'user_answer_display': self.answer_display(question, user_answer),
+                'correct_answers': question['correct'],
+                'correct_answer_display': question['correct_display'],
+                'is_correct': answered and self.is_correct(question, user_answer),
+            })
+        return details
+
+    def validate(self, answers):
+        """
+        Проверить сохраняемые ответы.
+
+        Ключи должны быть id вопросов теста, ответы на вопросы с выбором -
+        id вариантов этого вопроса.
+
+        Returns:
+            dict: {question_id: ошибка} (пустой, если ответы корректны)
+        """
+        errors = {}
+        for question_id, answer in answers.items():
+            question = self.by_id.get(str(question_id))
+            if question is None:
+                errors[str(question_id)] = 'Question does not belong to this test'
+                continue
+            if question['type'] not in ('single_choice', 'multiple_choice') or answer in (None, '', []):
+                continue
+            values = answer if isinstance(answer, list) else [answer]
+            if any(str(value) not in question['options'] for value in values):
+                errors[str(question_id)] = 'Unknown option'
+        return errors
+
+
+def build_answer_key(test):
+    """
+    Ключ ответов теста, скомпилированный из БД (без кэша).
+
+    Args:
+        test: Test или его id
+    """
+    test_id = getattr(test, 'pk', test)
+    return AnswerKey([compile_question(question) for question in Question.objects.filter(test_id=test_id)])
+
+
+def get_answer_key(test):
+    """
+    Скомпилированный ключ ответов теста из кэша (строится при промахе).
+
+    Без общего кэша ключ каждый раз строится по БД.
+
+    Args:
+        test: Test или его id
+    """
+    test_id = getattr(test, 'pk', test)
+    if not is_shared_cache():
+        return build_answer_key(test_id)
+    key = ANSWER_KEY.format(test_id=test_id, version=get_version(ANSWER_KEY_VERSION_KEY.format(test_id=test_id)))
+    questions = cache.get(key)
+    if questions is None:
+        questions = build_answer_key(test_id).questions
+        cache.set(key, questions, settings.ANSWER_KEY_CACHE_TIMEOUT)
+    return AnswerKey(questions)
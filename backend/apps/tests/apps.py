@@ -6,3 +6,6 @@ class TestsConfig(AppConfig):
     name = 'apps.tests'
     verbose_name = 'Tests'
 
+    
+    def ready(self):
+        import apps.tests.signals
@@ -0,0 +1,103 @@
+"""
+Copying tests with their questions (new language editions)
+"""
+import copy
+import uuid
+
+from django.db import transaction
+
+from apps.core.utils import apply_translation
+from apps.courses.utils import invalidate_category_tree
+from apps.search.index import reindex_queryset
+from apps.search.registry import ENTITIES
+from .models import Test, Question
+
+SKIP_FIELDS = {'id', 'created_at', 'updated_at'}
+
+
+def copy_instance(obj, **overrides):
+    """Несохраненная копия объекта (конкретные поля, FK как <name>_id)"""
+    model = type(obj)
+    fields = {
+        f.attname: copy.deepcopy(getattr(obj, f.attname))
+        for f in model._meta.concrete_fields
+        if f.name not in SKIP_FIELDS
+    }
+    fields.update(overrides)
+    return model(**fields)
+
+
+def _translate_options(options, lang):
+    """Перенести text_<lang> вариантов ответа в text"""
+    for option in options:
+        if isinstance(option, dict):
+            if option.get(f'text_{lang}'):
+                option['text'] = option[f'text_{lang}']
+    return options
+
+
+def clone_tests(tests, language=None, translate=False, titles=None):
+    """
+    Скопировать тесты с вопросами двумя bulk_create.
+
+    Args:
+        tests: Iterable[Test]
+        language: Язык копий (None - как у исходных тестов)
+        translate: Перенести поля _kz/_en языка language в базовые поля
+        titles: {id исходного теста: название копии}
+
+    Returns:
+        dict: {id исходного теста: новый Test}
+    """
+    tests = list(tests)
+    if not tests:
+        return {}
+
+    clones = []
+    for test in tests:
+        clone = copy_instance(test)
+        if language:
+            clone.language = language
+            if translate:
+                apply_translation(clone, ('title',), language)
+        if titles and titles.get(test.id):
+            clone.title = titles[test.id]
+        clones.append(clone)
+
+    with transaction.atomic():
+        Test.objects.bulk_create(clones)
+        test_map = {test.id: clone for test, clone in zip(tests, clones)}
+
+        questions = []
+        for question in Question.objects.filter(test_id__in=test_map).order_by('test_id', 'order', 'id').iterator():
+            clone = copy_instance(question, test_id=test_map[question.test_id].id)
+            if clone.type != 'yes_no':
+                # Как в Question.save(): у всех вариантов должен быть id
+                for option in clone.options or []:
+                    if isinstance(option, dict) and not option.get('id'):
+                        option['id'] = str(uuid.uuid4())
+            if language:
+                clone.language = language
+                if translate:
+                    apply_translation(clone, ('text',), language)
+                    _translate_options(clone.options or [], language)
+            questions.append(clone)
+        Question.objects.bulk_create(questions, batch_size=500)
+
+        # bulk_create не отправляет post_save - индексируем новые тесты для поиска
+        search_entity = ENTITIES['tests']
+        reindex_queryset(search_entity, search_entity.get_queryset().filter(id__in=[c.id for c in clones]))
+        # и не сбрасывает счетчики тестов по категориям
+        invalidate_category_tree()
+
+    return test_map
+
+
+def clone_test(test, language=None, translate=False, title=None):
+    """
+    Скопировать тест с вопросами.
+
+    Returns:
+        Test: Новый тест
+    """
+    return clone_tests([test], language=language, translate=translate, titles={test.id: title})[test.id]
@@ -2,11 +2,14 @@ from rest_framework import serializers
 from .models import Test, Question, TestCompletionVerification
 from apps.courses.serializers import CategorySerializer
 from apps.courses.models import Category
+from apps.core.serializers import LocalizedFieldsMixin
+from apps.core.utils import resolve_localized_fields
 import uuid
 
 
-class QuestionSerializer(serializers.ModelSerializer):
+class QuestionSerializer(LocalizedFieldsMixin, serializers.ModelSerializer):
     """Question serializer"""
+    localized_fields = ('text',)
     
     class Meta:
         model = Question
@@ -15,10 +18,22 @@ class QuestionSerializer(serializers.ModelSerializer):
             'language', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
+    
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        lang = self.get_resolved_language()
+        if lang and isinstance(data.get('options'), list):
+            # Копируем опции: JSON поля модели нельзя изменять на месте
+            data['options'] = [
+                resolve_localized_fields(dict(opt), ('text',), lang) if isinstance(opt, dict) else opt
+                for opt in data['options']
+            ]
+        return data
 
 
-class TestSerializer(serializers.ModelSerializer):
+class TestSerializer(LocalizedFieldsMixin, serializers.ModelSerializer):
     """Test serializer with nested questions"""
+    localized_fields = ('title',)
     questions = QuestionSerializer(many=True, read_only=True)
     questions_count = serializers.IntegerField(read_only=True)
     category = CategorySerializer(read_only=True)
@@ -0,0 +1,12 @@
+"""Signals for keeping compiled answer keys in sync"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .answer_key import invalidate_answer_key
+from .models import Question
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def question_changed(sender, instance, **kwargs):
+    """Bump answer key version when question is saved or deleted"""
+    invalidate_answer_key(instance.test_id)
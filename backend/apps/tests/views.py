@@ -2,10 +2,12 @@ from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter, OrderingFilter
-from django.db.models import Max
+from apps.search.filters import IndexedSearchFilter
+from apps.core.filters import LocalizedFieldFilter, LocalizedOrderingFilter
 
 from .models import Test, Question, TestCompletionVerification
+from .clone import clone_test
+from .answer_key import invalidate_answer_key
 from .serializers import (
     TestSerializer,
     QuestionSerializer,
@@ -13,14 +15,20 @@ from .serializers import (
 )
 from apps.accounts.permissions import IsAdminOrReadOnly
 from apps.core.utils import get_request_language
+from apps.core.views import PurgeDestroyMixin
+from apps.core.serializers import CloneSerializer, ReorderSerializer
+from apps.core.ordering import next_order, apply_order
 from apps.courses.serializers import OTPVerifySerializer
 
 
-class TestViewSet(viewsets.ModelViewSet):
+class TestViewSet(PurgeDestroyMixin, viewsets.ModelViewSet):
     """Test ViewSet"""
-    queryset = Test.objects.prefetch_related('questions').all()
+    queryset = Test.objects.select_related('category').prefetch_related('questions').all()
+    purge_target = 'test'
     serializer_class = TestSerializer
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, IndexedSearchFilter, LocalizedFieldFilter, LocalizedOrderingFilter]
+    localized_filter_fields = ['title']
+    search_entity = 'tests'
     filterset_fields = ['is_active', 'language', 'category']
     search_fields = ['title']
     ordering_fields = ['created_at', 'title']
@@ -66,21 +74,59 @@ class TestViewSet(viewsets.ModelViewSet):
         
         if request.method == 'GET':
             questions = test.questions.all()
-            serializer = QuestionSerializer(questions, many=True)
+            serializer = QuestionSerializer(questions, many=True, context={'request': request})
             return Response(serializer.data)
         
         elif request.method == 'POST':
             serializer = QuestionCreateSerializer(data=request.data)
             serializer.is_valid(raise_exception=True)
             
-            # Set order if not provided
+            # Set order if not provided (next gap after the last question)
             if 'order' not in serializer.validated_data:
-                max_order = test.questions.aggregate(max_order=Max('order'))['max_order'] or 0
-                serializer.validated_data['order'] = max_order + 1
+                serializer.validated_data['order'] = next_order(test.questions.all())
             
             question = serializer.save(test=test)
             return Response(QuestionSerializer(question).data, status=status.HTTP_201_CREATED)
     
+    @action(detail=True, methods=['post'])
+    def reorder_questions(self, request, pk=None):
+        """
+        Reorder all questions of the test in one request (admin only)
+        
+        Request body: {"ids": [question_id, ...]} - every question of the test, in the new order
+        """
+        test = self.get_object()
+        serializer = ReorderSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        orders = apply_order(test.questions.all(), serializer.validated_data['ids'])
+        # bulk_update не отправляет post_save, а подробности ответов идут в порядке вопросов
+        invalidate_answer_key(test.id)
+        return Response({'orders': orders}, status=status.HTTP_200_OK)
+    
+    @action(detail=True, methods=['post'])
+    def clone(self, request, pk=None):
+        """
+        Copy test with its questions (admin only)
+        
+        Request body:
+        {
+            "language": "ru" | "kz" | "en" (optional),
+            "translate": bool - copy _kz/_en fields of the language into the base fields,
+            "title": str (optional)
+        }
+        """
+        test = self.get_object()
+        serializer = CloneSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        clone = clone_test(test, **serializer.validated_data)
+        clone = Test.objects.select_related('category').prefetch_related('questions').get(pk=clone.pk)
+        return Response(
+            self.get_serializer(clone).data,
+            status=status.HTTP_201_CREATED
+        )
+    
     @action(detail=True, methods=['post'])
     def request_completion_otp(self, request, pk=None):
         """Request OTP for standalone test completion verification"""
@@ -355,10 +401,9 @@ class QuestionViewSet(viewsets.ModelViewSet):
         if test_id:
             try:
                 test = Test.objects.get(id=test_id)
-                # Set order if not provided
+                # Set order if not provided (next gap after the last question)
                 if 'order' not in serializer.validated_data:
-                    max_order = test.questions.aggregate(max_order=Max('order'))['max_order'] or 0
-                    serializer.validated_data['order'] = max_order + 1
+                    serializer.validated_data['order'] = next_order(test.questions.all())
                 serializer.save(test=test)
             except Test.DoesNotExist:
                 from rest_framework.exceptions import NotFound
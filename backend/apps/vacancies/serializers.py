@@ -1,9 +1,11 @@
 from rest_framework import serializers
 from .models import Vacancy, VacancyApplication
+from apps.core.serializers import LocalizedFieldsMixin
 
 
-class VacancySerializer(serializers.ModelSerializer):
+class VacancySerializer(LocalizedFieldsMixin, serializers.ModelSerializer):
     """Vacancy serializer"""
+    localized_fields = ('title', 'description', 'requirements', 'responsibilities', 'location')
     status_display = serializers.CharField(source='get_status_display', read_only=True)
     employment_type_display = serializers.CharField(source='get_employment_type_display', read_only=True)
     applications_count = serializers.SerializerMethodField()
@@ -3,6 +3,8 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
+from apps.search.filters import IndexedSearchFilter
+from apps.core.filters import LocalizedFieldFilter, LocalizedOrderingFilter
 from django.utils import timezone
 from django.db.models import Count, Q
 from datetime import timedelta
@@ -19,7 +21,9 @@ from apps.core.utils import get_request_language
 class VacancyViewSet(viewsets.ModelViewSet):
     """Vacancy ViewSet"""
     queryset = Vacancy.objects.all()
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, IndexedSearchFilter, LocalizedFieldFilter, LocalizedOrderingFilter]
+    localized_filter_fields = ['title']
+    search_entity = 'vacancies'
     filterset_fields = ['status', 'is_active', 'employment_type', 'location', 'language']
     search_fields = ['title', 'description', 'requirements']
     ordering_fields = ['created_at', 'published_at', 'title']
@@ -0,0 +1,12 @@
+"""
+Celery application for background jobs (bulk enrollment, purges, rebuilds)
+"""
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+app = Celery('unicover')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
@@ -54,6 +54,7 @@ INSTALLED_APPS = [
     'apps.contacts',
     'apps.projects',
     'apps.partners',
+    'apps.search',
     'apps.telegram_bot',
 ]
 
@@ -244,13 +245,61 @@ SERVER_EMAIL = DEFAULT_FROM_EMAIL
 # Celery Configuration (optional for async tasks)
 CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0')
 CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', 'redis://localhost:6379/0')
+# Without a running worker set CELERY_TASK_ALWAYS_EAGER=True to execute jobs inline
+CELERY_TASK_ALWAYS_EAGER = os.getenv('CELERY_TASK_ALWAYS_EAGER', 'False') == 'True'
+CELERY_TASK_IGNORE_RESULT = True
+
+# Bulk enrollment: larger uploads are processed as a background job
+BULK_ENROLL_SYNC_LIMIT = int(os.getenv('BULK_ENROLL_SYNC_LIMIT', '500'))
+
+# Cascade purge (users, courses, tests, enrollments): rows per delete transaction
+# and the largest graph deleted inline in the request
+PURGE_CHUNK_SIZE = int(os.getenv('PURGE_CHUNK_SIZE', '500'))
+PURGE_SYNC_LIMIT = int(os.getenv('PURGE_SYNC_LIMIT', '2000'))
+
+# Write-behind buffers (lesson heartbeats, test answer autosave): lifetime of buffered data in the cache
+# and the interval of inline flushes; the periodic task flushes every minute
+WRITE_BEHIND_TIMEOUT = int(os.getenv('WRITE_BEHIND_TIMEOUT', str(60 * 60 * 24)))
+WRITE_BEHIND_FLUSH_INTERVAL = int(os.getenv('WRITE_BEHIND_FLUSH_INTERVAL', '60'))
+CELERY_BEAT_SCHEDULE = {
+    'flush-lesson-heartbeats': {
+        'task': 'apps.courses.tasks.flush_lesson_heartbeats_task',
+        'schedule': 60.0,
+    },
+    'flush-attempt-answers': {
+        'task': 'apps.exams.tasks.flush_attempt_answers_task',
+        'schedule': 60.0,
+    },
+}
+
+# Lesson heartbeat: largest accepted interval between two player ticks, seconds
+LESSON_HEARTBEAT_MAX_ELAPSED = int(os.getenv('LESSON_HEARTBEAT_MAX_ELAPSED', '120'))
 
 # Cache Configuration
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+# REDIS_CACHE_URL allows sharing the cache between several server processes
+REDIS_CACHE_URL = os.getenv('REDIS_CACHE_URL', '')
+if REDIS_CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_CACHE_URL,
+        }
     }
-}
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Serialized course tree (modules -> lessons) cache lifetime in seconds
+COURSE_TREE_CACHE_TIMEOUT = int(os.getenv('COURSE_TREE_CACHE_TIMEOUT', str(60 * 60 * 24)))
+
+# Category list with course/test counters cache lifetime in seconds
+CATEGORY_TREE_CACHE_TIMEOUT = int(os.getenv('CATEGORY_TREE_CACHE_TIMEOUT', str(60 * 60 * 24)))
+
+# Compiled test answer key (scoring, answer details) cache lifetime in seconds
+ANSWER_KEY_CACHE_TIMEOUT = int(os.getenv('ANSWER_KEY_CACHE_TIMEOUT', str(60 * 60 * 24)))
 
 # Logging
 LOGGING = {
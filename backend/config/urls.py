@@ -36,6 +36,7 @@ urlpatterns = [
     path('api/projects/', include('apps.projects.urls')),
     path('api/', include('apps.partners.urls')),
     path('api/core/', include('apps.core.urls')),
+    path('api/search/', include('apps.search.urls')),
     path('api/lessons/', include('apps.courses.lesson_urls')),  # For lesson endpoints
 ]
 
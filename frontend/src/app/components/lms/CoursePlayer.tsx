@@ -54,8 +54,19 @@ export function CoursePlayer({ course, onLessonComplete, onCourseComplete }: Cou
   const [finalTestExtraAttemptRequests, setFinalTestExtraAttemptRequests] = useState<ExtraAttemptRequest[]>([]);
   const [finalTestData, setFinalTestData] = useState<Test | null>(null);
   const [showFinalTestExtraAttemptModal, setShowFinalTestExtraAttemptModal] = useState(false);
+  const [lessonContents, setLessonContents] = useState<Record<string, string>>({});
   const { user } = useUser();
 
+  // Оглавление курса приходит без текста уроков - загружаем текст при открытии урока
+  useEffect(() => {
+    if (!selectedLesson || selectedLesson.type !== 'text') return;
+    if (selectedLesson.content !== undefined || lessonContents[selectedLesson.id] !== undefined) return;
+    const lessonId = selectedLesson.id;
+    coursesService.getLessonContent(lessonId)
+      .then(data => setLessonContents(prev => ({ ...prev, [lessonId]: data.content || '' })))
+      .catch(error => console.error('Failed to load lesson content:', error));
+  }, [selectedLesson]);
+
   const toggleModule = (moduleId: string) => {
     setExpandedModules(prev =>
       prev.includes(moduleId)
@@ -1231,7 +1242,7 @@ export function CoursePlayer({ course, onLessonComplete, onCourseComplete }: Cou
                     <div className="prose max-w-none">
                       <div className="text-gray-800 leading-relaxed space-y-4">
                         <p>
-                          {selectedLesson.content || 
+                          {selectedLesson.content || lessonContents[selectedLesson.id] || 
                             'Законодательство Республики Казахстан в области промышленной безопасности основывается на Конституции РК и состоит из Закона РК «О гражданской защите» и иных нормативных правовых актов РК.'}
                         </p>
                         <h3 className="text-xl font-bold text-gray-900 mt-6">Основные принципы</h3>
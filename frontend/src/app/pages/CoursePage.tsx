@@ -13,6 +13,7 @@ export function CoursePage() {
   const [course, setCourse] = useState<Course | null>(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
+  const [enrolling, setEnrolling] = useState(false);
 
   useEffect(() => {
     const fetchCourse = async () => {
@@ -25,7 +26,7 @@ export function CoursePage() {
         setLoading(true);
         setError(null);
         // Используем getCourseWithProgress для получения курса с прогрессом студента
-        // Если студент не зачислен, backend автоматически создаст enrollment
+        // GET не создает зачисление: незачисленный студент видит предпросмотр курса
         const data = await coursesService.getCourseWithProgress(courseId);
         setCourse(data);
       } catch (err: any) {
@@ -49,6 +50,21 @@ export function CoursePage() {
     fetchCourse();
   }, [courseId]);
 
+  const handleEnroll = async () => {
+    if (!courseId) return;
+    try {
+      setEnrolling(true);
+      await coursesService.selfEnroll(courseId);
+      const data = await coursesService.getCourseWithProgress(courseId);
+      setCourse(data);
+      toast.success('Вы записаны на курс');
+    } catch (error: any) {
+      toast.error(error.message || 'Ошибка при записи на курс');
+    } finally {
+      setEnrolling(false);
+    }
+  };
+
   const handleLessonComplete = async (lessonId: string) => {
     try {
       const response = await coursesService.completeLesson(lessonId);
@@ -150,6 +166,44 @@ export function CoursePage() {
     );
   }
 
+  if (course.enrolled === false) {
+    return (
+      <>
+        <Header />
+        <div className="min-h-screen bg-gray-50 pt-20">
+          <div className="max-w-4xl mx-auto px-4 py-8">
+            <h1 className="text-3xl font-bold text-gray-900 mb-4">{course.title}</h1>
+            {course.description && (
+              <p className="text-gray-600 mb-6 whitespace-pre-line">{course.description}</p>
+            )}
+            <button
+              onClick={handleEnroll}
+              disabled={enrolling}
+              className="px-6 py-3 bg-blue-600 text-white rounded-lg hover:bg-blue-700 transition-colors disabled:opacity-50"
+            >
+              {enrolling ? 'Запись...' : 'Записаться и начать'}
+            </button>
+            {course.modules && course.modules.length > 0 && (
+              <div className="mt-8 space-y-4">
+                {course.modules.map(module => (
+                  <div key={module.id} className="bg-white rounded-lg border border-gray-200 p-4">
+                    <h2 className="font-semibold text-gray-900 mb-2">{module.title}</h2>
+                    <ul className="space-y-1 text-gray-600">
+                      {module.lessons.map(lesson => (
+                        <li key={lesson.id}>{lesson.title}</li>
+                      ))}
+                    </ul>
+                  </div>
+                ))}
+              </div>
+            )}
+          </div>
+        </div>
+        <FooterUnicover />
+      </>
+    );
+  }
+
   return (
     <>
       <Header />
@@ -340,6 +340,10 @@ const coursesService = {
     await apiClient.post(`/courses/${courseId}/revoke_enrollment/`, { user_id: userId });
   },
 
+  async getLessonContent(lessonId: string): Promise<{ id: number; type: string; content: string; content_kz?: string; content_en?: string }> {
+    return apiClient.get(`/lessons/${lessonId}/content/`);
+  },
+
   async completeLesson(lessonId: string): Promise<{ progress: number }> {
     const response = await apiClient.post<{ message: string; progress: number }>(`/lessons/${lessonId}/complete/`);
     return { progress: response.progress || 0 };
@@ -78,12 +78,13 @@ const examsService = {
     return [];
   },
 
+  // Автосохранение: ответы буферизуются на сервере и учитываются при сдаче (submit)
   async saveAnswer(attemptId: number, answerData: { question: string; selected_options?: string[]; answer_text?: string }): Promise<void> {
-    return apiClient.post(`/exams/${attemptId}/save/`, { answers: { [answerData.question]: answerData.selected_options || answerData.answer_text } });
+    return apiClient.post(`/exams/${attemptId}/autosave/`, { answers: { [answerData.question]: answerData.selected_options || answerData.answer_text } });
   },
 
   async saveAllAnswers(attemptId: number, answers: Record<string, any>): Promise<void> {
-    return apiClient.post(`/exams/${attemptId}/save/`, { answers });
+    return apiClient.post(`/exams/${attemptId}/autosave/`, { answers });
   },
 
   // Extra Attempt Requests
@@ -121,6 +121,7 @@ export interface Course {
   status: CourseStatus;
   progress?: number; // процент (для enrollment)
   enrollment_status?: CourseStatus; // Статус enrollment (для with_progress endpoint)
+  enrolled?: boolean; // Зачислен ли студент (для with_progress endpoint)
   final_test_id?: number; // ID финального теста
   finalTestId?: number; // Frontend format (for compatibility)
   is_standalone_test?: boolean; // Backend format